@@ -1,59 +1,845 @@
-from flask import Flask, request, jsonify
-import pandas as pd
-from email_alert import send_email_alert
-import joblib
-import traceback
+from flask import Flask, Request, g, has_request_context, request, jsonify, send_file, Response, stream_with_context
+from email_alert import AlertCoalescer, AlertDispatcher
+from micro_batcher import MicroBatcher
+from model_bundle import FEATURES, frame_to_array, is_frame, load_bundle
+from stream_detector import StreamDetector
+from upload_dedup import SPOOL_MAX_SIZE, HashingSpool, UploadCache, stream_digest
+from upload_jobs import JobRunner
+from columnar_upload import extension, is_columnar, iter_chunks
+import logging_setup
+import metrics
+from metrics import stage
+from prediction_store import PredictionStore
+from prediction_encoding import FORMATS, BINARY_FORMATS, SCORE_ENCODINGS, encode_json, encode_scores, to_binary, to_labels
+import atexit
+import hmac
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
 import numpy as np
 from flask_cors import CORS
 from datetime import datetime
+from types import SimpleNamespace
+
+log = logging_setup.setup_logging().getChild("app")
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Load trained model and scaler
-try:
-    rf_model = joblib.load("seizure_model.pkl")
-    scaler = joblib.load("scaler.pkl")
-    print("✅ Model and Scaler loaded successfully.")
-except Exception as e:
-    print(f"❌ Error loading model or scaler: {e}")
-    exit(1)
+# Model loading. "eager" loads at import, which under gunicorn's
+# preload_app means once in the master before fork, so workers share the
+# pages copy-on-write (see gunicorn.conf.py). "lazy" defers loading, and
+# the scikit-learn import it drags in, to the first request in each worker.
+ENGINE = os.environ.get("NEUROGUARD_ENGINE", "flat")
+MODEL_LOAD = os.environ.get("NEUROGUARD_MODEL_LOAD", "eager")
+MODEL_MMAP = os.environ.get("NEUROGUARD_MODEL_MMAP", "0") == "1"
+# Rows per chunk when /upload?stream=1 reads the CSV incrementally
+CHUNK_ROWS = int(os.environ.get("NEUROGUARD_CHUNK_ROWS", 50_000))
+
+MODEL_PATH = os.environ.get("NEUROGUARD_MODEL_PATH", "seizure_model.pkl")
+SCALER_PATH = os.environ.get("NEUROGUARD_SCALER_PATH", "scaler.pkl")
+# Converted forest for NEUROGUARD_ENGINE=compact (see compact_model.py); unset builds it from the pickle
+COMPACT_PATH = os.environ.get("NEUROGUARD_COMPACT_PATH")
+# CSV of typical vitals that orders the trees for NEUROGUARD_ENGINE=early (see early_exit.py)
+EARLY_CALIBRATION = os.environ.get("NEUROGUARD_EARLY_CALIBRATION")
+# Poll interval for hot reload on file change; 0 leaves reloads to /admin/reload
+MODEL_WATCH_SECONDS = float(os.environ.get("NEUROGUARD_MODEL_WATCH_SECONDS", 0))
+# /admin/* answers only requests carrying this token in X-Admin-Token; unset disables them
+ADMIN_TOKEN = os.environ.get("NEUROGUARD_ADMIN_TOKEN")
+# Touched by /admin/reload so every worker's watcher reloads, not just the one that got the request
+RELOAD_STAMP = os.environ.get("NEUROGUARD_RELOAD_STAMP", os.path.join(tempfile.gettempdir(), "neuroguard-reload"))
+# Rows kept in the per-model prediction cache; 0 disables it
+CACHE_SIZE = int(os.environ.get("NEUROGUARD_CACHE_SIZE", 0))
+# Per-stage timings of each request in a Server-Timing response header
+SERVER_TIMING = os.environ.get("NEUROGUARD_SERVER_TIMING", "0") == "1"
+# Worker processes for large batches (see inference_pool.py); 0 predicts in-process
+INFERENCE_PROCESSES = int(os.environ.get("NEUROGUARD_INFERENCE_PROCESSES", 0))
+# Megabytes of /upload results kept by content hash (see upload_dedup.py); 0 disables it
+UPLOAD_CACHE_MB = float(os.environ.get("NEUROGUARD_UPLOAD_CACHE_MB", 0))
+# /upload?async=1 jobs: shared by every worker that should answer /jobs/<id>
+JOB_DIR = os.environ.get("NEUROGUARD_JOB_DIR", os.path.join(tempfile.gettempdir(), "neuroguard-jobs"))
+# SQLite file for per-patient prediction history (see prediction_store.py); unset keeps nothing
+STORE_PATH = os.environ.get("NEUROGUARD_STORE_PATH")
+
+
+class HashingRequest(Request):
+    """Hashes uploaded files while the multipart parser spools them."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpool(max_size=SPOOL_MAX_SIZE, mode="rb+")
+
+
+upload_cache = None
+if UPLOAD_CACHE_MB > 0:
+    upload_cache = UploadCache(int(UPLOAD_CACHE_MB * 1024 * 1024))
+    app.request_class = HashingRequest
+
+prediction_store = None
+if STORE_PATH:
+    prediction_store = PredictionStore(
+        STORE_PATH,
+        flush_ms=float(os.environ.get("NEUROGUARD_STORE_FLUSH_MS", 200)),
+        max_queue=int(os.environ.get("NEUROGUARD_STORE_QUEUE", 10_000)),
+    )
+
+
+class ModelRegistry:
+    """Holds the serving ModelBundle and swaps in new versions without a restart.
+
+    A reload builds the new bundle off to the side (load, compile, canary
+    check) and then replaces the reference in one assignment. Handlers take
+    `current()` once per request and keep that bundle to the end, so
+    in-flight requests finish on the version they started with, and a
+    failed reload leaves the old version serving.
+
+    The optional watcher polls the files' mtime and size and reloads once a
+    change has been stable for a full poll interval, so a half-written file
+    is not picked up. Replacing the files with os.replace avoids that window
+    altogether. Files that failed to load are not retried by the watcher
+    until they change again (an explicit reload() still tries). Each process runs its own watcher, started by its first
+    `current()` call with watch=True: under gunicorn's preload_app the
+    master only loads the model, and every forked worker starts a watcher
+    for itself. `reload_stamp`, if given, is watched along with the model
+    files; `announce_reload` touches it so a reload reaches every worker.
+    Without a watcher (watch_seconds=0) a reload only swaps the bundle of
+    the process that ran it.
+    """
+
+    def __init__(self, model_path, scaler_path, engine, mmap=False, watch_seconds=0, cache_size=0,
+                 processes=0, compact_path=None, calibration_path=None, reload_stamp=None):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.compact_path = compact_path if engine == "compact" else None
+        self.calibration_path = calibration_path if engine == "early" else None
+        self.engine = engine
+        self.mmap = mmap
+        self.cache_size = cache_size
+        self.processes = processes
+        self.watch_seconds = watch_seconds
+        self.reload_stamp = reload_stamp
+        self.last_reload = {"status": "never"}
+        self._bundle = None
+        self._stamp = None
+        self._failed_stamp = None
+        self._load_lock = threading.Lock()
+        self._watcher_pid = None
+
+    def _load(self):
+        return load_bundle(self.model_path, self.scaler_path, self.engine, self.mmap,
+                           self.cache_size, self.processes, self.compact_path, self.calibration_path)
+
+    @property
+    def loaded(self):
+        return self._bundle is not None
+
+    def _file_stamp(self):
+        # A compact file replaces the pickles, which are then not read at all
+        paths = (self.compact_path,) if self.compact_path else (self.model_path, self.scaler_path)
+        stats = [os.stat(p) for p in paths]
+        stamp = tuple((st.st_mtime_ns, st.st_size) for st in stats)
+        if self.reload_stamp:
+            try:
+                stamp += (os.stat(self.reload_stamp).st_mtime_ns,)
+            except FileNotFoundError:
+                stamp += (None,)
+        return stamp
+
+    def current(self, watch=True):
+        bundle = self._bundle
+        if bundle is None:
+            with self._load_lock:
+                if self._bundle is None:
+                    try:
+                        self._stamp = self._file_stamp()
+                        self._bundle = self._load()
+                    except Exception as e:
+                        log.error("❌ Error loading model or scaler: %s", e)
+                        raise
+                bundle = self._bundle
+        if watch and self.watch_seconds > 0 and self._watcher_pid != os.getpid():
+            self._start_watcher()
+        return bundle
+
+    def reload(self):
+        """Load, validate and swap in the model files; returns the new bundle or raises."""
+        with self._load_lock:
+            old = self._bundle
+            started = time.time()
+            stamp = None
+            try:
+                stamp = self._file_stamp()
+                bundle = self._load()
+            except Exception as e:
+                self._failed_stamp = stamp
+                self.last_reload = {"status": "failed", "error": str(e), "at": started}
+                log.error("❌ Model reload failed: %s", e, extra={"serving": old.version if old else None})
+                raise
+            self._bundle = bundle
+            self._stamp = stamp
+            self.last_reload = {"status": "ok", "version": bundle.version,
+                                "previous": old.version if old else None, "at": started}
+            log.info("🔄 Model swapped", extra={"previous": self.last_reload["previous"], "version": bundle.version})
+            return bundle
+
+    def announce_reload(self):
+        """Touch the reload stamp so every other watching worker reloads too."""
+        if self.reload_stamp:
+            with open(self.reload_stamp, "a"):
+                os.utime(self.reload_stamp)
+
+    def reload_async(self):
+        thread = threading.Thread(target=self._reload_quietly, name="model-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def _reload_quietly(self):
+        try:
+            self.reload()
+        except Exception:
+            pass
+
+    def _start_watcher(self):
+        # Keyed by pid: a forked worker inherits the attribute but not the thread
+        with self._load_lock:
+            if self._watcher_pid != os.getpid():
+                threading.Thread(target=self._watch, name="model-watcher", daemon=True).start()
+                self._watcher_pid = os.getpid()
+
+    def _watch(self):
+        seen = self._stamp
+        while True:
+            time.sleep(self.watch_seconds)
+            try:
+                stamp = self._file_stamp()
+            except OSError:
+                continue  # mid-replace; try again next tick
+            if stamp != self._stamp and stamp != self._failed_stamp and stamp == seen:
+                self._reload_quietly()
+            seen = stamp
+
+
+registry = ModelRegistry(MODEL_PATH, SCALER_PATH, ENGINE, mmap=MODEL_MMAP,
+                         watch_seconds=MODEL_WATCH_SECONDS, cache_size=CACHE_SIZE,
+                         processes=INFERENCE_PROCESSES, compact_path=COMPACT_PATH,
+                         calibration_path=EARLY_CALIBRATION, reload_stamp=RELOAD_STAMP)
+
+
+def get_bundle():
+    return registry.current()
+
+
+# Small requests (a device posting one row a second) are pooled into one
+# predict call across concurrent requests when a wait budget is configured.
+MICROBATCH_MS = float(os.environ.get("NEUROGUARD_MICROBATCH_MS", 0))
+micro_batcher = MicroBatcher(
+    max_wait_ms=MICROBATCH_MS,
+    max_rows=int(os.environ.get("NEUROGUARD_MICROBATCH_ROWS", 256)),
+) if MICROBATCH_MS > 0 else None
+
+
+def predict_request(data, bundle):
+    """bundle.predict for request payloads, routed through the micro-batcher when small enough."""
+    if micro_batcher is None or len(data) >= micro_batcher.max_rows:
+        return bundle.predict(data)
+    if is_frame(data):
+        data = frame_to_array(data)
+    return micro_batcher.predict(bundle, data)
+
+
+def parse_vitals(payload):
+    """Float64 (n, 4) array from a JSON array of rows or a {feature: [values]} object."""
+    if isinstance(payload, dict):
+        missing = [f for f in FEATURES if f not in payload]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+        X = np.column_stack([np.asarray(payload[f], dtype=np.float64) for f in FEATURES])
+    else:
+        X = np.asarray(payload, dtype=np.float64)
+        if X.size == 0:
+            X = X.reshape(0, len(FEATURES))
+    if X.ndim != 2 or X.shape[1] != len(FEATURES):
+        raise ValueError(f"Expected rows of {len(FEATURES)} features {FEATURES}, got shape {X.shape}")
+    if not np.isfinite(X).all():
+        raise ValueError("Vitals must be finite numbers")
+    return X
+
+
+def wants_octet_stream(accept=None):
+    accept = request.accept_mimetypes if accept is None else accept
+    best = accept.best_match(["application/json", "application/octet-stream"])
+    return best == "application/octet-stream"
+
+
+def response_format(args=None, accept=None):
+    """Encoding from ?format=, else bytes for octet-stream clients, else labels.
+
+    `args` and `accept` default to Flask's request; asgi_app.py passes its own.
+    """
+    args = request.args if args is None else args
+    fmt = args.get("format")
+    if fmt is None:
+        fmt = "bytes" if wants_octet_stream(accept) else "labels"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {list(FORMATS)}")
+    return fmt
+
+
+def score_options(args=None):
+    """(encoding, threshold) from ?scores= and ?threshold=; encoding is None without scores."""
+    args = request.args if args is None else args
+    encoding = args.get("scores", "0")
+    if encoding in ("0", ""):
+        encoding = None
+    elif encoding == "1":
+        encoding = "json"
+    elif encoding not in SCORE_ENCODINGS:
+        raise ValueError(f"Unknown scores encoding '{encoding}', expected one of {list(SCORE_ENCODINGS)}")
+    threshold = args.get("threshold")
+    if threshold is not None:
+        threshold = float(threshold)
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError("threshold must be between 0 and 1")
+    if ENGINE == "compact" and (encoding is not None or threshold is not None):
+        # Its leaves hold only the winning class, so there is no probability to report
+        raise ValueError("scores and threshold are not available with the compact engine")
+    return encoding, threshold
+
+
+def predict_scored(data, bundle, scoring):
+    """(labels, (probability, votes) or None) for one batch under the request's score options."""
+    encoding, threshold = scoring
+    if encoding is None and threshold is None:
+        return bundle.predict(data), None
+    y_pred, probability, votes = bundle.predict_scores(data, threshold)
+    return y_pred, (probability, votes) if encoding else None
+
+
+def render_predictions(y_pred, fmt, scores=None, scoring=(None, None)):
+    with stage("encode"):
+        if scores is not None:
+            return jsonify({**encode_json(y_pred, fmt), "scores": encode_scores(*scores, scoring[0])})
+        if fmt in BINARY_FORMATS and wants_octet_stream():
+            return Response(to_binary(y_pred, fmt), mimetype="application/octet-stream",
+                            headers={"X-Rows": str(len(y_pred)), "X-Encoding": fmt})
+        return jsonify(encode_json(y_pred, fmt))
+
+
+def recording_options(values=None):
+    """(user, recorded_at, interval) from ?user=, ?recorded_at= (epoch s or ISO 8601) and ?sample_hz=, or None.
+
+    Predictions are only stored for requests naming a user. `values`
+    defaults to Flask's request.values (query string and form fields).
+    """
+    values = request.values if values is None else values
+    user = values.get("user")
+    if prediction_store is None or not user:
+        return None
+    recorded_at = values.get("recorded_at")
+    recorded_at = parse_time(recorded_at) if recorded_at else None
+    sample_hz = float(values.get("sample_hz") or 0)
+    if sample_hz < 0:
+        raise ValueError("sample_hz must not be negative")
+    return user, recorded_at, 1.0 / sample_hz if sample_hz else 0.0
+
+
+def prediction_recorder(recording, bundle):
+    """Callable (X, y_pred) storing the request's rows, or None when nothing is recorded."""
+    if recording is None:
+        return None
+    user, recorded_at, interval = recording
+    return prediction_store.recorder(user, bundle.version, recorded_at, interval)
+
+
+def stream_predictions(first, chunks, fmt, bundle, scoring=(None, None), record=None):
+    """Yield one NDJSON line per CSV chunk, then a summary line."""
+    rows = seizures = 0
+    start = time.perf_counter()
+    try:
+        while first is not None:
+            if len(first):
+                y_pred, scores = predict_scored(first, bundle, scoring)
+                seizures += int((y_pred == 1).sum())
+                if record is not None:
+                    record(first, y_pred)
+                line = {"offset": rows, **encode_json(y_pred, fmt, rows)}
+                if scores is not None:
+                    line["scores"] = encode_scores(*scores, scoring[0])
+                yield json.dumps(line) + "\n"
+                rows += len(first)
+            with stage("read_chunk"):
+                first = next(chunks, None)
+        yield json.dumps({"rows": rows}) + "\n"
+        # The response outlives the request hooks, so the summary is logged here
+        log.info("🧠 Prediction streamed", extra={"rows": rows, "seizures": seizures, "format": fmt,
+                                                  "ms": round((time.perf_counter() - start) * 1e3, 3)})
+    except Exception as e:
+        log.exception("❌ Streaming error", extra={"offset": rows})
+        yield json.dumps({"error": str(e), "offset": rows}) + "\n"
+
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    print("\n📂 File upload received!")
+    log.debug("📂 File upload received")
 
-    if 'file' not in request.files:
+    with stage("multipart"):
+        files = request.files
+    if 'file' not in files:
         return jsonify({"error": "No file provided"}), 400
 
-    file = request.files['file']
+    file = files['file']
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
     try:
-        data = pd.read_csv(file)
-        print("\n🟢 Uploaded Data:\n", data.head())
+        fmt = response_format()
+        scoring = score_options()
+        recording = recording_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # One model version for the whole request, even if a reload lands mid-way
+    try:
+        bundle = get_bundle()
+    except Exception as e:
+        return jsonify({"error": f"Model unavailable: {e}"}), 503
 
-        expected = scaler.n_features_in_
+    if request.args.get("async") == "1":
+        body, status = submit_job(file.filename, file.stream, bundle, prediction_recorder(recording, bundle))
+        return jsonify(body), status
+
+    cache_key = None
+    if uses_upload_cache(scoring, recording, request.args.get("stream") == "1"):
+        cache_key = upload_cache_key(file.filename, file.stream, bundle, recording)
+        y_pred = upload_cache.get(cache_key)
+        if y_pred is not None:
+            log_prediction(y_pred, fmt)
+            return render_predictions(y_pred, fmt)
+
+    record = prediction_recorder(recording, bundle)
+    if is_columnar(file.filename):
+        return upload_columnar(file, fmt, bundle, scoring, cache_key, record)
+
+    if request.args.get("stream") == "1":
+        return upload_stream(file, fmt, bundle, scoring, record)
+
+    try:
+        import pandas as pd
+
+        with stage("read_csv"):
+            data = pd.read_csv(file)
+        if logging_setup.sampled():
+            log.info("🟢 Uploaded data", extra={"rows": len(data), "head": data.head().to_dict("records")})
+
+        expected = len(FEATURES)
         if data.shape[1] != expected:
             return jsonify({"error": f"Expected {expected} features, got {data.shape[1]}"}), 400
 
-        X_scaled = scaler.transform(data)
-        y_pred = rf_model.predict(X_scaled)
+        if scoring == (None, None):
+            y_pred, scores = predict_request(data, bundle), None
+        else:
+            y_pred, scores = predict_scored(data, bundle, scoring)
+        if cache_key is not None:
+            upload_cache.put(cache_key, y_pred)
+        if record is not None:
+            record(data, y_pred)
+        log_prediction(y_pred, fmt)
+        return render_predictions(y_pred, fmt, scores, scoring)
+
+    except Exception as e:
+        log.exception("❌ Processing error")
+        return jsonify({"error": str(e)}), 500
+
+
+def log_prediction(y_pred, fmt):
+    """Summarise a prediction (rows, seizures) for the log; never the labels themselves.
+
+    Inside a Flask request the summary waits for finish_timing, which logs
+    it once together with the request's total and stage timings.
+    """
+    summary = {"rows": len(y_pred), "seizures": int((y_pred == 1).sum()), "format": fmt}
+    if logging_setup.sampled():
+        summary["head"] = to_labels(y_pred[:10])
+    if has_request_context():
+        g.prediction_summary = summary
+    else:
+        log.info("🧠 Prediction", extra=summary)
+
+
+def predict_chunks(first, chunks, bundle, scoring, record=None):
+    """predict_scored over `first` and the rest of `chunks`, concatenated."""
+    parts = []
+    while first is not None:
+        parts.append(predict_scored(first, bundle, scoring))
+        if record is not None:
+            record(first, parts[-1][0])
+        with stage("read_chunk"):
+            first = next(chunks, None)
+    y_pred = np.concatenate([y for y, _ in parts]) if parts else np.empty(0, dtype=np.int64)
+    scores = None
+    if scoring[0] is not None:
+        scores = tuple(np.concatenate([s[i] for _, s in parts]) if parts else np.empty(0) for i in (0, 1))
+    return y_pred, scores
 
-        result = ["Seizure Detected" if p == 1 else "No Seizure Detected" for p in y_pred]
-        print("\n🧠 Prediction:", result)
 
-        # Removed Supabase DB insert
-        return jsonify({"predictions": result})
+def uses_upload_cache(scoring, recording, stream):
+    """Whether an /upload may be answered from (and fill) upload_cache.
 
+    A recorded upload is only a retry when it names its time: without
+    ?recorded_at= the same rows sent again are new readings that must be
+    stored, so they are predicted and recorded like any other upload.
+    """
+    if upload_cache is None or scoring != (None, None) or stream:
+        return False
+    return recording is None or recording[1] is not None
+
+
+def upload_cache_key(filename, stream, bundle, recording=None):
+    """upload_cache key: the same bytes under another model or file type are a different upload.
+
+    The recording options are part of it too: a retry with the same
+    ?recorded_at= is not stored twice, but the same file uploaded for
+    another user or time is.
+    """
+    kind = extension(filename) if is_columnar(filename) else ".csv"
+    with stage("digest"):
+        return (bundle.version, kind, stream_digest(stream), recording)
+
+
+def upload_columnar(file, fmt, bundle, scoring, cache_key=None, record=None):
+    """/upload for .npy/.npz/Arrow/Parquet files, predicted CHUNK_ROWS rows at a time.
+
+    The file is memory-mapped where the format allows it, so only the chunk
+    being predicted is materialised as a float64 matrix.
+    """
+    chunks = iter_chunks(file, FEATURES, CHUNK_ROWS)
+    try:
+        with stage("read_chunk"):
+            first = next(chunks, None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print("\n❌ Processing error:", traceback.format_exc())
+        log.exception("❌ Processing error")
         return jsonify({"error": str(e)}), 500
 
+    if request.args.get("stream") == "1":
+        return Response(stream_with_context(stream_predictions(first, chunks, fmt, bundle, scoring, record)),
+                        mimetype="application/x-ndjson")
+
+    try:
+        y_pred, scores = predict_chunks(first, chunks, bundle, scoring, record)
+        if cache_key is not None:
+            upload_cache.put(cache_key, y_pred)
+        log_prediction(y_pred, fmt)
+        return render_predictions(y_pred, fmt, scores, scoring)
+    except Exception as e:
+        log.exception("❌ Processing error")
+        return jsonify({"error": str(e)}), 500
+
+
+def upload_stream(file, fmt, bundle, scoring, record=None):
+    """Read the upload CHUNK_ROWS rows at a time and stream predictions as NDJSON.
+
+    Werkzeug spools large uploads to a temp file, so with chunked parsing the
+    worker only ever holds one chunk of rows and its labels in memory.
+    """
+    try:
+        import pandas as pd
+
+        chunks = pd.read_csv(file, chunksize=CHUNK_ROWS)
+        with stage("read_chunk"):
+            first = next(chunks, None)
+    except Exception as e:
+        log.exception("❌ Processing error")
+        return jsonify({"error": str(e)}), 500
+
+    if first is not None:
+        if logging_setup.sampled():
+            log.info("🟢 Uploaded data (first chunk)",
+                     extra={"rows": len(first), "head": first.head().to_dict("records")})
+        expected = len(FEATURES)
+        if first.shape[1] != expected:
+            return jsonify({"error": f"Expected {expected} features, got {first.shape[1]}"}), 400
+
+    return Response(stream_with_context(stream_predictions(first, chunks, fmt, bundle, scoring, record)),
+                    mimetype="application/x-ndjson")
+
+@app.route('/predict', methods=['POST'])
+def predict_json():
+    """Batch prediction for vitals already in memory, with no CSV or pandas in the path."""
+    with stage("parse"):
+        payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({"error": "Expected a JSON array of rows or an object of feature columns"}), 400
+
+    try:
+        fmt = response_format()
+        scoring = score_options()
+        recording = recording_options(request.args)
+        with stage("parse"):
+            X = parse_vitals(payload)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        bundle = get_bundle()
+        scores = None
+        if scoring != (None, None):
+            y_pred, scores = predict_scored(X, bundle, scoring)
+        elif len(X):
+            y_pred = predict_request(X, bundle)
+        else:
+            y_pred = np.empty(0, dtype=np.int64)
+        record = prediction_recorder(recording, bundle)
+        if record is not None:
+            record(X, y_pred)
+        log_prediction(y_pred, fmt)
+        return render_predictions(y_pred, fmt, scores, scoring)
+    except Exception as e:
+        log.exception("❌ Processing error")
+        return jsonify({"error": str(e)}), 500
+
+# Sliding-window state per wearable, bounded to NEUROGUARD_STREAM_DEVICES slots
+stream_detector = StreamDetector(
+    FEATURES,
+    window=int(os.environ.get("NEUROGUARD_STREAM_WINDOW", 30)),
+    max_devices=int(os.environ.get("NEUROGUARD_STREAM_DEVICES", 100_000)),
+    seizure_fraction=float(os.environ.get("NEUROGUARD_STREAM_SEIZURE_FRACTION", 0.5)),
+    min_samples=int(os.environ.get("NEUROGUARD_STREAM_MIN_SAMPLES", 5)),
+)
+# Windows live in this process only: with several workers a device's samples
+# would land in unrelated windows and the seizure fraction would be wrong, so
+# /stream refuses to run unless there is a single worker.
+STREAM_WORKERS = int(os.environ.get("WEB_CONCURRENCY", 1))
+if STREAM_WORKERS > 1:
+    log.warning("⚠️ /stream disabled: it needs a single worker", extra={"workers": STREAM_WORKERS})
+
+@app.route('/stream', methods=['POST'])
+def stream_ingest():
+    """Push vitals for one or more devices and get back each device's window state.
+
+    Body: {"device": id, "samples": [[hr, temp, spo2, vib], ...]} or a list
+    of such objects. All samples in the request are predicted in one call.
+    Window state is per process, so this needs WEB_CONCURRENCY=1.
+    """
+    if STREAM_WORKERS > 1:
+        return jsonify({"error": "Streaming needs a single worker (WEB_CONCURRENCY=1)"}), 503
+    payload = request.get_json(silent=True)
+    entries = payload if isinstance(payload, list) else [payload]
+    devices, blocks = [], []
+    try:
+        for entry in entries:
+            if not isinstance(entry, dict) or "device" not in entry or "samples" not in entry:
+                raise ValueError('Each entry needs "device" and "samples"')
+            X = parse_vitals(entry["samples"])
+            devices += [str(entry["device"])] * len(X)
+            blocks.append(X)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not blocks:
+        return jsonify({"devices": {}})
+
+    try:
+        X = np.concatenate(blocks)
+        bundle = get_bundle()
+        y_pred = predict_request(X, bundle) if len(X) else np.empty(0, dtype=np.int64)
+        return jsonify({"devices": stream_detector.ingest(devices, X, y_pred)})
+    except Exception as e:
+        log.exception("❌ Stream processing error")
+        return jsonify({"error": str(e)}), 500
+
+def job_chunks(stream, filename):
+    """Row chunks of a job's upload file, CSV or columnar, CHUNK_ROWS at a time."""
+    if is_columnar(filename):
+        yield from iter_chunks(SimpleNamespace(filename=filename, stream=stream), FEATURES, CHUNK_ROWS)
+        return
+    import pandas as pd
+
+    for chunk in pd.read_csv(stream, chunksize=CHUNK_ROWS):
+        if chunk.shape[1] != len(FEATURES):
+            raise ValueError(f"Expected {len(FEATURES)} features, got {chunk.shape[1]}")
+        yield chunk
+
+
+# Large uploads handed off with ?async=1 are predicted by these threads
+job_runner = JobRunner(
+    JOB_DIR,
+    job_chunks,
+    workers=int(os.environ.get("NEUROGUARD_JOB_WORKERS", 1)),
+    max_queue=int(os.environ.get("NEUROGUARD_JOB_QUEUE", 100)),
+    ttl_seconds=float(os.environ.get("NEUROGUARD_JOB_TTL_SECONDS", 3600)),
+    # Columnar files are read through an mmap, so only CSV reads advance the stream
+    byte_progress=lambda filename: not is_columnar(filename),
+)
+
+
+def submit_job(filename, stream, bundle, record=None):
+    """Queue an upload as a background job; returns (body, status)."""
+    try:
+        job_id = job_runner.submit(filename, stream, bundle, record)
+    except queue.Full:
+        log.error("❌ Job queue full, upload not queued")
+        return {"error": "Job queue full, try again"}, 503
+    log.info("📂 Upload job queued", extra={"job": job_id})
+    return {"job": job_id, "status": "queued", "status_url": f"/jobs/{job_id}",
+            "result_url": f"/jobs/{job_id}/result"}, 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = job_runner.status(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(status)
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Labels of a finished job.
+
+    Without ?start/?stop the whole bit-packed file is sent (8 rows per byte,
+    see prediction_encoding "bits"), with HTTP Range support. ?start=&stop=
+    selects rows instead and returns them in the requested format.
+    """
+    status = job_runner.status(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    if status["status"] != "done":
+        return jsonify({"error": f"Job is {status['status']}", "job": status}), 409
+
+    rows = status["rows"]
+    if "start" not in request.args and "stop" not in request.args:
+        response = send_file(job_runner.result_path(job_id), mimetype="application/octet-stream",
+                             conditional=True, max_age=0)
+        response.headers["X-Rows"] = str(rows)
+        response.headers["X-Encoding"] = "bits"
+        return response
+
+    try:
+        fmt = response_format()
+        start = int(request.args.get("start", 0))
+        stop = int(request.args.get("stop", rows))
+        if not 0 <= start <= stop <= rows:
+            raise ValueError(f"Need 0 <= start <= stop <= {rows}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    y_pred = job_runner.read_labels(job_id, start, stop)
+    if fmt in BINARY_FORMATS and wants_octet_stream():
+        return Response(to_binary(y_pred, fmt), mimetype="application/octet-stream",
+                        headers={"X-Rows": str(len(y_pred)), "X-Offset": str(start), "X-Encoding": fmt})
+    return jsonify({"offset": start, **encode_json(y_pred, fmt, start)})
+
+
+def parse_time(value):
+    """Epoch seconds from a number or an ISO 8601 string (naive means local time)."""
+    try:
+        seconds = float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+    if not np.isfinite(seconds):
+        raise ValueError(f"Time must be finite, got {value}")
+    return seconds
+
+
+@app.route('/history', methods=['GET'])
+def history():
+    """Stored predictions of ?user= between ?from= and ?to= (epoch seconds or ISO 8601, inclusive).
+
+    Labels come back in ?format= like /upload; timestamps as segments of
+    evenly spaced rows ({"offset", "start", "interval", "rows"}), and the
+    vitals themselves only with ?vitals=1, which needs the admin token
+    since a user name is all it takes to ask.
+    """
+    if prediction_store is None:
+        return jsonify({"error": "Prediction history is not enabled"}), 404
+    user = request.args.get("user")
+    if not user:
+        return jsonify({"error": "user is required"}), 400
+    try:
+        fmt = response_format()
+        start = parse_time(request.args["from"]) if request.args.get("from") else None
+        end = parse_time(request.args["to"]) if request.args.get("to") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with_vitals = request.args.get("vitals") == "1"
+    if with_vitals and not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    with stage("history"):
+        found = prediction_store.history(user, start, end, with_vitals)
+    with stage("encode"):
+        body = {"user": user, "from": start, "to": end, "rows": len(found),
+                "seizures": int(found.labels.sum()), "segments": found.segments, **encode_json(found.labels, fmt)}
+        if with_vitals:
+            body["vitals"] = found.vitals.tolist()
+        return jsonify(body)
+
+
+@app.route('/stream/<device>', methods=['GET'])
+def stream_state(device):
+    if STREAM_WORKERS > 1:
+        return jsonify({"error": "Streaming needs a single worker (WEB_CONCURRENCY=1)"}), 503
+    summary = stream_detector.summary(device)
+    if summary is None:
+        return jsonify({"error": f"Unknown device {device}"}), 404
+    return jsonify({"device": device, **summary})
+
+# Emergency emails go out from background workers over pooled SMTP connections
+alert_dispatcher = AlertDispatcher(
+    workers=int(os.environ.get("NEUROGUARD_ALERT_WORKERS", 2)),
+    max_queue=int(os.environ.get("NEUROGUARD_ALERT_QUEUE", 1000)),
+    idle_timeout=float(os.environ.get("NEUROGUARD_SMTP_IDLE_SECONDS", 60)),
+)
+# Repeated alerts for the same (user, doctor) inside the window become one email
+alert_coalescer = AlertCoalescer(
+    alert_dispatcher.submit,
+    window=float(os.environ.get("NEUROGUARD_ALERT_WINDOW_SECONDS", 30)),
+)
+# How long a stopping worker waits for queued emails to go out; keep it under
+# gunicorn's graceful_timeout
+ALERT_DRAIN_SECONDS = float(os.environ.get("NEUROGUARD_ALERT_DRAIN_SECONDS", 10))
+_alerts_pid = None
+_alerts_lock = threading.Lock()
+
+
+def _watch_alerts():
+    # Registered on the first alert in each process, after the log listener's
+    # own atexit hook, so this runs (and logs) before the listener stops
+    global _alerts_pid
+    if _alerts_pid == os.getpid():
+        return
+    with _alerts_lock:
+        if _alerts_pid != os.getpid():
+            _alerts_pid = os.getpid()
+            atexit.register(shutdown_alerts)
+
+
+def shutdown_alerts():
+    """Flush open coalescing windows into the queue, then drain it (bounded wait).
+
+    Called from gunicorn's worker_exit hook and at exit; only the first call
+    in a process that sent alerts does anything.
+    """
+    global _alerts_pid
+    with _alerts_lock:
+        if _alerts_pid != os.getpid():
+            return
+        _alerts_pid = None
+    flushed = alert_coalescer.close()
+    left = alert_dispatcher.shutdown(timeout=ALERT_DRAIN_SECONDS)
+    log.info("📭 Alerts shut down", extra={"flushed": flushed, "unsent": left,
+                                         "sent": alert_dispatcher.sent, "failed": alert_dispatcher.failed})
+
 @app.route('/emergency', methods=['POST'])
 def emergency_alert():
-    data = request.get_json()
+    body, status = handle_emergency(request.get_json())
+    return jsonify(body), status
+
+
+def handle_emergency(data):
+    """Queue (or coalesce) the alert email for one emergency; returns (body, status)."""
     user = data.get("user", "Unknown")
     lat = data.get("lat")
     lon = data.get("lon")
@@ -64,29 +850,125 @@ def emergency_alert():
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     maps_link = f"https://www.google.com/maps?q={lat},{lon}"
 
-    print(f"\n🚨 Emergency Alert Received!")
-    print(f"👤 User: {user}")
-    print(f"📍 Location: Latitude={lat}, Longitude={lon}")
-    print(f"✉️ Doctor Email: {doctor_email}")
-    print(f"📨 Sender Email: {sender_email}")
-    print(f"🕒 Time: {timestamp}")
-    print(f"🌍 Maps Link: {maps_link}")
+    log.warning("🚨 Emergency alert received", extra={"user": user, "lat": lat, "lon": lon,
+                                                      "doctor_email": doctor_email, "time": timestamp})
 
-    # 🔔 Send email using user's credentials
-    send_email_alert(user, maps_link, doctor_email, sender_email, sender_password)
+    # 🔔 Queue email using user's credentials; a worker sends it
+    _watch_alerts()
+    try:
+        alert_state = alert_coalescer.submit(user, maps_link, doctor_email, sender_email, sender_password)
+    except queue.Full:
+        log.error("❌ Alert queue full, email not queued", extra={"user": user})
+        return {"error": "Alert queue full, try again"}, 503
 
-    return jsonify({
+    return {
         "status": "Emergency Received",
+        "alert": "queued" if alert_state == "sent" else "coalesced",
         "location": {"lat": lat, "lon": lon},
         "time": timestamp,
         "maps_link": maps_link
+    }, 200
+
+@app.before_request
+def start_timing():
+    # One g attribute for the whole request: every g / request access goes
+    # through a LocalProxy, which is a measurable share of a 1-row /predict
+    g.timing = (metrics.begin_request(), time.perf_counter())
+
+
+@app.after_request
+def finish_timing(response):
+    timing = g.pop("timing", None)
+    if timing is None:
+        return response
+    token, start = timing
+    total = time.perf_counter() - start
+    totals = {}
+    if token is not None:
+        rule = request.url_rule
+        timings = metrics.end_request(token, rule.rule if rule else "unmatched", total)
+        if timings:
+            totals = metrics.stage_totals(timings)
+        if SERVER_TIMING:
+            response.headers["Server-Timing"] = metrics.server_timing(totals, total)
+    summary = g.pop("prediction_summary", None)
+    if summary is not None:
+        # One line per prediction request: rows, seizures, total and per-stage ms
+        stages = {f"{name}_ms": round(seconds * 1e3, 3) for name, seconds in totals.items()}
+        log.info("🧠 Prediction", extra={**summary, "ms": round(total * 1e3, 3), **stages})
+    return response
+
+
+@app.teardown_request
+def drop_timing(exc):
+    # after_request is skipped when a view raises; do not leak the timings
+    timing = g.pop("timing", None)
+    if timing is not None and timing[0] is not None:
+        metrics.end_request(timing[0], "error", time.perf_counter() - timing[1])
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """This process's histograms only: correct totals need a single worker (see metrics.py)."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "ok", "model_loaded": registry.loaded, "engine": ENGINE})
+
+
+def admin_allowed():
+    # Behind a same-host proxy every peer is loopback, so the address proves nothing
+    token = request.headers.get("X-Admin-Token")
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+@app.route('/admin/model', methods=['GET'])
+def model_info():
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    bundle = registry._bundle
+    return jsonify({
+        "version": bundle.version if bundle else None,
+        "engine": ENGINE,
+        "loaded_at": bundle.loaded_at if bundle else None,
+        "last_reload": registry.last_reload,
+        "cache": bundle.cache.stats() if bundle and bundle.cache else None,
+        "upload_cache": upload_cache.stats() if upload_cache else None,
+        "store": prediction_store.stats() if prediction_store else None,
+        "early_exit": bundle.predictor.stats() if bundle and bundle.engine == "early" else None,
     })
 
-# Optional model sanity test
-test_data = np.array([[60, 36.5, 98, 0.1]])
-test_scaled = scaler.transform(test_data)
-test_pred = rf_model.predict(test_scaled)
-print("\n🔍 Test Prediction (Normal Input):", test_pred)
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_model():
+    """Reload the model files in every worker; ?wait=1 also reports this worker's outcome.
+
+    Other workers pick the reload up through RELOAD_STAMP within one watch
+    interval, so it only reaches them when NEUROGUARD_MODEL_WATCH_SECONDS
+    is set; otherwise only the worker handling this request swaps.
+    """
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if request.args.get("wait") != "1":
+        registry.announce_reload()
+        registry.reload_async()
+        return jsonify({"status": "reloading"}), 202
+    registry.announce_reload()
+    try:
+        bundle = registry.reload()
+    except Exception as e:
+        return jsonify({"status": "failed", "error": str(e)}), 422
+    return jsonify({"status": "ok", "version": bundle.version})
+
+# The canary prediction runs inside load_bundle. No watcher here: under
+# preload_app this is the gunicorn master, and each worker starts its own.
+if MODEL_LOAD == "eager":
+    try:
+        registry.current(watch=False)
+    except Exception:
+        exit(1)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
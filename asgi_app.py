@@ -0,0 +1,152 @@
+"""ASGI variant of /upload and /emergency, served with e.g.
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+Starlette (plus python-multipart for form parsing and a2wsgi to mount the
+Flask app) is only needed for this module; the Flask app in app.py is
+unchanged and still runs under gunicorn.
+
+Nothing here blocks the event loop: the multipart body is read and spooled
+asynchronously, CSV/columnar parsing and inference run on the threadpool,
+and /emergency only queues the email, whose SMTP conversation happens on
+the AlertDispatcher's workers exactly as in the Flask app. Every other
+route (/predict, /stream, /admin/...) is the Flask app mounted underneath.
+"""
+import logging
+from types import SimpleNamespace
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+import app as wsgi
+from columnar_upload import is_columnar, iter_chunks
+from model_bundle import FEATURES
+from prediction_encoding import BINARY_FORMATS, encode_json, encode_scores, to_binary
+
+log = logging.getLogger("neuroguard.asgi")
+
+
+def render(y_pred, fmt, scores, scoring, octet_stream):
+    if scores is not None:
+        return JSONResponse({**encode_json(y_pred, fmt), "scores": encode_scores(*scores, scoring[0])})
+    if fmt in BINARY_FORMATS and octet_stream:
+        return Response(to_binary(y_pred, fmt), media_type="application/octet-stream",
+                        headers={"X-Rows": str(len(y_pred)), "X-Encoding": fmt})
+    return JSONResponse(encode_json(y_pred, fmt))
+
+
+def predict_csv(stream, bundle, scoring, record=None):
+    import pandas as pd
+
+    data = pd.read_csv(stream)
+    if data.shape[1] != len(FEATURES):
+        raise ValueError(f"Expected {len(FEATURES)} features, got {data.shape[1]}")
+    y_pred, scores = wsgi.predict_scored(data, bundle, scoring)
+    if record is not None:
+        record(data, y_pred)
+    return y_pred, scores
+
+
+def open_csv_chunks(stream):
+    import pandas as pd
+
+    chunks = pd.read_csv(stream, chunksize=wsgi.CHUNK_ROWS)
+    first = next(chunks, None)
+    if first is not None and first.shape[1] != len(FEATURES):
+        raise ValueError(f"Expected {len(FEATURES)} features, got {first.shape[1]}")
+    return first, chunks
+
+
+async def upload_file(request):
+    log.debug("📂 File upload received")
+    form = await request.form()
+    file = form.get("file")
+    if file is None or isinstance(file, str):
+        return JSONResponse({"error": "No file provided"}, 400)
+    if not file.filename:
+        return JSONResponse({"error": "No selected file"}, 400)
+
+    accept = parse_accept_header(request.headers.get("accept"), MIMEAccept)
+    octet_stream = wsgi.wants_octet_stream(accept)
+    try:
+        fmt = wsgi.response_format(request.query_params, accept)
+        scoring = wsgi.score_options(request.query_params)
+        fields = {key: value for key, value in form.items() if isinstance(value, str)}
+        recording = wsgi.recording_options({**request.query_params, **fields})
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+
+    try:
+        bundle = await run_in_threadpool(wsgi.get_bundle)
+    except Exception as e:
+        return JSONResponse({"error": f"Model unavailable: {e}"}, 503)
+
+    if request.query_params.get("async") == "1":
+        body, status = await run_in_threadpool(wsgi.submit_job, file.filename, file.file, bundle,
+                                               wsgi.prediction_recorder(recording, bundle))
+        return JSONResponse(body, status)
+
+    stream = request.query_params.get("stream") == "1"
+    cache_key = None
+    if wsgi.uses_upload_cache(scoring, recording, stream):
+        # Starlette spools the upload itself, so the digest costs one read pass here
+        cache_key = await run_in_threadpool(wsgi.upload_cache_key, file.filename, file.file, bundle, recording)
+        y_pred = wsgi.upload_cache.get(cache_key)
+        if y_pred is not None:
+            wsgi.log_prediction(y_pred, fmt)
+            return render(y_pred, fmt, None, scoring, octet_stream)
+
+    record = wsgi.prediction_recorder(recording, bundle)
+    try:
+        if is_columnar(file.filename):
+            chunks = iter_chunks(SimpleNamespace(filename=file.filename, stream=file.file), FEATURES, wsgi.CHUNK_ROWS)
+            first = await run_in_threadpool(next, chunks, None)
+        elif stream:
+            first, chunks = await run_in_threadpool(open_csv_chunks, file.file)
+        else:
+            y_pred, scores = await run_in_threadpool(predict_csv, file.file, bundle, scoring, record)
+            if cache_key is not None:
+                wsgi.upload_cache.put(cache_key, y_pred)
+            wsgi.log_prediction(y_pred, fmt)
+            return render(y_pred, fmt, scores, scoring, octet_stream)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    except Exception as e:
+        log.exception("❌ Processing error")
+        return JSONResponse({"error": str(e)}, 500)
+
+    if stream:
+        # A sync generator: Starlette iterates it on the threadpool
+        return StreamingResponse(wsgi.stream_predictions(first, chunks, fmt, bundle, scoring, record),
+                                 media_type="application/x-ndjson")
+    try:
+        y_pred, scores = await run_in_threadpool(wsgi.predict_chunks, first, chunks, bundle, scoring, record)
+    except Exception as e:
+        log.exception("❌ Processing error")
+        return JSONResponse({"error": str(e)}, 500)
+    if cache_key is not None:
+        wsgi.upload_cache.put(cache_key, y_pred)
+    wsgi.log_prediction(y_pred, fmt)
+    return render(y_pred, fmt, scores, scoring, octet_stream)
+
+
+async def emergency_alert(request):
+    body, status = wsgi.handle_emergency(await request.json())
+    return JSONResponse(body, status)
+
+
+app = Starlette(
+    routes=[
+        Route("/upload", upload_file, methods=["POST"]),
+        Route("/emergency", emergency_alert, methods=["POST"]),
+        Mount("/", app=WSGIMiddleware(wsgi.app)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+)
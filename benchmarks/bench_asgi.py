@@ -0,0 +1,134 @@
+"""p50/p99 latency of /upload and /emergency, Flask (gunicorn gthread) vs ASGI (uvicorn).
+
+Opens CONNECTIONS concurrent keep-alive connections from one asyncio client
+and sends REQUESTS_PER_CONNECTION requests on each. /emergency uses a
+distinct user per request so nothing is coalesced, and the emails go to a
+local SMTP sink. The ASGI run is skipped if starlette/uvicorn are missing.
+
+Run from the repo root:  python benchmarks/bench_asgi.py [connections]
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_startup import free_port  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+
+CONNECTIONS = 1000
+REQUESTS_PER_CONNECTION = 5
+BOUNDARY = "neuroguardbench"
+CSV = "heart_rate,temperature,spo2,vibration_intensity\n" + "95,39.5,88,0.7\n60,36.5,98,0.1\n" * 5
+
+
+def servers():
+    names = ["flask/gthread"]
+    if importlib.util.find_spec("starlette") and importlib.util.find_spec("uvicorn"):
+        names.append("asgi/uvicorn")
+    return names
+
+
+def server_command(name, port):
+    """(argv, extra env) for one single-process server listening on port."""
+    if name == "flask/gthread":
+        return ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                {"NEUROGUARD_BIND": f"127.0.0.1:{port}", "WEB_CONCURRENCY": "1", "NEUROGUARD_THREADS": "64"})
+    return ([sys.executable, "-m", "uvicorn", "asgi_app:app", "--port", str(port),
+             "--no-access-log", "--backlog", "2048"], {})
+
+
+def upload_request(i):
+    body = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"v.csv\"\r\n"
+            f"Content-Type: text/csv\r\n\r\n{CSV}\r\n--{BOUNDARY}--\r\n").encode()
+    return "/upload", f"multipart/form-data; boundary={BOUNDARY}", body
+
+
+def emergency_request(i):
+    body = json.dumps({"user": f"bench-{i}", "lat": 32.07, "lon": 34.78, "doctor_email": "doctor@example.com",
+                       "sender_email": "alerts@example.com", "sender_password": ""}).encode()
+    return "/emergency", "application/json", body
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def connection(port, make_request, first, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for i in range(first, first + REQUESTS_PER_CONNECTION):
+            path, ctype, body = make_request(i)
+            start = time.perf_counter()
+            writer.write(f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: {ctype}\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    except (OSError, asyncio.IncompleteReadError) as e:
+        errors.append(type(e).__name__)
+    finally:
+        writer.close()
+
+
+async def load(port, make_request, connections):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(port, make_request, c * REQUESTS_PER_CONNECTION, latencies, errors)
+                           for c in range(connections)))
+    return np.array(latencies), errors, time.perf_counter() - start
+
+
+def wait_until_up(port, proc):
+    import urllib.request
+
+    while True:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=5)
+            return
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            time.sleep(0.1)
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else CONNECTIONS
+    sink = SMTPSink().start_in_thread()
+
+    print(f"{connections} connections x {REQUESTS_PER_CONNECTION} requests")
+    print(f"{'server':<15} {'endpoint':<11} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for name in servers():
+        port = free_port()
+        command, extra_env = server_command(name, port)
+        env = {**os.environ, **extra_env, "NEUROGUARD_SMTP_HOST": "127.0.0.1", "NEUROGUARD_SMTP_PORT": str(sink.port),
+               "NEUROGUARD_SMTP_STARTTLS": "0", "NEUROGUARD_ALERT_QUEUE": "1000000"}
+        proc = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up(port, proc)
+            for endpoint, make_request in (("/upload", upload_request), ("/emergency", emergency_request)):
+                latencies, errors, elapsed = asyncio.run(load(port, make_request, connections))
+                p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+                print(f"{name:<15} {endpoint:<11} {len(latencies) / elapsed:>8.0f} {p50:>8.1f} {p99:>8.1f} "
+                      f"{latencies.max() * 1e3:>8.1f} {len(errors):>7}")
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
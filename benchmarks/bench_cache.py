@@ -0,0 +1,57 @@
+"""Prediction cache vs uncached ModelBundle.predict on device-like vitals.
+
+Wearables report integer heart rate and SpO2 and one-decimal temperature
+and vibration, so rows repeat; continuous random vitals are included as the
+worst case (every row unique). tests/test_prediction_cache.py checks that
+the cached labels match.
+
+Run from the repo root:  python benchmarks/bench_cache.py
+"""
+import os
+import sys
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_forest import best_of, random_vitals  # noqa: E402
+from model_bundle import ModelBundle  # noqa: E402
+
+BATCH_SIZES = [1, 100, 100_000]
+
+
+def device_vitals(n, seed=0):
+    X = random_vitals(n, seed)
+    X[:, 0] = np.round(X[:, 0])
+    X[:, 1] = np.round(X[:, 1], 1)
+    X[:, 2] = np.round(np.clip(X[:, 2], 0, 100))
+    X[:, 3] = np.round(X[:, 3], 1)
+    return X
+
+
+def main():
+    rf_model = joblib.load("seizure_model.pkl")
+    scaler = joblib.load("scaler.pkl")
+    plain = ModelBundle(rf_model, scaler, "flat")
+
+    print(f"{'data':>10} {'batch':>8} {'unique':>8} {'plain ms':>10} {'cached ms':>10} {'speedup':>8}")
+    for name, make in (("device", device_vitals), ("random", random_vitals)):
+        for n in BATCH_SIZES:
+            X = make(n, seed=1)
+            cached = ModelBundle(rf_model, scaler, "flat", cache_size=1_000_000)
+            cached.predict(X)
+
+            repeat = 3 if n >= 100_000 else 200
+            # Warm timings: a fresh batch of the same distribution, mostly seen rows
+            Y = make(n, seed=2)
+            cached.predict(Y)
+            t_plain = best_of(lambda: plain.predict(Y), repeat)
+            t_cached = best_of(lambda: cached.predict(Y), repeat)
+            unique = len(np.unique(X, axis=0))
+            print(f"{name:>10} {n:>8} {unique:>8} {t_plain * 1e3:>10.3f} {t_cached * 1e3:>10.3f} "
+                  f"{t_plain / t_cached:>7.1f}x")
+        print(f"{'':>10} cache {cached.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Compact model format: size, load time, agreement with sklearn and predict speed.
+
+Converts seizure_model.pkl + scaler.pkl with compact_model.convert, then
+- compares the file size with the pickles,
+- times loading (joblib + FlatForest compile vs np.memmap),
+- measures the private memory of a fresh process serving the "flat" and the
+  "compact" engine (the latter reads no pickle and imports no sklearn),
+- reports how often the forest's majority vote agrees with
+  rf_model.predict(scaler.transform(X)) on synthetic and on uniform random vitals
+  (tests/test_compact_model.py checks every tree's vote against sklearn's),
+- times predict for the "flat" and "compact" bundles, and the node-array
+  walk compact forests without tables fall back to.
+
+Run from the repo root:  python benchmarks/bench_compact.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_forest import best_of  # noqa: E402
+from synthetic import vitals  # noqa: E402
+
+AGREEMENT_ROWS = 1_000_000
+BATCHES = (1, 100, 10_000, 100_000)
+
+
+def private_kib(engine, compact_path):
+    """Private (unshared) memory of a new process that loads `engine` and predicts once."""
+    script = (
+        "import numpy as np\n"
+        "from model_bundle import load_bundle\n"
+        f"bundle = load_bundle(engine={engine!r}, compact_path={compact_path!r})\n"
+        "bundle.predict(np.tile([[70.0, 36.6, 97.0, 0.1]], (10_000, 1)))\n"
+        "rollup = dict(line.split(':') for line in open('/proc/self/smaps_rollup').read().splitlines()[1:])\n"
+        "print(sum(int(rollup[k].split()[0]) for k in ('Private_Clean', 'Private_Dirty')))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return int(out.stdout.split()[-1])
+
+
+def uniform_vitals(n, seed):
+    rng = np.random.default_rng(seed)
+    low = np.array([30.0, 34.0, 70.0, 0.0])
+    high = np.array([200.0, 42.0, 100.0, 10.0])
+    return rng.uniform(low, high, size=(n, 4))
+
+
+def main():
+    import joblib
+    import pandas as pd
+
+    from compact_model import CompactForest, convert
+    from forest_engine import FlatForest
+    from model_bundle import FEATURES, load_bundle
+
+    model_path, scaler_path = (os.path.join(ROOT, name) for name in ("seizure_model.pkl", "scaler.pkl"))
+    compact_path = os.path.join(tempfile.mkdtemp(prefix="neuroguard-compact-"), "seizure_model.ngf")
+    convert(model_path, scaler_path, compact_path)
+
+    model, scaler = joblib.load(model_path), joblib.load(scaler_path)
+    compact = CompactForest.load(compact_path)
+    pickles = os.path.getsize(model_path) + os.path.getsize(scaler_path)
+    print(f"files:  pickles {pickles:,} B  compact {os.path.getsize(compact_path):,} B")
+
+    t_pickle = best_of(lambda: FlatForest.from_model(joblib.load(model_path)).fold_scaler(joblib.load(scaler_path)), 5)
+    t_mmap = best_of(lambda: CompactForest.load(compact_path), 20)
+    print(f"load:   pickle+compile {t_pickle * 1e3:.2f} ms  memmap {t_mmap * 1e3:.2f} ms")
+    for engine in ("flat", "compact"):
+        print(f"memory: {engine:>7} engine, private KiB of a fresh process after load_bundle + predict: "
+              f"{private_kib(engine, compact_path):,}")
+
+    print(f"\n{'data':>9} {'rows':>10} {'agree':>9} {'differ':>7} {'ties':>6}")
+    for name, X in (("synthetic", vitals(AGREEMENT_ROWS, devices=1000, seed=3)[0]),
+                    ("uniform", uniform_vitals(AGREEMENT_ROWS, seed=4))):
+        scaled = scaler.transform(pd.DataFrame(X, columns=FEATURES))
+        expected = model.predict(scaled)
+        votes = compact.votes(X)
+        labels = compact.predict(X)
+        differ = int((labels != expected).sum())
+        ties = int((2 * votes == compact.n_trees).sum())
+        print(f"{name:>9} {len(X):>10,} {1 - differ / len(X):>9.6f} {differ:>7} {ties:>6}")
+
+    flat_bundle = load_bundle(model_path, scaler_path, "flat")
+    compact_bundle = load_bundle(engine="compact", compact_path=compact_path)
+    X = vitals(max(BATCHES), devices=100, seed=5)[0]
+
+    print(f"\n{'rows':>8} {'flat ms':>9} {'compact ms':>11} {'compact walk ms':>16}")
+    for n in BATCHES:
+        batch = X[:n]
+        repeat = 5 if n >= 100_000 else 50
+        t_flat = best_of(lambda: flat_bundle.predict(batch), repeat)
+        t_compact = best_of(lambda: compact_bundle.predict(batch), repeat)
+        t_walk = best_of(lambda: compact._votes_walk(batch), repeat)
+        print(f"{n:>8} {t_flat * 1e3:>9.3f} {t_compact * 1e3:>11.3f} {t_walk * 1e3:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
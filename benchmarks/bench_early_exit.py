@@ -0,0 +1,62 @@
+"""Early-exit voting: trees evaluated per row and predict time.
+
+Realistic vitals come from synthetic.vitals (device baselines plus seizure
+episodes). Each EarlyExitForest is compared with the full fused forest, in
+estimator order, ordered by agreement on the canary row alone (the "early"
+engine's default) and on a separate calibration sample (different seed and
+devices). tests/test_early_exit.py checks that the labels equal
+rf_model.predict(scaler.transform(X)).
+
+Run from the repo root:  python benchmarks/bench_early_exit.py
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_forest import best_of  # noqa: E402
+from synthetic import vitals  # noqa: E402
+
+ROWS = 1_000_000
+CALIBRATION_ROWS = 20_000
+
+
+def main():
+    import joblib
+
+    from early_exit import EarlyExitForest
+    from forest_engine import FlatForest
+    from model_bundle import CANARY_ROW
+
+    model, scaler = joblib.load("seizure_model.pkl"), joblib.load("scaler.pkl")
+    fused = FlatForest.from_model(model).fold_scaler(scaler)
+    X, seizure = vitals(ROWS, devices=1000, seed=3)
+    calibration = vitals(CALIBRATION_ROWS, devices=20, seed=9)[0]
+
+    t_full = best_of(lambda: fused.predict(X), 3)
+    print(f"{ROWS:,} rows ({seizure.mean():.1%} in seizure episodes), {fused.n_trees} trees; "
+          f"full fused forest {t_full * 1e3:.0f} ms\n")
+    print(f"{'order':>10} {'step':>5} {'trees/row':>10} {'p50':>5} {'p99':>5} {'max':>5} {'ms':>7} {'speedup':>8}")
+    samples = {"canary": np.array([CANARY_ROW], dtype=np.float64), "sample": calibration}
+    for name, step in (("estimator", 4), ("canary", 4), ("sample", 1), ("sample", 4), ("sample", 8)):
+        if name == "estimator":
+            early = EarlyExitForest(fused, step=step)
+        else:
+            early = EarlyExitForest.by_agreement(fused, samples[name], step=step)
+        _, trees = early.predict_counted(X)
+        elapsed = best_of(lambda: early.predict(X), 3)
+        p50, p99 = np.percentile(trees, [50, 99])
+        print(f"{name:>10} {step:>5} {trees.mean():>10.2f} {p50:>5.0f} {p99:>5.0f} {trees.max():>5} "
+              f"{elapsed * 1e3:>7.0f} {t_full / elapsed:>7.2f}x")
+
+    # Trees/row needed by the rows inside seizure episodes, where votes are split more often
+    early = EarlyExitForest.by_agreement(fused, calibration)
+    _, trees = early.predict_counted(X)
+    print(f"\nsample order, step 4: {trees[seizure].mean():.2f} trees/row in episodes, "
+          f"{trees[~seizure].mean():.2f} outside")
+
+
+if __name__ == "__main__":
+    main()
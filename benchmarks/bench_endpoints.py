@@ -0,0 +1,59 @@
+"""Latency of /predict (JSON) against /upload (CSV) for small payloads.
+
+Uses the Flask test client, so the numbers cover request parsing, inference
+and response encoding but not the network.
+
+Run from the repo root:  python benchmarks/bench_endpoints.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_forest import random_vitals  # noqa: E402
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import app  # noqa: E402
+
+PAYLOAD_ROWS = [1, 10, 100, 1000]
+REQUESTS = 300
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1e3
+
+
+def time_requests(send, n):
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(n):
+            start = time.perf_counter()
+            response = send()
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.data
+    return samples
+
+
+def main():
+    client = app.app.test_client()
+    header = ",".join(app.FEATURES)
+
+    print(f"{'rows':>6} {'/upload p50':>12} {'/predict p50':>13} {'/upload p99':>12} {'/predict p99':>13}")
+    for n in PAYLOAD_ROWS:
+        X = np.round(random_vitals(n), 2)
+        csv = (header + "\n" + "\n".join(",".join(map(str, row)) for row in X)).encode()
+        rows = X.tolist()
+
+        upload = time_requests(
+            lambda: client.post('/upload', data={'file': (io.BytesIO(csv), 'vitals.csv')}), REQUESTS)
+        predict = time_requests(lambda: client.post('/predict', json=rows), REQUESTS)
+        print(f"{n:>6} {percentile_ms(upload, 50):>10.2f}ms {percentile_ms(predict, 50):>11.2f}ms "
+              f"{percentile_ms(upload, 99):>10.2f}ms {percentile_ms(predict, 99):>11.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
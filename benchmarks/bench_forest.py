@@ -0,0 +1,55 @@
+"""Time FlatForest against rf_model.predict at a few batch sizes.
+
+tests/test_forest_engine.py checks that both give the same labels and
+probabilities.
+
+Run from the repo root:  python benchmarks/bench_forest.py
+"""
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forest_engine import FlatForest  # noqa: E402
+
+BATCH_SIZES = [1, 100, 100_000]
+
+
+def random_vitals(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.normal(100, 30, n),      # heart_rate
+        rng.normal(36.5, 4.5, n),    # temperature
+        rng.normal(92, 9, n),        # spo2
+        rng.gamma(1.2, 0.13, n),     # vibration_intensity
+    ])
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rf_model = joblib.load("seizure_model.pkl")
+    scaler = joblib.load("scaler.pkl")
+    flat = FlatForest.from_model(rf_model)
+
+    print(f"{'batch':>8} {'sklearn ms':>12} {'flat ms':>10} {'speedup':>8}")
+    for n in BATCH_SIZES:
+        X = (random_vitals(n) - scaler.mean_) / scaler.scale_
+        repeat = 3 if n >= 100_000 else 50
+        t_sklearn = best_of(lambda: rf_model.predict(X), repeat)
+        t_flat = best_of(lambda: flat.predict(X), repeat)
+        print(f"{n:>8} {t_sklearn * 1e3:>12.3f} {t_flat * 1e3:>10.3f} {t_sklearn / t_flat:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
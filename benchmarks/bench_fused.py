@@ -0,0 +1,37 @@
+"""Time the scaler-folded forest against scaler.transform + rf_model.predict.
+
+tests/test_forest_engine.py checks that both give the same labels and
+probabilities, including at every split's raw cutoff.
+
+Run from the repo root:  python benchmarks/bench_fused.py
+"""
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forest_engine import FlatForest  # noqa: E402
+from bench_forest import best_of, random_vitals  # noqa: E402
+
+
+def main():
+    rf_model = joblib.load("seizure_model.pkl")
+    scaler = joblib.load("scaler.pkl")
+    fused = FlatForest.from_model(rf_model).fold_scaler(scaler)
+    columns = list(scaler.feature_names_in_)
+
+    raw = random_vitals(100_000)
+    print(f"{'batch':>8} {'two-step ms':>12} {'fused ms':>10}")
+    for n in (1, 100, 100_000):
+        frame = pd.DataFrame(raw[:n], columns=columns)
+        repeat = 3 if n >= 100_000 else 50
+        t_two = best_of(lambda: rf_model.predict(scaler.transform(frame)), repeat)
+        t_fused = best_of(lambda: fused.predict(frame.to_numpy(dtype=np.float64)), repeat)
+        print(f"{n:>8} {t_two * 1e3:>12.3f} {t_fused * 1e3:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
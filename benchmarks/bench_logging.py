@@ -0,0 +1,58 @@
+"""Request-thread cost of the old print()-the-payload logging vs the queue logger.
+
+The old /upload printed the head of the frame and every predicted label to
+stdout from the request thread. The queue logger formats a one-line
+summary and hands it to the listener thread. stdout goes to /dev/null here
+so the numbers are the formatting and write costs, not a terminal's.
+
+Run from the repo root:  python benchmarks/bench_logging.py
+"""
+import contextlib
+import io
+import logging
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_forest import best_of, random_vitals  # noqa: E402
+
+ROUNDS = 5
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    import pandas as pd
+
+    from prediction_encoding import to_labels
+
+    log = app.log
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger("neuroguard").handlers:
+        handler.target.setStream(devnull)
+
+    print(f"{'rows':>9} {'print ms':>10} {'log ms':>8} {'summary ms':>11}")
+    for n in (1_000, 100_000, 1_000_000):
+        data = pd.DataFrame(random_vitals(n), columns=app.FEATURES)
+        y_pred = np.random.default_rng(0).integers(0, 2, n)
+
+        def old():
+            with contextlib.redirect_stdout(devnull):
+                print("\n🟢 Uploaded Data:\n", data.head())
+                print("\n🧠 Prediction:", to_labels(y_pred))
+
+        def new():
+            summary = {"rows": len(y_pred), "seizures": int((y_pred == 1).sum()), "format": "labels"}
+            log.info("🧠 Prediction", extra=summary)
+
+        t_old, t_new = best_of(old, ROUNDS), best_of(new, ROUNDS)
+        summary_only = best_of(lambda: int((y_pred == 1).sum()), ROUNDS)
+        print(f"{n:>9} {t_old * 1e3:>10.2f} {t_new * 1e3:>8.3f} {summary_only * 1e3:>11.3f}")
+    devnull.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Overhead of per-stage metrics (and Server-Timing) on /upload and /predict.
+
+Runs the Flask test client with metrics off, on, and on with the
+Server-Timing header, interleaving the settings so drift hits all of them
+equally, and compares median latencies. Those medians move by a few
+percent between runs, so it also prints the CPU cost of one stage() inside
+a request and of the timing hooks around a 1-row /predict (its four stages,
+best of several runs), which is what the settings actually add.
+
+Run from the repo root:  python benchmarks/bench_metrics.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_forest import random_vitals  # noqa: E402
+
+ROUNDS = 500
+SETTINGS = {"off": (False, False), "metrics": (True, False), "+timing": (True, True)}
+
+
+def csv_bytes(n):
+    rows = "\n".join(",".join(f"{v:.2f}" for v in row) for row in random_vitals(n))
+    return ("heart_rate,temperature,spo2,vibration_intensity\n" + rows + "\n").encode()
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    import metrics
+
+    client = app.app.test_client()
+    upload = csv_bytes(1000)
+    row = random_vitals(1).tolist()
+    cases = {
+        "/upload 1k rows": lambda: client.post("/upload", data={"file": (io.BytesIO(upload), "v.csv")}),
+        "/predict 1 row": lambda: client.post("/predict", json=row),
+    }
+
+    n = 100_000
+    token = metrics.begin_request()
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.stage("bench"):
+            pass
+    print(f"one stage(): {(time.perf_counter() - start) / n * 1e6:.2f} us\n")
+    metrics.end_request(token, "bench", 0.0)
+
+    def hooks():
+        app.start_timing()
+        for name in ("parse", "parse", "predict", "encode"):
+            with metrics.stage(name):
+                pass
+        app.finish_timing(response)
+        app.drop_timing(None)
+
+    with app.app.test_request_context("/predict", method="POST", json=row):
+        app.request.url_rule = app.app.url_map.bind("localhost").match("/predict", "POST", return_rule=True)[0]
+        response = app.app.response_class()
+        for setting, (enabled, server_timing) in SETTINGS.items():
+            metrics.ENABLED, app.SERVER_TIMING = enabled, server_timing
+            seconds = min(timeit.repeat(hooks, number=n // 10, repeat=7)) / (n // 10)
+            print(f"timing hooks, {setting}: {seconds * 1e6:.2f} us")
+    print()
+
+    print(f"{'request':<16} {'off ms':>8} {'metrics ms':>11} {'+timing ms':>11} {'overhead':>16}")
+    for name, call in cases.items():
+        timings = {setting: [] for setting in SETTINGS}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(10):
+                call()
+            for _ in range(ROUNDS):
+                for setting, (enabled, server_timing) in SETTINGS.items():
+                    metrics.ENABLED, app.SERVER_TIMING = enabled, server_timing
+                    start = time.perf_counter()
+                    response = call()
+                    timings[setting].append(time.perf_counter() - start)
+                    assert response.status_code == 200
+                    assert ("Server-Timing" in response.headers) == server_timing
+        off, on, timed = (np.median(timings[s]) for s in SETTINGS)
+        print(f"{name:<16} {off * 1e3:>8.3f} {on * 1e3:>11.3f} {timed * 1e3:>11.3f} "
+              f"{(on - off) / off:>7.1%} {(timed - off) / off:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Throughput of single-row predictions under concurrency, with and without MicroBatcher.
+
+Every client thread repeatedly predicts one vitals row, like a device posting
+once a second. Run from the repo root:  python benchmarks/bench_microbatch.py
+"""
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import joblib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_forest import random_vitals  # noqa: E402
+from forest_engine import FlatForest  # noqa: E402
+from micro_batcher import MicroBatcher  # noqa: E402
+
+CONCURRENCY = [1, 8, 32, 128]
+DURATION = 2.0
+
+
+def load_test(predict, threads, rows):
+    done = [0] * threads
+    stop = time.monotonic() + DURATION
+
+    def client(i):
+        X = rows[i % len(rows)][None, :]
+        while time.monotonic() < stop:
+            predict(X)
+            done[i] += 1
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(done) / DURATION
+
+
+def main():
+    rf_model = joblib.load("seizure_model.pkl")
+    scaler = joblib.load("scaler.pkl")
+    flat = FlatForest.from_model(rf_model)
+    scaled = lambda X: (X - scaler.mean_) / scaler.scale_  # noqa: E731
+    engines = {
+        "sklearn": SimpleNamespace(predict=lambda X: rf_model.predict(scaled(X))),
+        "flat": SimpleNamespace(predict=lambda X: flat.predict(scaled(X))),
+    }
+    rows = random_vitals(1024)
+
+    print(f"{'engine':>8} {'threads':>8} {'direct req/s':>13} {'batched req/s':>14} {'mean batch':>11}")
+    for name, model in engines.items():
+        for threads in CONCURRENCY:
+            batcher = MicroBatcher(max_wait_ms=2.0, max_rows=256)
+            direct = load_test(model.predict, threads, rows)
+            batched = load_test(lambda X: batcher.predict(model, X), threads, rows)
+            mean_batch = batcher.rows / max(batcher.batches, 1)
+            print(f"{name:>8} {threads:>8} {direct:>13.0f} {batched:>14.0f} {mean_batch:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
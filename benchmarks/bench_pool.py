@@ -0,0 +1,54 @@
+"""Rows/s of in-process prediction vs an InferencePool, from concurrent threads.
+
+Each client thread predicts 100k-row batches, the way concurrent /upload
+requests would in one threaded front-end. In-process prediction is bounded
+by what the GIL lets through; the pool should scale with cores, so run this
+on a multi-core machine (it prints os.cpu_count()). tests/test_inference_pool.py
+checks that pool labels equal the in-process engine's.
+
+Run from the repo root:  python benchmarks/bench_pool.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_forest import random_vitals  # noqa: E402
+from model_bundle import ModelBundle  # noqa: E402
+
+ROWS = 100_000
+BATCHES = 16
+
+
+def rows_per_second(predict, threads, batches):
+    with ThreadPoolExecutor(threads) as clients:
+        start = time.perf_counter()
+        list(clients.map(predict, batches))
+        return len(batches) * ROWS / (time.perf_counter() - start)
+
+
+def main():
+    rf_model = joblib.load("seizure_model.pkl")
+    scaler = joblib.load("scaler.pkl")
+    cores = os.cpu_count() or 1
+    batches = [random_vitals(ROWS, seed) for seed in range(BATCHES)]
+    local = ModelBundle(rf_model, scaler, "fused")
+
+    print(f"cpu_count={cores}")
+    print(f"{'processes':>10} {'threads':>8} {'rows/s':>12}")
+    for threads in (1, cores):
+        print(f"{'in-process':>10} {threads:>8} {rows_per_second(local.predict, threads, batches):>12,.0f}")
+    for processes in sorted({1, max(1, cores // 2), cores}):
+        bundle = ModelBundle(rf_model, scaler, "fused", processes=processes)
+        for X in batches:  # warm up the workers
+            bundle.predict(X)
+        threads = max(2, processes)
+        print(f"{processes:>10} {threads:>8} {rows_per_second(bundle.predict, threads, batches):>12,.0f}")
+        bundle.pool.close()
+
+
+if __name__ == "__main__":
+    main()
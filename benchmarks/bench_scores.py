@@ -0,0 +1,47 @@
+"""ModelBundle.predict_scores vs separate sklearn predict + predict_proba calls.
+
+Also prints the JSON vs float16 size of the scores payload. That the
+single-pass labels, probabilities and vote fractions match sklearn is
+checked in tests/test_forest_engine.py.
+
+Run from the repo root:  python benchmarks/bench_scores.py
+"""
+import json
+import os
+import sys
+
+import joblib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_forest import best_of, random_vitals  # noqa: E402
+from model_bundle import ModelBundle  # noqa: E402
+from prediction_encoding import encode_scores  # noqa: E402
+
+BATCH_SIZES = [1, 100, 100_000]
+
+
+def main():
+    rf_model = joblib.load("seizure_model.pkl")
+    scaler = joblib.load("scaler.pkl")
+    bundle = ModelBundle(rf_model, scaler, "flat")
+
+    def two_calls(X):
+        scaled = bundle.scale_array(X)
+        return rf_model.predict(scaled), rf_model.predict_proba(scaled)
+
+    print(f"{'batch':>8} {'predict+proba ms':>17} {'scores ms':>10} {'speedup':>8} {'json KB':>9} {'float16 KB':>11}")
+    for n in BATCH_SIZES:
+        X = random_vitals(n, seed=4)
+        _, probability, votes = bundle.predict_scores(X)
+
+        repeat = 3 if n >= 100_000 else 50
+        t_two = best_of(lambda: two_calls(X), repeat)
+        t_one = best_of(lambda: bundle.predict_scores(X), repeat)
+        size_json = len(json.dumps(encode_scores(probability, votes, "json")))
+        size_f16 = len(json.dumps(encode_scores(probability, votes, "float16")))
+        print(f"{n:>8} {t_two * 1e3:>17.3f} {t_one * 1e3:>10.3f} {t_two / t_one:>7.1f}x "
+              f"{size_json / 1024:>9.1f} {size_f16 / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Cold-start time and per-worker memory of the gunicorn deployment.
+
+For every load mode and worker count this starts `gunicorn -c
+gunicorn.conf.py app:app`, times how long it takes to answer a /predict,
+warms every worker with a burst of requests and reads RSS and PSS (RSS with
+shared pages split between the processes sharing them) of each worker
+from /proc. Linux only.
+
+Run from the repo root:  python benchmarks/bench_startup.py [workers ...]
+"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+WORKER_COUNTS = [1, 8, 32]
+MODES = {
+    "eager, no preload": {"NEUROGUARD_PRELOAD": "0", "NEUROGUARD_MODEL_LOAD": "eager"},
+    "eager, preload": {"NEUROGUARD_PRELOAD": "1", "NEUROGUARD_MODEL_LOAD": "eager"},
+    "lazy": {"NEUROGUARD_PRELOAD": "0", "NEUROGUARD_MODEL_LOAD": "lazy"},
+    "eager, preload, mmap": {"NEUROGUARD_PRELOAD": "1", "NEUROGUARD_MODEL_LOAD": "eager",
+                             "NEUROGUARD_MODEL_MMAP": "1"},
+}
+# Rough private footprint of a worker that loads its own model copy; modes
+# without preload are skipped when that many copies would not fit in RAM.
+UNSHARED_WORKER_MB = 220
+ROW = json.dumps([[95, 39.5, 88, 0.7]]).encode()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def post_predict(port):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/predict", data=ROW,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=120) as response:
+        return response.status
+
+
+def memory_kb(pid):
+    stats = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                stats[key] = int(rest.split()[0])
+    return stats
+
+
+def available_mb():
+    with open("/proc/meminfo") as f:
+        for line in f:
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) // 1024
+    return 0
+
+
+def worker_pids(master):
+    out = subprocess.run(["ps", "-o", "pid=", "--ppid", str(master)], capture_output=True, text=True)
+    return [int(p) for p in out.stdout.split()]
+
+
+def measure(mode_env, workers):
+    port = free_port()
+    env = {**os.environ, **mode_env, "WEB_CONCURRENCY": str(workers), "NEUROGUARD_BIND": f"127.0.0.1:{port}"}
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                post_predict(port)
+                break
+            except OSError:
+                if proc.poll() is not None:
+                    raise RuntimeError("gunicorn exited during startup")
+                time.sleep(0.05)
+        first_response = time.perf_counter() - start
+
+        while len(worker_pids(proc.pid)) < workers:
+            time.sleep(0.05)
+        with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+            list(pool.map(lambda _: post_predict(port), range(workers * 8)))
+        warm = time.perf_counter() - start
+
+        pids = worker_pids(proc.pid)
+        mem = [memory_kb(pid) for pid in pids]
+        master = memory_kb(proc.pid)
+        return {
+            "workers": len(pids),
+            "first_response_s": round(first_response, 2),
+            "all_warm_s": round(warm, 2),
+            "worker_rss_mb": round(sum(m["Rss"] for m in mem) / len(mem) / 1024, 1),
+            "worker_pss_mb": round(sum(m["Pss"] for m in mem) / len(mem) / 1024, 1),
+            "total_pss_mb": round((sum(m["Pss"] for m in mem) + master["Pss"]) / 1024, 1),
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+
+def main():
+    counts = [int(n) for n in sys.argv[1:]] or WORKER_COUNTS
+    print(f"{'mode':<22} {'workers':>7} {'1st resp s':>10} {'warm s':>7} {'RSS/wkr MB':>10} "
+          f"{'PSS/wkr MB':>10} {'total PSS MB':>12}")
+    for name, env in MODES.items():
+        for workers in counts:
+            needed = workers * UNSHARED_WORKER_MB
+            if env["NEUROGUARD_PRELOAD"] == "0" and needed > available_mb():
+                print(f"{name:<22} {workers:>7}  skipped: needs ~{needed} MB, {available_mb()} MB available")
+                continue
+            r = measure(env, workers)
+            print(f"{name:<22} {r['workers']:>7} {r['first_response_s']:>10} {r['all_warm_s']:>7} "
+                  f"{r['worker_rss_mb']:>10} {r['worker_pss_mb']:>10} {r['total_pss_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Prediction store: request overhead of recording, writer throughput, history query latency.
+
+Uploads the same CSV with and without ?user= (store recording on) and
+compares /upload latency, then fills one patient with PATIENT_ROWS rows at
+1 Hz and times PredictionStore.history and GET /history over windows of
+different lengths. tests/test_prediction_store.py checks what comes back.
+
+Run from the repo root:  python benchmarks/bench_store.py
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_forest import best_of  # noqa: E402
+from synthetic import to_csv, vitals  # noqa: E402
+
+PATIENT_ROWS = 5_000_000
+WINDOWS = {"1 hour": 3600, "1 day": 86_400, "all": None}
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix="neuroguard-store-")
+    os.environ["NEUROGUARD_STORE_PATH"] = os.path.join(directory, "history.db")
+    os.environ.setdefault("NEUROGUARD_LOG_LEVEL", "WARNING")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    store = app.prediction_store
+    client = app.app.test_client()
+
+    print(f"{'upload rows':>11} {'no store ms':>12} {'recorded ms':>12}")
+    for n in (1_000, 100_000):
+        payload = to_csv(vitals(n, seed=1)[0])
+        repeat = 5 if n >= 100_000 else 30
+
+        def upload(query):
+            response = client.post(f"/upload?format=bits{query}", data={"file": (io.BytesIO(payload), "v.csv")})
+            assert response.status_code == 200
+
+        upload("")
+        plain = best_of(lambda: upload(""), repeat)
+        recorded = best_of(lambda: upload("&user=bench-upload"), repeat)
+        print(f"{n:>11} {plain * 1e3:>12.2f} {recorded * 1e3:>12.2f}")
+    store.queue.join()
+
+    X, _ = vitals(PATIENT_ROWS, devices=1, seed=2)
+    y = app.get_bundle().predict(X)
+    start = time.perf_counter()
+    record = store.recorder("patient-0", "bench", start=0.0, interval=1.0)
+    for offset in range(0, PATIENT_ROWS, 500_000):
+        record(X[offset:offset + 500_000], y[offset:offset + 500_000])
+    store.queue.join()
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(os.environ["NEUROGUARD_STORE_PATH"])
+    print(f"\nwrote {PATIENT_ROWS:,} rows in {elapsed:.2f}s ({PATIENT_ROWS / elapsed:,.0f} rows/s), "
+          f"{size / PATIENT_ROWS:.1f} bytes/row on disk")
+
+    print(f"\n{'window':>8} {'rows':>10} {'labels ms':>10} {'/history bits ms':>17}")
+    middle = float(PATIENT_ROWS // 2)
+    for name, seconds in WINDOWS.items():
+        lo = None if seconds is None else middle
+        hi = None if seconds is None else middle + seconds - 1
+        found = store.history("patient-0", lo, hi, with_vitals=False)
+        query = "/history?user=patient-0&format=bits" + ("" if lo is None else f"&from={lo}&to={hi}")
+        repeat = 3 if seconds is None else 20
+        t_store = best_of(lambda: store.history("patient-0", lo, hi, with_vitals=False), repeat)
+        t_http = best_of(lambda: client.get(query), repeat)
+        print(f"{name:>8} {len(found):>10,} {t_store * 1e3:>10.2f} {t_http * 1e3:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
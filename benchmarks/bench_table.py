@@ -0,0 +1,51 @@
+"""Decision table engine vs the flat and fused forests: build time, size and predict time.
+
+tests/test_decision_table.py checks every point of the quantized sensor grid,
+and off-grid rows that take the forest fallback, against the forest.
+
+Run from the repo root:  python benchmarks/bench_table.py
+"""
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_cache import device_vitals  # noqa: E402
+from bench_forest import best_of, random_vitals  # noqa: E402
+from decision_table import GRID, DecisionTable  # noqa: E402
+from model_bundle import ModelBundle  # noqa: E402
+from forest_engine import FlatForest  # noqa: E402
+
+BATCH_SIZES = [1, 100, 100_000]
+
+
+def grid_vitals(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.integers(lo, hi + 1, n) / denom for lo, hi, denom in GRID])
+
+
+def main():
+    rf_model = joblib.load("seizure_model.pkl")
+    scaler = joblib.load("scaler.pkl")
+
+    start = time.perf_counter()
+    table = DecisionTable.build(FlatForest.from_model(rf_model).fold_scaler(scaler))
+    print(f"built {np.prod(table.shape):,} grid points into {table.nbytes / 1024:.0f} KiB "
+          f"in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    bundles = {name: ModelBundle(rf_model, scaler, name) for name in ("flat", "fused", "table")}
+    print(f"\n{'data':>8} {'batch':>8} {'on grid':>8} " + " ".join(f"{n + ' ms':>10}" for n in bundles))
+    for data, make in (("grid", grid_vitals), ("device", device_vitals), ("random", random_vitals)):
+        for n in BATCH_SIZES:
+            X = make(n, seed=3)
+            repeat = 5 if n >= 100_000 else 200
+            times = [best_of(lambda: bundle.predict(X), repeat) for bundle in bundles.values()]
+            on = table.grid_index(X)[1].mean()
+            print(f"{data:>8} {n:>8} {on:>8.0%} " + " ".join(f"{t * 1e3:>10.3f}" for t in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""/upload latency with the content-hash upload cache: off, cold (miss) and repeated (hit).
+
+"off" is the stock request class with no cache, "miss" includes hashing
+the upload while it spools plus storing the result, and "hit" is a
+re-upload of the same bytes. tests/test_upload_dedup.py checks that hits
+match the uncached response.
+
+Run from the repo root:  python benchmarks/bench_upload_dedup.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import to_csv, vitals  # noqa: E402
+
+ROWS = (1_000, 100_000, 1_000_000)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    os.environ.setdefault("NEUROGUARD_UPLOAD_CACHE_MB", "64")
+    os.environ.setdefault("NEUROGUARD_LOG_LEVEL", "WARNING")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    from flask import Request
+
+    cache = app.upload_cache
+    client = app.app.test_client()
+
+    def upload(payload):
+        response = client.post("/upload?format=bits", data={"file": (io.BytesIO(payload), "vitals.csv")})
+        assert response.status_code == 200, response.data
+        return response.get_json()
+
+    print(f"{'rows':>9} {'MB':>6} {'off ms':>9} {'miss ms':>9} {'hit ms':>8} {'speedup':>8}")
+    for n in ROWS:
+        repeat = 3 if n >= 1_000_000 else 10
+        payloads = [to_csv(vitals(n, devices=max(1, n // 1000), seed=seed)[0]) for seed in range(repeat + 1)]
+
+        app.upload_cache, app.app.request_class = None, Request
+        upload(payloads[0])
+        off = min(timed(upload, p) for p in payloads[1:])
+
+        app.upload_cache, app.app.request_class = cache, app.HashingRequest
+        miss = min(timed(upload, p) for p in payloads[1:])
+        upload(payloads[0])
+        hit = min(timed(upload, payloads[0]) for _ in range(repeat))
+        print(f"{n:>9} {len(payloads[0]) / 1e6:>6.1f} {off * 1e3:>9.2f} {miss * 1e3:>9.2f} {hit * 1e3:>8.2f} "
+              f"{off / hit:>7.1f}x")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
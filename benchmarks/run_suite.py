@@ -0,0 +1,260 @@
+"""Benchmark suite for the serving stack, with results written as JSON.
+
+Scenarios, all on synthetic vitals (see synthetic.py):
+
+  predict_raw  scaler.transform + rf_model.predict, and the serving bundle,
+               at several batch sizes
+  csv_parse    pandas.read_csv of an upload-sized CSV
+  upload       POST /upload through the Flask test client
+  upload_async POST /upload?async=1: time to the 202, then until /jobs/<id> is done
+  predict      POST /predict (JSON rows) through the Flask test client
+  emergency    POST /emergency, with the emails delivered to a local SMTP sink
+
+Every timing is repeated and reported as p50/p99 in milliseconds plus rows
+per second where that applies. The JSON also records the environment
+(versions, CPU count, git commit, NEUROGUARD_* settings), so two result
+files can be compared: --baseline lists every p50 that got more than
+--tolerance slower than in an earlier result file and exits with status 1.
+
+Run from the repo root:
+    python benchmarks/run_suite.py [--quick] [--only upload,predict] [--output results.json]
+    python benchmarks/run_suite.py --baseline results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from smtp_sink import SMTPSink  # noqa: E402
+from synthetic import to_csv, vitals  # noqa: E402
+
+SCENARIOS = ("predict_raw", "csv_parse", "upload", "upload_async", "predict", "emergency")
+FULL = {"batches": (1, 100, 10_000, 100_000), "requests": 200, "emergencies": 500}
+QUICK = {"batches": (1, 100, 10_000), "requests": 30, "emergencies": 50}
+
+
+def summarize(samples, rows=None):
+    samples = np.asarray(samples)
+    p50, p99 = np.percentile(samples, [50, 99])
+    result = {"runs": len(samples), "p50_ms": round(p50 * 1e3, 4), "p99_ms": round(p99 * 1e3, 4)}
+    if rows:
+        result["rows_per_s"] = round(rows / p50)
+    return result
+
+
+def repeat(fn, runs):
+    fn()  # warm-up
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def runs_for(rows, requests):
+    """Fewer repetitions for big batches so the suite finishes in minutes."""
+    return max(5, min(requests, 2_000_000 // max(rows, 1)))
+
+
+def environment():
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "settings": {k: v for k, v in sorted(os.environ.items()) if k.startswith("NEUROGUARD_")},
+    }
+
+
+def bench_predict_raw(app, config):
+    import pandas as pd
+
+    bundle = app.get_bundle()
+    results = []
+    for n in config["batches"]:
+        X, _ = vitals(n, devices=max(1, n // 1000), seed=1)
+        frame = pd.DataFrame(X, columns=app.FEATURES)
+        runs = runs_for(n, config["requests"])
+        sklearn = repeat(lambda: bundle.rf_model.predict(bundle.scaler.transform(frame)), runs)
+        serving = repeat(lambda: bundle.predict(X), runs)
+        results.append({"rows": n, "sklearn": summarize(sklearn, n),
+                        f"bundle_{app.ENGINE}": summarize(serving, n)})
+    return results
+
+
+def bench_csv_parse(app, config):
+    import pandas as pd
+
+    results = []
+    for n in config["batches"]:
+        payload = to_csv(vitals(n, seed=2)[0])
+        samples = repeat(lambda: pd.read_csv(io.BytesIO(payload)), runs_for(n, config["requests"]))
+        results.append({"rows": n, "bytes": len(payload), **summarize(samples, n)})
+    return results
+
+
+def bench_upload(app, config):
+    client = app.app.test_client()
+    results = []
+    for n in config["batches"]:
+        X, seizure = vitals(n, devices=max(1, n // 1000), seed=3)
+        payload = to_csv(X)
+
+        def send():
+            response = client.post("/upload", data={"file": (io.BytesIO(payload), "vitals.csv")})
+            assert response.status_code == 200, response.data
+            return response
+
+        flagged = sum(label == "Seizure Detected" for label in send().get_json()["predictions"])
+        samples = repeat(send, runs_for(n, config["requests"]))
+        results.append({"rows": n, "bytes": len(payload), "episode_rows": int(seizure.sum()),
+                        "flagged_rows": flagged, **summarize(samples, n)})
+    return results
+
+
+def bench_upload_async(app, config):
+    client = app.app.test_client()
+    results = []
+    for n in config["batches"]:
+        payload = to_csv(vitals(n, devices=max(1, n // 1000), seed=3)[0])
+        accepted, done = [], []
+        for _ in range(runs_for(n, config["requests"] // 4)):
+            start = time.perf_counter()
+            response = client.post("/upload?async=1", data={"file": (io.BytesIO(payload), "vitals.csv")})
+            accepted.append(time.perf_counter() - start)
+            assert response.status_code == 202, response.data
+            while client.get(response.get_json()["status_url"]).get_json()["status"] not in ("done", "failed"):
+                time.sleep(0.001)
+            done.append(time.perf_counter() - start)
+        results.append({"rows": n, "accepted": summarize(accepted), "done": summarize(done, n)})
+    return results
+
+
+def bench_predict(app, config):
+    client = app.app.test_client()
+    results = []
+    for n in config["batches"]:
+        rows = vitals(n, devices=max(1, n // 1000), seed=4)[0].tolist()
+
+        def send():
+            response = client.post("/predict", json=rows)
+            assert response.status_code == 200, response.data
+
+        results.append({"rows": n, **summarize(repeat(send, runs_for(n, config["requests"])), n)})
+    return results
+
+
+def bench_emergency(app, config, sink):
+    client = app.app.test_client()
+    n = config["emergencies"]
+    before = sink.messages
+    samples = []
+    start = time.perf_counter()
+    for i in range(n):
+        # A distinct user per request, so the coalescer sends every email
+        body = {"user": f"bench-{i}", "lat": 32.07, "lon": 34.78, "doctor_email": "doctor@example.com",
+                "sender_email": "alerts@example.com", "sender_password": ""}
+        t = time.perf_counter()
+        response = client.post("/emergency", json=body)
+        samples.append(time.perf_counter() - t)
+        assert response.status_code == 200, response.data
+    app.alert_dispatcher.queue.join()
+    delivered = sink.messages - before
+    return {"requests": n, "delivered": delivered,
+            "delivery_s": round(time.perf_counter() - start, 4), **summarize(samples)}
+
+
+def p50s(results, prefix=""):
+    """Flatten a results tree into {"upload/rows=100": p50_ms, ...}."""
+    if isinstance(results, list):
+        flat = {}
+        for entry in results:
+            flat.update(p50s(entry, f"{prefix}/rows={entry.get('rows')}"))
+        return flat
+    flat = {prefix: results["p50_ms"]} if "p50_ms" in results else {}
+    for key, value in results.items():
+        if isinstance(value, (dict, list)):
+            flat.update(p50s(value, f"{prefix}/{key}" if prefix else key))
+    return flat
+
+
+def regressions(baseline, report, tolerance):
+    old, new = p50s(baseline["results"]), p50s(report["results"])
+    return [(key, old[key], new[key]) for key in sorted(new.keys() & old.keys())
+            if new[key] > old[key] * (1 + tolerance)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--quick", action="store_true", help="smaller batches and fewer repetitions")
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="comma-separated scenarios")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    parser.add_argument("--baseline", help="earlier result file to check this run against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slowdown (default 0.10)")
+    args = parser.parse_args()
+    only = args.only.split(",")
+    unknown = set(only) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    config = QUICK if args.quick else FULL
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # The SMTP settings are read when email_alert is imported, so the sink comes first
+    sink = SMTPSink().start_in_thread()
+    os.environ.update({"NEUROGUARD_SMTP_HOST": sink.host, "NEUROGUARD_SMTP_PORT": str(sink.port),
+                       "NEUROGUARD_SMTP_STARTTLS": "0"})
+    os.environ.setdefault("NEUROGUARD_LOG_LEVEL", "WARNING")
+    os.chdir(ROOT)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+
+    report = {"suite": "neuroguard", "version": 1, "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+              "quick": args.quick, "engine": app.ENGINE, "environment": environment(), "results": {}}
+    for name in only:
+        print(f"running {name}...", file=sys.stderr)
+        if name == "emergency":
+            report["results"][name] = bench_emergency(app, config, sink)
+        else:
+            report["results"][name] = globals()[f"bench_{name}"](app, config)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if baseline is not None:
+        slower = regressions(baseline, report, args.tolerance)
+        for key, old, new in slower:
+            print(f"slower: {key} {old:.3f} -> {new:.3f} ms ({new / old - 1:+.0%})", file=sys.stderr)
+        print(f"{len(slower)} p50 regressions beyond {args.tolerance:.0%} vs {args.baseline}", file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Minimal local SMTP server that accepts and discards every message.
+
+Point the app at it with NEUROGUARD_SMTP_HOST=127.0.0.1,
+NEUROGUARD_SMTP_PORT=<port> and NEUROGUARD_SMTP_STARTTLS=0. Speaks just
+enough SMTP (no TLS, no AUTH) for smtplib.sendmail.
+
+Run from the repo root:  python benchmarks/smtp_sink.py [port]
+"""
+import asyncio
+import sys
+import threading
+
+
+class SMTPSink:
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.messages = 0
+
+    async def _session(self, reader, writer):
+        writer.write(b"220 sink ESMTP\r\n")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                verb = line[:4].upper()
+                if verb == b"EHLO":
+                    writer.write(b"250-sink\r\n250 8BITMIME\r\n")
+                elif verb == b"DATA":
+                    writer.write(b"354 end with .\r\n")
+                    await writer.drain()
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    self.messages += 1
+                    writer.write(b"250 queued\r\n")
+                elif verb == b"QUIT":
+                    writer.write(b"221 bye\r\n")
+                    break
+                else:  # HELO, MAIL, RCPT, RSET, NOOP
+                    writer.write(b"250 ok\r\n")
+                await writer.drain()
+        except ConnectionError:
+            pass  # clients dropping pooled connections at shutdown
+        finally:
+            writer.close()
+
+    async def serve(self, started=None):
+        server = await asyncio.start_server(self._session, self.host, self.port, backlog=1024)
+        self.port = server.sockets[0].getsockname()[1]
+        if started is not None:
+            started.set()
+        async with server:
+            await server.serve_forever()
+
+    def start_in_thread(self):
+        """Serve from a daemon thread; returns once the port is bound."""
+        started = threading.Event()
+        threading.Thread(target=asyncio.run, args=(self.serve(started),), name="smtp-sink", daemon=True).start()
+        started.wait()
+        return self
+
+
+if __name__ == "__main__":
+    sink = SMTPSink(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8025)
+    print(f"SMTP sink on {sink.host}:{sink.port}")
+    asyncio.run(sink.serve())
@@ -0,0 +1,71 @@
+"""Synthetic wearable vitals with seizure episodes, for the benchmarks.
+
+Each device gets its own resting baseline and a 1 Hz stream of readings
+drifting around it. Seizure episodes (tonic-clonic: heart rate and
+temperature up, SpO2 down, strong vibration) start at random points and
+last 30-120 seconds. Values are rounded to the precision a wearable
+reports, so repeated readings look like real uploads rather than unique
+floats.
+
+    X, seizure = vitals(100_000, devices=50, seed=0)
+    payload = to_csv(X)
+"""
+import numpy as np
+
+HEADER = "heart_rate,temperature,spo2,vibration_intensity"
+
+# Fraction of each device's time spent in an episode, and episode length in seconds
+SEIZURE_FRACTION = 0.03
+EPISODE_SECONDS = (30, 120)
+
+
+def _episodes(n, rng, fraction):
+    """Boolean mask of length n with episodes covering roughly `fraction` of it."""
+    mask = np.zeros(n, dtype=bool)
+    mean_length = sum(EPISODE_SECONDS) / 2
+    for start in rng.integers(0, n, rng.poisson(n * fraction / mean_length)):
+        mask[start:start + rng.integers(*EPISODE_SECONDS)] = True
+    return mask
+
+
+def _device(n, rng, fraction):
+    resting = (rng.normal(75, 8), rng.normal(36.6, 0.3), rng.normal(97.5, 1.0))
+    # A slow random walk around the baseline plus per-reading sensor noise
+    drift = np.cumsum(rng.normal(0, 0.05, (n, 3)), axis=0)
+    drift -= np.linspace(0, 1, n)[:, None] * drift[-1]  # ends where it started
+    hr = resting[0] + 4 * drift[:, 0] + rng.normal(0, 3, n)
+    temp = resting[1] + 0.05 * drift[:, 1] + rng.normal(0, 0.1, n)
+    spo2 = resting[2] + 0.3 * drift[:, 2] + rng.normal(0, 0.7, n)
+    vib = rng.gamma(1.5, 0.06, n)
+
+    seizure = _episodes(n, rng, fraction)
+    k = int(seizure.sum())
+    hr[seizure] += rng.normal(55, 15, k)
+    temp[seizure] += rng.normal(1.5, 0.5, k)
+    spo2[seizure] -= rng.normal(9, 3, k)
+    vib[seizure] = rng.uniform(0.5, 1.0, k)
+
+    X = np.column_stack([
+        np.round(hr),
+        np.round(temp, 1),
+        np.round(np.clip(spo2, 70, 100)),
+        np.round(np.clip(vib, 0, 1), 2),
+    ])
+    return X, seizure
+
+
+def vitals(n, devices=1, seed=0, seizure_fraction=SEIZURE_FRACTION):
+    """n readings from `devices` wearables, device by device; returns (X, seizure mask)."""
+    rng = np.random.default_rng(seed)
+    sizes = np.full(devices, n // devices)
+    sizes[: n % devices] += 1
+    parts = [_device(size, rng, seizure_fraction) for size in sizes if size]
+    if not parts:
+        return np.empty((0, 4)), np.empty(0, dtype=bool)
+    return np.concatenate([X for X, _ in parts]), np.concatenate([s for _, s in parts])
+
+
+def to_csv(X):
+    """CSV bytes in the layout /upload expects."""
+    lines = [HEADER] + [f"{hr:g},{temp:g},{spo2:g},{vib:g}" for hr, temp, spo2, vib in X.tolist()]
+    return ("\n".join(lines) + "\n").encode()
@@ -0,0 +1,149 @@
+"""Binary columnar uploads for /upload: .npy, .npz, Arrow IPC and Parquet.
+
+Uploads come in as Werkzeug spooled temp files. Once they are on disk the
+file is memory-mapped, so .npy arrays and Arrow record batches are read in
+place and only the chunk being predicted is copied into a float64 matrix.
+Parquet still has to be decoded, but batch by batch rather than all at once.
+
+Arrays may be structured (field names) or plain 2-D in feature order;
+.npz archives may hold one array per feature or a single 2-D array; Arrow
+and Parquet columns are matched by name. pyarrow is only imported for the
+Arrow and Parquet formats.
+"""
+import io
+import mmap
+import os
+
+import numpy as np
+
+NUMPY_EXTENSIONS = (".npy", ".npz")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+PARQUET_EXTENSIONS = (".parquet",)
+COLUMNAR_EXTENSIONS = NUMPY_EXTENSIONS + ARROW_EXTENSIONS + PARQUET_EXTENSIONS
+NPY_HEADER_BYTES = 1 << 20
+
+
+def extension(filename):
+    return os.path.splitext(filename or "")[1].lower()
+
+
+def is_columnar(filename):
+    return extension(filename) in COLUMNAR_EXTENSIONS
+
+
+def upload_buffer(stream):
+    """Read-only buffer over the upload: an mmap once it is on disk, bytes otherwise."""
+    # SpooledTemporaryFile.fileno() would force small in-memory uploads to disk
+    if getattr(stream, "_rolled", True):
+        try:
+            return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            pass
+    stream.seek(0)
+    return stream.read()
+
+
+def _stack(columns, start, stop):
+    X = np.empty((stop - start, len(columns)), dtype=np.float64)
+    for i, column in enumerate(columns):
+        X[:, i] = column[start:stop]
+    return X
+
+
+def _chunk_columns(columns, chunk_rows):
+    n = len(columns[0]) if columns else 0
+    for start in range(0, n, chunk_rows):
+        yield _stack(columns, start, min(start + chunk_rows, n))
+
+
+def _array_columns(arr, features, source):
+    if arr.dtype.names:
+        missing = [f for f in features if f not in arr.dtype.names]
+        if missing:
+            raise ValueError(f"{source} is missing fields {missing}")
+        return [arr[f] for f in features]
+    if arr.ndim != 2 or arr.shape[1] != len(features):
+        raise ValueError(f"Expected a 2-D array with {len(features)} columns {features}, got shape {arr.shape}")
+    return [arr[:, i] for i in range(len(features))]
+
+
+def _npy_array(buffer):
+    header = io.BytesIO(buffer[:NPY_HEADER_BYTES])
+    version = np.lib.format.read_magic(header)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+    if dtype.hasobject:
+        raise ValueError(".npy uploads with object dtype are not accepted")
+    count = int(np.prod(shape))
+    arr = np.frombuffer(buffer, dtype=dtype, count=count, offset=header.tell())
+    return arr.reshape(shape, order="F" if fortran_order else "C")
+
+
+def _npz_columns(stream, features):
+    stream.seek(0)
+    archive = np.load(stream, allow_pickle=False)
+    if all(f in archive.files for f in features):
+        columns = [archive[f] for f in features]
+        if len({len(c) for c in columns}) != 1:
+            raise ValueError(".npz feature arrays have different lengths")
+        return columns
+    if len(archive.files) == 1:
+        return _array_columns(archive[archive.files[0]], features, ".npz array")
+    raise ValueError(f".npz must hold arrays named {features} or a single 2-D array")
+
+
+def _arrow_batches(buffer):
+    import pyarrow as pa
+
+    source = pa.py_buffer(buffer)
+    try:
+        reader = pa.ipc.open_file(source)
+        return (reader.get_batch(i) for i in range(reader.num_record_batches)), reader.schema
+    except pa.ArrowInvalid:
+        reader = pa.ipc.open_stream(source)
+        return iter(reader), reader.schema
+
+
+def _batch_chunks(batches, schema, features, chunk_rows):
+    missing = [f for f in features if schema.get_field_index(f) < 0]
+    if missing:
+        raise ValueError(f"Upload is missing columns {missing}")
+    for batch in batches:
+        columns = [batch.column(f).to_numpy(zero_copy_only=False) for f in features]
+        yield from _chunk_columns(columns, chunk_rows)
+
+
+def iter_chunks(file, features, chunk_rows):
+    """Yield float64 (rows, len(features)) arrays of at most chunk_rows rows.
+
+    Column problems are raised as ValueError from the first next() call, so
+    callers can reject the upload before starting a response.
+    """
+    ext = extension(file.filename)
+    stream = file.stream
+
+    if ext == ".npy":
+        columns = _array_columns(_npy_array(upload_buffer(stream)), features, ".npy array")
+        yield from _chunk_columns(columns, chunk_rows)
+        return
+    if ext == ".npz":
+        yield from _chunk_columns(_npz_columns(stream, features), chunk_rows)
+        return
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ValueError(f"pyarrow is required to read {ext} uploads")
+
+    if ext in ARROW_EXTENSIONS:
+        batches, schema = _arrow_batches(upload_buffer(stream))
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(pa.BufferReader(upload_buffer(stream)))
+        schema = parquet.schema_arrow
+        batches = parquet.iter_batches(batch_size=chunk_rows, columns=[f for f in features if f in schema.names])
+    yield from _batch_chunks(batches, schema, features, chunk_rows)
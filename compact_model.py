@@ -0,0 +1,270 @@
+"""Compact, memory-mappable form of the seizure forest and its scaler.
+
+One file holds every array the forest needs at its smallest exact width:
+
+- split features as uint8 and thresholds as float32, each rounded down to
+  the largest float32 not above the float64 threshold. sklearn compares
+  float32 inputs against float64 thresholds, and for a float32 x,
+  x <= t exactly when x <= round_down(t), so every split decides as before;
+- child links as per-tree local indices, int16 (int32 for trees of more
+  than 32767 nodes), plus one int32 root offset per tree;
+- each node's own class (the tree's hard vote) as one bit, np.packbits;
+- the scaler's mean and scale, so raw vitals go in and no pickle is needed;
+- the QuickScorer tables FlatForest would compile from these nodes with the
+  scaler folded in (see forest_engine.py): per feature, the sorted raw
+  cutoffs (float64) and one leaf bitmask per tree after each cutoff, in the
+  narrowest unsigned type holding every tree's leaves (uint8 for our
+  6-leaf trees), plus per tree a bitmask of the leaves voting class 1.
+
+A small JSON header records the feature names, shapes, dtypes and 64-byte
+aligned offsets, and `load` maps every array with np.memmap. Prediction
+reads the mapped tables directly: a row's exit leaf in each tree is the
+lowest bit left after AND-ing its masks, and the tree votes class 1 when
+that bit is in the tree's vote mask. Nothing is expanded per process, so
+all gunicorn workers (and any number of personalised models) share one
+page-cache copy and no sklearn is imported. Forests with trees of more than
+64 leaves get no tables and walk the node arrays instead.
+
+Leaves keep only the class bit, so `CompactForest.predict` is the majority
+of the trees' votes rather than sklearn's averaged probabilities, and no
+probabilities can be served from it. Every tree votes exactly as in
+sklearn; the forest label can differ only where soft and hard voting
+disagree (ties go to the first class, like argmax).
+benchmarks/bench_compact.py measures that agreement.
+
+Convert the shipped model with:
+    python compact_model.py seizure_model.pkl scaler.pkl seizure_model.ngf
+"""
+import json
+import struct
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+from forest_engine import MAX_MASK_LEAVES, FlatForest
+
+MAGIC = b"NGFOREST"
+FORMAT_VERSION = 2
+ALIGN = 64
+BLOCK_ROWS = 4096
+TREE_LEAF = -1
+
+
+def _round_down_f32(threshold):
+    t32 = threshold.astype(np.float32)
+    over = t32.astype(np.float64) > threshold
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    return t32
+
+
+def _table_arrays(flat, n_leaves):
+    """Serializable QuickScorer tables of a scaler-folded FlatForest over the votes."""
+    tables = flat._mask_tables
+    # FlatForest uses uint32/uint64; the narrowest width holding every tree's leaves is
+    # exact too, since bits past a tree's last leaf are never cleared nor its exit
+    mask_dtype = next(np.dtype(t) for t in (np.uint8, np.uint16, np.uint32, np.uint64)
+                      if np.dtype(t).itemsize * 8 >= n_leaves.max())
+    bounds = np.cumsum([0] + [len(thresholds) for thresholds, _ in tables])
+    # Vote bit of each leaf slot; slots past a tree's last leaf are never its exit
+    slot_votes = flat._slot_votes[1].reshape(flat.n_trees, MAX_MASK_LEAVES)[:, :mask_dtype.itemsize * 8]
+    slot_votes = slot_votes * (np.arange(slot_votes.shape[1]) < n_leaves[:, None])
+    weights = np.left_shift(np.ones(slot_votes.shape[1], dtype=mask_dtype), np.arange(slot_votes.shape[1],
+                                                                                      dtype=mask_dtype))
+    return {
+        "cutoffs": np.concatenate([thresholds for thresholds, _ in tables]),
+        "cutoff_bounds": bounds.astype(np.int64),
+        "masks": np.concatenate([masks for _, masks in tables]).astype(mask_dtype),
+        "vote_mask": np.bitwise_or.reduce(np.where(slot_votes > 0, weights, mask_dtype.type(0)), axis=1),
+    }
+
+
+class CompactForest:
+    """Binary RandomForest + StandardScaler over compact arrays (see module docstring)."""
+
+    def __init__(self, arrays, classes, depth, features=None):
+        self.arrays = arrays
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.roots = arrays["roots"]
+        self.mean = arrays["mean"]
+        self.scale = arrays["scale"]
+        self.classes_ = np.asarray(classes)
+        self.depth = depth
+        self.features = features
+        self.n_trees = len(self.roots)
+        self.n_features_in_ = len(self.mean)
+        self._tables = None
+        if "masks" in arrays:
+            bounds, cutoffs, masks = arrays["cutoff_bounds"], arrays["cutoffs"], arrays["masks"]
+            # Feature f has bounds[f+1] - bounds[f] cutoffs and one more mask row than that
+            self._tables = [(cutoffs[bounds[f]:bounds[f + 1]], masks[bounds[f] + f:bounds[f + 1] + f + 1])
+                            for f in range(self.n_features_in_)]
+            self._vote_mask = arrays["vote_mask"]
+            self._mask_one = self._vote_mask.dtype.type(1)
+
+    @classmethod
+    def from_model(cls, model, scaler):
+        if len(model.classes_) != 2:
+            raise ValueError("CompactForest stores one class bit per leaf and needs a binary classifier")
+        trees = [est.tree_ for est in model.estimators_]
+        index_dtype = np.int16 if max(t.node_count for t in trees) <= np.iinfo(np.int16).max else np.int32
+        feature, threshold, left, right, vote, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            local = np.arange(tree.node_count)
+            leaf = tree.children_left == TREE_LEAF
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(np.where(leaf, 0.0, tree.threshold))
+            # Leaves link to themselves, so walking past them is harmless
+            left.append(np.where(leaf, local, tree.children_left))
+            right.append(np.where(leaf, local, tree.children_right))
+            vote.append(np.argmax(tree.value[:, 0, :], axis=1) == 1)
+            roots.append(offset)
+            offset += tree.node_count
+
+        n_features = model.n_features_in_
+        mean = np.zeros(n_features) if scaler.mean_ is None else scaler.mean_
+        scale = np.ones(n_features) if scaler.scale_ is None else scaler.scale_
+        arrays = {
+            "feature": np.concatenate(feature).astype(np.uint8),
+            "threshold": _round_down_f32(np.concatenate(threshold).astype(np.float64)),
+            "left": np.concatenate(left).astype(index_dtype),
+            "right": np.concatenate(right).astype(index_dtype),
+            "roots": np.array(roots, dtype=np.int32),
+            "leaf_class": np.packbits(np.concatenate(vote)),
+            "mean": np.asarray(mean, dtype=np.float64),
+            "scale": np.asarray(scale, dtype=np.float64),
+        }
+        features = getattr(scaler, "feature_names_in_", None)
+        depth = max(tree.max_depth for tree in trees)
+        flat = cls(arrays, model.classes_, depth).to_flat()
+        if flat._mask_tables is not None:
+            n_leaves = np.array([(t.children_left == TREE_LEAF).sum() for t in trees])
+            arrays.update(_table_arrays(flat, n_leaves))
+        return cls(arrays, model.classes_, depth, None if features is None else list(features))
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays.values())
+
+    def save(self, path):
+        header = {"format": FORMAT_VERSION, "classes": self.classes_.tolist(), "depth": self.depth,
+                  "features": self.features, "arrays": {}}
+        offset = 0
+        for name, a in self.arrays.items():
+            header["arrays"][name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+            offset += -(-a.nbytes // ALIGN) * ALIGN
+        header_bytes = json.dumps(header).encode()
+        start = -(-(len(MAGIC) + 4 + len(header_bytes)) // ALIGN) * ALIGN
+        with open(path, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+            for name, a in self.arrays.items():
+                f.seek(start + header["arrays"][name]["offset"])
+                f.write(np.ascontiguousarray(a).tobytes())
+            f.truncate(start + offset)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Read a file written by `save`; with mmap the arrays stay file-backed and shared."""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a compact forest file")
+            (length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(length))
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact forest format {header['format']}, reconvert the model")
+        start = -(-(len(MAGIC) + 4 + length) // ALIGN) * ALIGN
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+            if mmap:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=start + spec["offset"], shape=shape)
+            else:
+                arrays[name] = np.fromfile(path, dtype=dtype, count=int(np.prod(shape)),
+                                           offset=start + spec["offset"]).reshape(shape)
+        return cls(arrays, header["classes"], header["depth"], header["features"])
+
+    def _check_input(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity.")
+        return X
+
+    def _votes_tables(self, X):
+        """Trees voting class 1 for each row of a raw block, from the mapped QuickScorer tables."""
+        alive = None
+        for f, (cutoffs, masks) in enumerate(self._tables):
+            m = masks[np.searchsorted(cutoffs, X[:, f])]
+            alive = m if alive is None else np.bitwise_and(alive, m, out=alive)
+        lowest = alive & (~alive + self._mask_one)
+        return np.count_nonzero(lowest & self._vote_mask, axis=1)
+
+    def _votes_walk(self, X):
+        """Trees voting class 1 for each row of a raw block, walking the node arrays."""
+        # StandardScaler.transform, then the float32 cast sklearn's trees apply
+        X = ((X - self.mean) / self.scale).astype(np.float32)
+        node_vote = np.unpackbits(self.arrays["leaf_class"], count=len(self.feature))
+        tree_base = self.roots.astype(np.int32)[:, None]
+        flat_X = X.ravel()
+        row_base = np.arange(len(X), dtype=np.int32) * X.shape[1]
+        node = np.repeat(tree_base, len(X), axis=1)
+        for _ in range(self.depth):
+            go_left = flat_X[row_base + self.feature[node]] <= self.threshold[node]
+            node = tree_base + np.where(go_left, self.left[node], self.right[node])
+        return np.add.reduce(node_vote[node], axis=0, dtype=np.int32)
+
+    def votes(self, X):
+        """Trees voting class 1 per row of raw (unscaled) vitals."""
+        X = self._check_input(X)
+        votes_block = self._votes_tables if self._tables is not None else self._votes_walk
+        out = np.empty(len(X), dtype=np.int32)
+        for start in range(0, len(X), BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = votes_block(X[start:start + BLOCK_ROWS])
+        return out
+
+    def predict_proba(self, X):
+        """Vote fractions per class, shape (n_rows, 2); not sklearn's averaged probabilities."""
+        ones = self.votes(X) / self.n_trees
+        return np.column_stack([1.0 - ones, ones])
+
+    def to_flat(self):
+        """Scaler-folded FlatForest over the votes: same labels as `predict`, in private memory."""
+        n_nodes = len(self.feature)
+        base = np.repeat(self.roots.astype(np.intp), np.diff(np.append(self.roots, n_nodes)))
+        vote = np.unpackbits(self.arrays["leaf_class"], count=n_nodes).astype(np.float64)
+        forest = FlatForest(
+            feature=self.feature.astype(np.intp),
+            threshold=self.threshold.astype(np.float64),
+            left=base + self.left,
+            right=base + self.right,
+            value=np.column_stack([1.0 - vote, vote]),
+            roots=self.roots.astype(np.intp),
+            depth=self.depth,
+            classes=self.classes_,
+            n_features=self.n_features_in_,
+        )
+        return forest.fold_scaler(SimpleNamespace(mean_=np.asarray(self.mean), scale_=np.asarray(self.scale)))
+
+    def predict(self, X):
+        # Class 1 needs a strict majority; a tie goes to class 0, as argmax would
+        return self.classes_.take((2 * self.votes(X) > self.n_trees).astype(np.intp))
+
+
+def convert(model_path, scaler_path, out_path):
+    import joblib
+
+    forest = CompactForest.from_model(joblib.load(model_path), joblib.load(scaler_path))
+    forest.save(out_path)
+    return forest
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        sys.exit("usage: python compact_model.py MODEL.pkl SCALER.pkl OUT.ngf")
+    forest = convert(*sys.argv[1:])
+    print(f"✅ Wrote {sys.argv[3]}: {forest.n_trees} trees, {len(forest.feature)} nodes, {forest.nbytes} bytes of arrays")
@@ -0,0 +1,99 @@
+"""Precomputed forest decisions over the quantized sensor grid.
+
+The wearables report heart rate and SpO2 as integers, temperature and
+vibration intensity in 0.1 steps, all within fixed ranges. Every point of
+that grid (about 5.3M of them) gets its forest label stored as one bit, so
+an on-grid row is classified with a few integer operations and one table
+read. Rows that are off the grid (finer resolution, out of range, NaN) go
+through the real forest instead.
+"""
+import numpy as np
+
+# Per feature, in FEATURES order: grid values are k / denom for k in lo..hi
+GRID = (
+    (30, 220, 1),     # heart_rate, bpm
+    (340, 420, 10),   # temperature, 34.0-42.0 °C
+    (70, 100, 1),     # spo2, %
+    (0, 10, 10),      # vibration_intensity, 0.0-1.0
+)
+
+
+class DecisionTable:
+    """Bit-packed labels of a binary forest on GRID, with the forest as fallback.
+
+    `forest` must predict from raw vitals (a FlatForest with the scaler
+    folded in), since the table is indexed by raw sensor values.
+    """
+
+    def __init__(self, bits, classes, forest):
+        self.bits = bits
+        self.classes_ = classes
+        self.forest = forest
+        self.shape = tuple(hi - lo + 1 for lo, hi, _ in GRID)
+
+    @classmethod
+    def build(cls, forest):
+        """Label every grid point without running the forest on all of them.
+
+        Two values of a feature that fall between the same pair of split
+        cutoffs take the same branch at every split in every tree, so the
+        forest only has to be evaluated on one representative per
+        (feature, gap between cutoffs) combination; the full grid is then
+        filled in by indexing. For our model that is under 3k rows.
+        """
+        if len(forest.classes_) != 2:
+            raise ValueError(f"Decision table needs a binary classifier, got classes {forest.classes_}")
+        if forest.n_features_in_ != len(GRID):
+            raise ValueError(f"Decision table covers {len(GRID)} features, forest has {forest.n_features_in_}")
+
+        internal = ~forest.is_leaf()
+        representatives, expand = [], []
+        for f, (lo, hi, denom) in enumerate(GRID):
+            values = np.arange(lo, hi + 1) / denom
+            cutoffs = np.unique(forest.threshold[internal & (forest.feature == f)])
+            # A row goes left where x <= cutoff, so the number of cutoffs
+            # below x decides every split on this feature.
+            gaps = np.searchsorted(cutoffs, values, side="left")
+            _, first, inverse = np.unique(gaps, return_index=True, return_inverse=True)
+            representatives.append(values[first])
+            expand.append(inverse)
+
+        mesh = np.stack(np.meshgrid(*representatives, indexing="ij"), axis=-1).reshape(-1, len(GRID))
+        coarse = forest.predict(mesh) == forest.classes_[1]
+        coarse = coarse.reshape([len(r) for r in representatives])
+        full = coarse[np.ix_(*expand)]
+        return cls(np.packbits(full.ravel()), forest.classes_, forest)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def grid_index(self, X):
+        """Flat grid index of every row of X, and a mask of the rows that are on the grid."""
+        index = np.zeros(len(X), dtype=np.intp)
+        on_grid = np.ones(len(X), dtype=bool)
+        for f, (lo, hi, denom) in enumerate(GRID):
+            x = X[:, f]
+            with np.errstate(invalid="ignore"):
+                k = np.rint(x * denom)
+                # k / denom is the double nearest the decimal, the same value
+                # "36.7" parses to, so equality means x is exactly that grid
+                # point and not merely close to it.
+                on_grid &= (k / denom == x) & (k >= lo) & (k <= hi)
+            index = index * self.shape[f] + np.where(on_grid, k - lo, 0).astype(np.intp)
+        return index, on_grid
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(GRID):
+            return self.forest.predict(X)  # raises the usual shape error
+
+        index, on_grid = self.grid_index(X)
+        if not on_grid.any():
+            return self.forest.predict(X)
+        bit = (self.bits[index >> 3] >> (7 - (index & 7)).astype(np.uint8)) & 1
+        labels = self.classes_.take(bit)
+        if not on_grid.all():
+            off_grid = ~on_grid
+            labels[off_grid] = self.forest.predict(X[off_grid])
+        return labels
@@ -1,23 +1,298 @@
+import logging
+import os
+import queue
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
-def send_email_alert(user, maps_link, doctor_email, sender_email, sender_password):
-    sender = sender_email
-    receiver = doctor_email
+
+SMTP_HOST = os.environ.get("NEUROGUARD_SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("NEUROGUARD_SMTP_PORT", 587))
+# Local stand-ins (smtpd / aiosmtpd) speak plain SMTP without TLS or AUTH
+SMTP_STARTTLS = os.environ.get("NEUROGUARD_SMTP_STARTTLS", "1") == "1"
+
+log = logging.getLogger("neuroguard.alerts")
+
+
+def build_message(user, maps_link, doctor_email, sender_email, count=1):
     subject = f"🚨 Seizure Alert for {user}"
     body = f"{user} has had a seizure.\n\nLive location: {maps_link}"
+    if count > 1:
+        subject += f" ({count} alerts)"
+        body += f"\n\n{count} alerts were received since the last email; this is the latest location."
 
     msg = MIMEText(body)
     msg['Subject'] = subject
-    msg['From'] = sender
-    msg['To'] = receiver
+    msg['From'] = sender_email
+    msg['To'] = doctor_email
+    return msg
+
+
+def open_connection(sender_email, sender_password):
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+    if SMTP_STARTTLS:
+        server.starttls()
+    if sender_password:
+        server.login(sender_email, sender_password)  # <-- Must be App Password
+    return server
+
+
+def send_email_alert(user, maps_link, doctor_email, sender_email, sender_password):
+    sender = sender_email
+    receiver = doctor_email
+    msg = build_message(user, maps_link, doctor_email, sender_email)
 
     try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(sender, sender_password)  # <-- Must be App Password
+        with open_connection(sender, sender_password) as server:
             server.sendmail(sender, receiver, msg.as_string())
-        print(f"✅ Email sent to {receiver}")
+        log.info("✅ Email sent", extra={"to": receiver})
     except Exception as e:
-        print(f"❌ Email failed: {e}")
+        log.error("❌ Email failed: %s", e, extra={"to": receiver})
+
+
+class SMTPPool:
+    """Authenticated SMTP connections kept open per (sender, password).
+
+    A connection is checked out by one worker at a time. Connections idle
+    longer than `idle_timeout` seconds are closed on the next sweep, which
+    stays under the server's own idle disconnect.
+    """
+
+    def __init__(self, idle_timeout=60.0):
+        self.idle_timeout = idle_timeout
+        self._idle = {}  # key -> [(server, last_used), ...]
+        self._lock = threading.Lock()
+
+    def checkout(self, sender_email, sender_password):
+        key = (sender_email, sender_password)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()[0]
+        return open_connection(sender_email, sender_password)
+
+    def checkin(self, sender_email, sender_password, server):
+        with self._lock:
+            self._idle.setdefault((sender_email, sender_password), []).append((server, time.monotonic()))
+
+    def discard(self, server):
+        try:
+            server.close()
+        except Exception:
+            pass
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = []
+        with self._lock:
+            for key in list(self._idle):
+                keep = [(s, t) for s, t in self._idle[key] if t >= cutoff]
+                stale += [s for s, t in self._idle[key] if t < cutoff]
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+        for server in stale:
+            try:
+                server.quit()
+            except Exception:
+                self.discard(server)
+        return len(stale)
+
+    def close_all(self):
+        with self._lock:
+            servers = [s for conns in self._idle.values() for s, _ in conns]
+            self._idle.clear()
+        for server in servers:
+            self.discard(server)
+
+
+class AlertDispatcher:
+    """Send alert emails from background threads through a bounded queue.
+
+    `submit` never touches the network; it raises queue.Full when the
+    backlog is at `max_queue` so the caller can report overload instead of
+    blocking. Workers are started on first use, which keeps them out of a
+    pre-fork master process.
+    """
+
+    def __init__(self, workers=2, max_queue=1000, idle_timeout=60.0):
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.pool = SMTPPool(idle_timeout)
+        self.sent = 0
+        self.failed = 0
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, outcome):
+        with self._stats_lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"alert-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, user, maps_link, doctor_email, sender_email, sender_password, count=1):
+        self._ensure_started()
+        self.queue.put_nowait((user, maps_link, doctor_email, sender_email, sender_password, count))
+
+    def _run(self):
+        while True:
+            try:
+                job = self.queue.get(timeout=self.pool.idle_timeout / 2)
+            except queue.Empty:
+                self.pool.evict_idle()
+                continue
+            if job is None:
+                self.queue.task_done()
+                return
+            try:
+                self._send(*job)
+            finally:
+                self.queue.task_done()
+
+    def _send(self, user, maps_link, doctor_email, sender_email, sender_password, count):
+        msg = build_message(user, maps_link, doctor_email, sender_email, count).as_string()
+        # A pooled connection may have been dropped by the server since its
+        # last use, so one failure on a reused connection gets a fresh retry.
+        for attempt in range(2):
+            server = None
+            try:
+                server = self.pool.checkout(sender_email, sender_password)
+                server.sendmail(sender_email, doctor_email, msg)
+                self.pool.checkin(sender_email, sender_password, server)
+                self._count("sent")
+                log.info("✅ Email sent", extra={"to": doctor_email, "alerts": count})
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                if server is not None:
+                    self.pool.discard(server)
+                if attempt == 1:
+                    self._count("failed")
+                    log.error("❌ Email failed: %s", e, extra={"to": doctor_email})
+            except Exception as e:
+                if server is not None:
+                    self.pool.discard(server)
+                self._count("failed")
+                log.error("❌ Email failed: %s", e, extra={"to": doctor_email})
+                return
+
+    def shutdown(self, wait=True, timeout=None):
+        """Stop the workers once they have sent everything queued so far.
+
+        With `timeout`, waits at most that many seconds in total and returns
+        the number of emails still queued (0 when the queue was drained).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+        threads, self._threads = self._threads, []
+        try:
+            # Sentinels go in behind the queued jobs, so workers drain first
+            for _ in threads:
+                self.queue.put(None, timeout=remaining())
+            if wait:
+                for thread in threads:
+                    thread.join(remaining())
+        except queue.Full:
+            pass
+        with self.queue.mutex:
+            left = sum(job is not None for job in self.queue.queue)
+        if left:
+            log.error("❌ Alert queue not drained on shutdown", extra={"emails": left})
+        self.pool.close_all()
+        return left
+
+
+class AlertCoalescer:
+    """Collapse bursts of alerts for the same (user, doctor_email).
+
+    The first alert for a key is passed to `send` straight away and opens a
+    window of `window` seconds. Alerts arriving inside the window are only
+    counted; when it closes, one email goes out with the latest location
+    and the count, and a new window opens. A key with no alerts in its
+    window is forgotten. `send` takes the AlertDispatcher.submit arguments.
+    """
+
+    def __init__(self, send, window=30.0):
+        self.send = send
+        self.window = window
+        self.coalesced = 0
+        self.closed = False
+        self._windows = {}  # key -> {"count": int, "latest": args}
+        self._lock = threading.Lock()
+
+    def submit(self, user, maps_link, doctor_email, sender_email, sender_password):
+        """Returns "sent" if the alert went out now, "coalesced" if it was folded into a window."""
+        args = (user, maps_link, doctor_email, sender_email, sender_password)
+        if self.window <= 0 or self.closed:
+            self.send(*args)
+            return "sent"
+
+        key = (user, doctor_email)
+        with self._lock:
+            state = self._windows.get(key)
+            if state is not None:
+                state["count"] += 1
+                state["latest"] = args
+                self.coalesced += 1
+                return "coalesced"
+            self._windows[key] = {"count": 0, "latest": None}
+
+        try:
+            self.send(*args)
+        except Exception:
+            with self._lock:
+                del self._windows[key]
+            raise
+        self._schedule(key)
+        return "sent"
+
+    def _schedule(self, key):
+        timer = threading.Timer(self.window, self._flush, args=(key,))
+        timer.daemon = True
+        timer.start()
+
+    def _flush(self, key):
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None:
+                return  # flushed by close()
+            if state["count"] == 0:
+                del self._windows[key]
+                return
+            count, latest = state["count"], state["latest"]
+            state["count"], state["latest"] = 0, None
+
+        try:
+            self.send(*latest, count=count)
+        except Exception as e:
+            log.error("❌ Coalesced alert not queued: %s", e, extra={"user": key[0]})
+        self._schedule(key)
 
+    def close(self):
+        """Send every open window's pending alert now; later alerts go straight to `send`.
 
+        Returns the number of coalesced emails handed to `send`.
+        """
+        with self._lock:
+            self.closed = True
+            pending = [(key, state) for key, state in self._windows.items() if state["count"]]
+            self._windows.clear()
+        for key, state in pending:
+            try:
+                self.send(*state["latest"], count=state["count"])
+            except Exception as e:
+                log.error("❌ Coalesced alert not queued: %s", e, extra={"user": key[0]})
+        return len(pending)
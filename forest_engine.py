@@ -0,0 +1,292 @@
+"""Flat-array inference for the fitted seizure RandomForest.
+
+The sklearn forest is compiled once into contiguous node arrays shared by all
+trees, so a whole batch is pushed through every tree with a handful of NumPy
+calls instead of sklearn's per-estimator dispatch.
+"""
+import numpy as np
+
+TREE_LEAF = -1
+BLOCK_ROWS = 1024
+MAX_MASK_LEAVES = 64
+SIGN_CLEAR = np.int64(0x7FFFFFFFFFFFFFFF)
+
+
+class FlatForest:
+    """All trees of a RandomForestClassifier packed into flat node arrays.
+
+    Node ids are global across the forest; leaves point back at themselves in
+    `left`/`right`. Forests whose trees have at most 64 leaves (our model is
+    depth 5) are additionally compiled into per-feature bitmask tables in the
+    style of QuickScorer: for every feature the split thresholds are sorted,
+    and a row's exit leaf in each tree is the lowest bit left after AND-ing
+    the masks of all splits the row fails. That turns the whole forest into
+    one searchsorted per feature plus a few table gathers. Larger trees fall
+    back to walking the node arrays level by level.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, depth, classes, n_features,
+                 input_dtype=np.float32):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.n_trees = len(roots)
+        self.input_dtype = input_dtype
+        self._class_values = [np.ascontiguousarray(value[:, k]) for k in range(value.shape[1])]
+        # 1.0 where the node's own prediction (its largest class value) is class k
+        node_vote = np.argmax(value, axis=1)
+        self._class_votes = [(node_vote == k).astype(np.float64) for k in range(value.shape[1])]
+        self._compile_masks()
+
+    @classmethod
+    def from_model(cls, model):
+        trees = [est.tree_ for est in model.estimators_]
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            nodes = np.arange(tree.node_count) + offset
+            leaf = tree.children_left == TREE_LEAF
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(np.where(leaf, 0.0, tree.threshold))
+            left.append(np.where(leaf, nodes, tree.children_left + offset))
+            right.append(np.where(leaf, nodes, tree.children_right + offset))
+            value.append(tree.value[:, 0, :])
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            left=np.concatenate(left).astype(np.intp),
+            right=np.concatenate(right).astype(np.intp),
+            value=np.ascontiguousarray(np.concatenate(value), dtype=np.float64),
+            roots=np.array(roots, dtype=np.intp),
+            depth=max(tree.max_depth for tree in trees),
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+        )
+
+    def fold_scaler(self, scaler):
+        """Return a forest that predicts straight from unscaled float64 features.
+
+        The two-step path sends a raw value x left at a split when
+        float32((x - mean) / scale) <= threshold. That map is monotone in x,
+        so the rows going left are exactly those with x <= c for one raw
+        cutoff c per split, which is found by bisecting over float64 bit
+        patterns. The folded forest therefore agrees with
+        `predict(scaler.transform(X))` on every float64 input, not just
+        approximately.
+        """
+        mean = np.zeros(self.n_features_in_) if scaler.mean_ is None else scaler.mean_
+        scale = np.ones(self.n_features_in_) if scaler.scale_ is None else scaler.scale_
+        internal = ~self.is_leaf()
+        feature = self.feature[internal]
+        threshold = self.threshold.copy()
+        threshold[internal] = _raw_cutoffs(self.threshold[internal], mean[feature], scale[feature])
+        return FlatForest(
+            self.feature, threshold, self.left, self.right, self.value, self.roots, self.depth,
+            self.classes_, self.n_features_in_, input_dtype=np.float64,
+        )
+
+    def subset(self, trees):
+        """Forest of just the given trees, in the given order."""
+        ends = np.append(self.roots[1:], len(self.feature))
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        for t in trees:
+            lo, hi = self.roots[t], ends[t]
+            shift = offset - lo
+            feature.append(self.feature[lo:hi])
+            threshold.append(self.threshold[lo:hi])
+            left.append(self.left[lo:hi] + shift)
+            right.append(self.right[lo:hi] + shift)
+            value.append(self.value[lo:hi])
+            roots.append(offset)
+            offset += hi - lo
+        return FlatForest(
+            np.concatenate(feature), np.concatenate(threshold), np.concatenate(left), np.concatenate(right),
+            np.concatenate(value), np.array(roots, dtype=np.intp), self.depth, self.classes_,
+            self.n_features_in_, input_dtype=self.input_dtype,
+        )
+
+    def is_leaf(self):
+        return self.left == np.arange(len(self.left))
+
+    def _compile_masks(self):
+        """Build the per-feature bitmask tables, or leave them unset if a tree is too big."""
+        self._mask_tables = None
+        is_leaf = self.is_leaf()
+        leaf_ids = np.zeros((self.n_trees, MAX_MASK_LEAVES), dtype=np.intp)
+        splits = [[] for _ in range(self.n_features_in_)]
+        max_leaves = 0
+
+        for t, root in enumerate(self.roots):
+            # Iterative post-order walk; leaves are numbered left to right so
+            # the lowest surviving bit is the leaf sklearn would reach.
+            leaves = []
+            stack = [(root, False)]
+            spans = {}
+            while stack:
+                node, visited = stack.pop()
+                if is_leaf[node]:
+                    spans[node] = (len(leaves), len(leaves) + 1)
+                    leaves.append(node)
+                    if len(leaves) > MAX_MASK_LEAVES:
+                        return
+                elif visited:
+                    lo, mid = spans[self.left[node]]
+                    _, hi = spans[self.right[node]]
+                    spans[node] = (lo, hi)
+                    left_bits = ((1 << (mid - lo)) - 1) << lo
+                    splits[self.feature[node]].append((self.threshold[node], t, left_bits))
+                else:
+                    stack.append((node, True))
+                    stack.append((self.right[node], False))
+                    stack.append((self.left[node], False))
+            leaf_ids[t, :len(leaves)] = leaves
+            max_leaves = max(max_leaves, len(leaves))
+
+        # Narrower masks halve the bytes moved per row when every tree fits.
+        mask_dtype = np.uint32 if max_leaves <= 32 else np.uint64
+        all_leaves = np.iinfo(mask_dtype).max
+        tables = []
+        for feature_splits in splits:
+            feature_splits.sort(key=lambda s: s[0])
+            thresholds = np.array([s[0] for s in feature_splits], dtype=np.float64)
+            masks = np.full((len(feature_splits) + 1, self.n_trees), all_leaves, dtype=mask_dtype)
+            for k, (_, t, left_bits) in enumerate(feature_splits):
+                masks[k + 1] = masks[k]
+                masks[k + 1, t] &= mask_dtype(all_leaves ^ left_bits)
+            tables.append((thresholds, masks))
+
+        self._mask_tables = tables
+        self._mask_one = mask_dtype(1)
+        self._leaf_ids = leaf_ids.ravel()
+        self._leaf_base = np.arange(self.n_trees, dtype=np.intp)[:, None] * MAX_MASK_LEAVES
+        self._slot_values = [v[self._leaf_ids] for v in self._class_values]
+        self._slot_votes = [v[self._leaf_ids] for v in self._class_votes]
+
+    def _check_input(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds;
+        # scaler-folded forests compare raw float64 values instead.
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity.")
+        return X
+
+    def _leaf_slots(self, X):
+        # A split fails (row goes right) when threshold < x, so the number of
+        # failed splits per feature is a left-sided searchsorted.
+        alive = None
+        for f, (thresholds, masks) in enumerate(self._mask_tables):
+            m = masks[np.searchsorted(thresholds, X[:, f])]
+            alive = m if alive is None else np.bitwise_and(alive, m, out=alive)
+        lowest = alive & (~alive + self._mask_one)
+        pos = np.bitwise_count(lowest - self._mask_one).T.astype(np.intp, order="C")
+        return pos + self._leaf_base
+
+    def _leaves_walk(self, X):
+        flat_X = X.ravel()
+        row_base = np.arange(len(X)) * X.shape[1]
+        idx = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.depth):
+            go_left = flat_X[row_base + self.feature[idx]] <= self.threshold[idx]
+            idx = np.where(go_left, self.left[idx], self.right[idx])
+        return idx
+
+    def _evaluate_block(self, X):
+        """Per (tree, row) leaf indices plus the per-class value and vote arrays they index."""
+        if self._mask_tables is not None:
+            return self._leaf_slots(X), self._slot_values, self._slot_votes
+        return self._leaves_walk(X), self._class_values, self._class_votes
+
+    def _apply_block(self, X):
+        if self._mask_tables is not None:
+            return self._leaf_ids[self._leaf_slots(X)]
+        return self._leaves_walk(X)
+
+    def apply(self, X):
+        """Leaf node id per (tree, row), shape (n_trees, n_rows)."""
+        X = self._check_input(X)
+        out = np.empty((self.n_trees, len(X)), dtype=np.intp)
+        for start in range(0, len(X), BLOCK_ROWS):
+            out[:, start:start + BLOCK_ROWS] = self._apply_block(X[start:start + BLOCK_ROWS])
+        return out
+
+    def _proba_block(self, X):
+        leaves, values, _ = self._evaluate_block(X)
+        # Reducing over the leading axis of a C-ordered (tree, row) array adds
+        # the trees one after another in estimator order, the same sequence
+        # sklearn accumulates in, so the averaged probabilities (and their
+        # argmax) are bit-identical.
+        proba = np.column_stack([np.add.reduce(v[leaves], axis=0) for v in values])
+        proba /= self.n_trees
+        return proba
+
+    def predict_proba(self, X):
+        X = self._check_input(X)
+        out = np.empty((len(X), self.value.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = self._proba_block(X[start:start + BLOCK_ROWS])
+        return out
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def predict_scores(self, X):
+        """predict_proba plus the fraction of trees voting for each class, from one traversal.
+
+        A tree's vote is the class its leaf predicts on its own, as in
+        `estimator.predict`; both arrays have shape (n_rows, n_classes).
+        """
+        X = self._check_input(X)
+        n_classes = self.value.shape[1]
+        proba = np.empty((len(X), n_classes), dtype=np.float64)
+        votes = np.empty((len(X), n_classes), dtype=np.float64)
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            leaves, values, node_votes = self._evaluate_block(block)
+            proba[start:start + len(block)] = np.column_stack([np.add.reduce(v[leaves], axis=0) for v in values])
+            votes[start:start + len(block)] = np.column_stack([np.add.reduce(v[leaves], axis=0) for v in node_votes])
+        proba /= self.n_trees
+        votes /= self.n_trees
+        return proba, votes
+
+
+def _float_key(x):
+    """Map float64 values to int64 keys with the same ordering."""
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return bits ^ ((bits >> 63) & SIGN_CLEAR)
+
+
+def _key_float(key):
+    return (key ^ ((key >> 63) & SIGN_CLEAR)).view(np.float64)
+
+
+def _raw_cutoffs(threshold, mean, scale):
+    """Largest raw x per split with float32((x - mean) / scale) <= threshold."""
+    def goes_left(key):
+        x = _key_float(key)
+        with np.errstate(over="ignore", invalid="ignore"):
+            return ((x - mean) / scale).astype(np.float32) <= threshold
+
+    # Invariant: lo goes left, hi does not. -inf always goes left and +inf
+    # never does, so the whole float64 line is a valid starting bracket.
+    lo = np.broadcast_to(_float_key(-np.inf), threshold.shape).copy()
+    hi = np.broadcast_to(_float_key(np.inf), threshold.shape).copy()
+    while True:
+        open_ = hi > lo + 1
+        if not open_.any():
+            return _key_float(lo)
+        mid = lo // 2 + hi // 2 + (lo % 2 + hi % 2) // 2
+        left = goes_left(mid)
+        lo = np.where(open_ & left, mid, lo)
+        hi = np.where(open_ & ~left, mid, hi)
@@ -0,0 +1,36 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# With preload_app the app module (and, in the default eager load mode, the
+# model) is imported once in the master. Forked workers then share those
+# pages copy-on-write instead of each unpickling their own copy.
+import gc
+import os
+import sys
+
+bind = os.environ.get("NEUROGUARD_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# The app reads this to refuse /stream, whose per-device windows only work
+# when every sample reaches the same process: run with WEB_CONCURRENCY=1 to
+# serve it. /metrics is per process too, so with several workers each scrape
+# only sees the worker that answered it.
+os.environ["WEB_CONCURRENCY"] = str(workers)
+# With NEUROGUARD_INFERENCE_PROCESSES the forest runs in a process pool, so
+# one front-end worker with a few threads can keep every core busy.
+threads = int(os.environ.get("NEUROGUARD_THREADS", 1))
+preload_app = os.environ.get("NEUROGUARD_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's reach; otherwise
+    # the first gc pass in each worker writes to every object header and
+    # un-shares the pages preload was meant to share.
+    if preload_app:
+        gc.freeze()
+
+
+def worker_exit(server, worker):
+    # Send the alerts still waiting in coalescing windows or the email queue
+    # before the worker goes away (atexit covers other ways of stopping)
+    app = sys.modules.get("app")
+    if app is not None:
+        app.shutdown_alerts()
@@ -0,0 +1,249 @@
+"""Run forest inference in worker processes that share the model and inputs.
+
+The Flask process stays a thin front-end: it copies each request's rows into
+a shared-memory input slot, puts (slot, rows) on a task queue and waits, and
+whichever worker process picks the task up writes class indices into the
+slot's output buffer. Nothing but two small ints goes through a pipe.
+
+The model is the scaler-folded FlatForest (bit-identical labels to
+rf_model.predict on scaled input), whose node arrays are copied once into
+one shared-memory segment that every worker maps; workers only build their
+own small bitmask tables from it. Batches larger than a slot are split
+across slots, so one big upload is spread over all workers.
+
+Processes are started with "spawn" on first use. The pool is tied to the
+process that started it: a gunicorn worker forked from a preloading master
+starts its own workers rather than sharing the master's queues. Spawned
+processes import the parent's __main__ module, which is cheap under
+gunicorn but means a full app.py import per worker under `python app.py`.
+
+If a worker process dies (say the OOM killer takes it) or a slot gets no
+result within `timeout` seconds, the pool is marked broken: the remaining
+workers are stopped, every waiting request gets a PoolError, and
+ModelBundle predicts in-process from then on. A task queue whose reader was
+killed mid-read cannot be trusted again, so the pool is not restarted; the
+next model reload builds a fresh one.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from forest_engine import FlatForest
+
+MODEL_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+# How often the collector checks that the workers are alive while no results arrive
+LIVENESS_SECONDS = 0.5
+
+log = logging.getLogger("neuroguard.pool")
+
+
+def _worker(model_name, layout, meta, slot_names, slot_rows, tasks, results):
+    # Spawned workers share the parent's resource tracker, so attaching here
+    # does not make the segments theirs to unlink; the pool unlinks on close.
+    model_shm = shared_memory.SharedMemory(name=model_name)
+    arrays = {name: np.ndarray(shape, dtype=dtype, buffer=model_shm.buf, offset=offset)
+              for name, (shape, dtype, offset) in layout.items()}
+    forest = FlatForest(**arrays, depth=meta["depth"], classes=np.array(meta["classes"]),
+                        n_features=meta["n_features"], input_dtype=np.float64)
+    n_features = meta["n_features"]
+
+    slots = []
+    for name in slot_names:
+        shm = shared_memory.SharedMemory(name=name)
+        X = np.ndarray((slot_rows, n_features), dtype=np.float64, buffer=shm.buf)
+        out = np.ndarray(slot_rows, dtype=np.uint8, buffer=shm.buf, offset=X.nbytes)
+        slots.append((shm, X, out))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        slot, n = task
+        _, X, out = slots[slot]
+        try:
+            out[:n] = np.argmax(forest.predict_proba(X[:n]), axis=1)
+            results.put((slot, None))
+        except Exception as e:
+            results.put((slot, str(e)))
+
+
+class PoolError(RuntimeError):
+    """The pool lost a worker or timed out and can no longer predict."""
+
+
+class InferencePool:
+
+    def __init__(self, forest, processes=None, slot_rows=16_384, timeout=30.0):
+        if forest.input_dtype != np.float64:
+            raise ValueError("InferencePool needs a scaler-folded forest (raw float64 input)")
+        self.forest = forest
+        self.processes = processes or os.cpu_count() or 1
+        self.slot_rows = slot_rows
+        self.n_slots = 2 * self.processes  # one being filled while one is predicted, per worker
+        self.timeout = timeout
+        self.broken = None  # reason, once the pool has failed
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._start()
+
+    def _start(self):
+        layout, offset = {}, 0
+        for name in MODEL_ARRAYS:
+            array = getattr(self.forest, name)
+            layout[name] = (array.shape, array.dtype.str, offset)
+            offset += -(-array.nbytes // 8) * 8
+        self._model_shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, (shape, dtype, at) in layout.items():
+            np.ndarray(shape, dtype=dtype, buffer=self._model_shm.buf, offset=at)[...] = getattr(self.forest, name)
+        meta = {"depth": int(self.forest.depth), "classes": self.forest.classes_.tolist(),
+                "n_features": int(self.forest.n_features_in_)}
+
+        n_features = self.forest.n_features_in_
+        self._slots = []
+        for _ in range(self.n_slots):
+            shm = shared_memory.SharedMemory(create=True, size=self.slot_rows * (8 * n_features + 1))
+            X = np.ndarray((self.slot_rows, n_features), dtype=np.float64, buffer=shm.buf)
+            out = np.ndarray(self.slot_rows, dtype=np.uint8, buffer=shm.buf, offset=X.nbytes)
+            self._slots.append((shm, X, out))
+        self._free = queue.Queue()
+        for slot in range(self.n_slots):
+            self._free.put(slot)
+        self._futures = [None] * self.n_slots
+
+        ctx = multiprocessing.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        slot_names = [shm.name for shm, _, _ in self._slots]
+        self._workers = [
+            ctx.Process(target=_worker, name=f"inference-{i}", daemon=True,
+                        args=(self._model_shm.name, layout, meta, slot_names, self.slot_rows,
+                              self._tasks, self._results))
+            for i in range(self.processes)
+        ]
+        for process in self._workers:
+            process.start()
+        self._collector = threading.Thread(target=self._collect, name="inference-results", daemon=True)
+        self._collector.start()
+        self._pid = os.getpid()
+        atexit.register(self.close)
+        log.info("⚙️ Inference pool started",
+                 extra={"processes": self.processes, "slots": self.n_slots, "slot_rows": self.slot_rows})
+
+    def _collect(self):
+        while True:
+            try:
+                item = self._results.get(timeout=LIVENESS_SECONDS)
+            except queue.Empty:
+                dead = [p for p in self._workers if not p.is_alive()]
+                if dead and self._pid == os.getpid():
+                    self._break(f"{dead[0].name} exited with code {dead[0].exitcode}")
+                    return
+                continue
+            if item is None:
+                break
+            slot, error = item
+            try:
+                self._futures[slot].set_result((slot, error))
+            except InvalidStateError:
+                pass  # already failed by _break
+
+    def _break(self, reason):
+        with self._start_lock:
+            if self.broken is not None:
+                return
+            self.broken = reason
+        log.error("❌ Inference pool broken, predicting in-process until the model is reloaded",
+                  extra={"reason": reason})
+        for process in self._workers:
+            if process.is_alive():
+                process.terminate()
+        for future in self._futures:
+            if future is not None:
+                try:
+                    future.set_exception(PoolError(reason))
+                except InvalidStateError:
+                    pass
+
+    def _submit(self, X):
+        while True:
+            if self.broken is not None:
+                raise PoolError(self.broken)
+            try:
+                slot = self._free.get(timeout=LIVENESS_SECONDS)
+                break
+            except queue.Empty:
+                continue
+        _, slot_X, _ = self._slots[slot]
+        slot_X[:len(X)] = X
+        future = Future()
+        self._futures[slot] = future
+        self._tasks.put((slot, len(X)))
+        return future
+
+    def _collect_one(self, pending, out, error):
+        start, future = pending.popleft()
+        try:
+            slot, message = future.result(timeout=self.timeout)
+        except TimeoutError:
+            self._break(f"no result within {self.timeout}s")
+            raise PoolError(self.broken) from None
+        if message is None:
+            n = min(self.slot_rows, len(out) - start)
+            out[start:start + n] = self._slots[slot][2][:n]
+        self._free.put(slot)
+        return error or message
+
+    def predict(self, X):
+        """Labels for raw float64 vitals, computed by the worker processes.
+
+        Raises PoolError if the pool is broken or breaks while predicting.
+        """
+        if self.broken is not None:
+            raise PoolError(self.broken)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.forest.n_features_in_:
+            raise ValueError(f"Expected {self.forest.n_features_in_} features, got shape {X.shape}")
+        self._ensure_started()
+
+        # At most one slot per worker in flight, and the oldest one is
+        # collected before submitting more, so a request never waits for a
+        # free slot while holding slots it has not handed to a worker.
+        out = np.empty(len(X), dtype=np.uint8)
+        pending = deque()
+        error = None
+        for start in range(0, len(X), self.slot_rows):
+            if len(pending) >= self.processes:
+                error = self._collect_one(pending, out, error)
+            pending.append((start, self._submit(X[start:start + self.slot_rows])))
+        while pending:
+            error = self._collect_one(pending, out, error)
+        if error is not None:
+            raise ValueError(error)
+        return self.forest.classes_.take(out)
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self._pid = None
+        for _ in self._workers:
+            self._tasks.put(None)
+        for process in self._workers:
+            process.join(timeout=5)
+        self._results.put(None)
+        for shm in [self._model_shm] + [shm for shm, _, _ in self._slots]:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,112 @@
+"""Leveled, structured logging that keeps stdout writes off the request path.
+
+Every NeuroGuard logger hangs under "neuroguard". Its only handler is a
+QueueHandler, so a request thread just formats the record's message and
+puts it on an in-memory queue; a QueueListener thread does the actual
+formatting and writing to stdout. The listener is (re)started in whichever
+process first logs, so gunicorn workers forked after preload get their own.
+
+Request handlers log one summary per request (rows, seizure count, stage
+timings) rather than payloads. Verbose output such as a preview of the
+uploaded rows is only produced for a NEUROGUARD_LOG_SAMPLE fraction of
+requests (default 0).
+
+NEUROGUARD_LOG_LEVEL   DEBUG/INFO/WARNING/... (default INFO)
+NEUROGUARD_LOG_FORMAT  "text" (default) or "json", one object per line
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.environ.get("NEUROGUARD_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("NEUROGUARD_LOG_FORMAT", "text")
+SAMPLE_RATE = float(os.environ.get("NEUROGUARD_LOG_SAMPLE", 0))
+
+# Attributes every LogRecord has; anything else came in through extra={...}
+_STANDARD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _extras(record):
+    return {k: v for k, v in vars(record).items() if k not in _STANDARD}
+
+
+class TextFormatter(logging.Formatter):
+
+    def format(self, record):
+        line = super().format(record)
+        extras = _extras(record)
+        if extras:
+            line += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extras(record),
+        }
+        # QueueHandler.prepare has already folded any traceback into the message
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _ProcessQueueHandler(QueueHandler):
+    """QueueHandler that starts a listener in each process that uses it."""
+
+    def __init__(self, queue_, target):
+        super().__init__(queue_)
+        self.target = target
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # A forked child inherits the queue object but not the thread
+                self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                self._pid = os.getpid()
+                atexit.register(self.stop)
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        super().enqueue(record)
+
+    def stop(self):
+        if self._pid == os.getpid():
+            self._pid = None
+            self._listener.stop()  # drains what is still queued
+
+
+def setup_logging():
+    """Attach the queue handler to the "neuroguard" logger once; returns that logger."""
+    logger = logging.getLogger("neuroguard")
+    if any(isinstance(h, _ProcessQueueHandler) for h in logger.handlers):
+        return logger
+    target = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        target.setFormatter(JSONFormatter())
+    else:
+        target.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(_ProcessQueueHandler(queue.SimpleQueue(), target))
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    return logger
+
+
+def sampled():
+    """True for a SAMPLE_RATE fraction of calls; gate verbose, per-payload logging on it."""
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
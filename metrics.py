@@ -0,0 +1,154 @@
+"""Per-stage latency histograms, rendered in the Prometheus text format.
+
+Code on the request path wraps each stage in `with stage("read_csv"):`.
+The duration goes into the neuroguard_stage_seconds histogram and, while a
+request is being timed (begin_request/end_request), into that request's
+list of timings, which app.py can send back as a Server-Timing header.
+
+Histograms are fixed bucket arrays updated under a lock. Inside a request a
+stage only appends to the request's list, and end_request only queues that
+list with the request latency; the queue is folded into the histograms in
+bulk when /metrics is rendered or every FOLD_EVERY requests, so a request
+takes no lock and does no bucket search. NEUROGUARD_METRICS=0 turns stage
+timing off entirely.
+
+The histograms live in the process that served the requests. Under several
+gunicorn workers each scrape of /metrics is answered by whichever worker
+accepts it, so it shows that worker's requests only and the counts jump
+between scrapes. Only single-worker deployments (WEB_CONCURRENCY=1, with
+threads or NEUROGUARD_INFERENCE_PROCESSES for parallelism) scrape correctly.
+"""
+import bisect
+import collections
+import contextvars
+import os
+import threading
+from time import perf_counter
+
+ENABLED = os.environ.get("NEUROGUARD_METRICS", "1") == "1"
+
+# Seconds; the implicit last bucket is +Inf
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Requests whose timings are not in the histograms yet
+FOLD_EVERY = 1024
+
+_timings = contextvars.ContextVar("neuroguard_timings", default=None)
+_finished = collections.deque()  # (endpoint, seconds, [(stage, seconds), ...])
+
+
+class Histogram:
+    """One Prometheus histogram with a single label, e.g. stage="predict"."""
+
+    def __init__(self, name, help_text, label, buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, seconds):
+        self.observe_many(((value, seconds),))
+
+    def observe_many(self, observations):
+        """Record (label value, seconds) pairs under one lock acquisition."""
+        with self._lock:
+            for value, seconds in observations:
+                series = self._series.get(value)
+                if series is None:
+                    series = self._series[value] = [0] * (len(self.buckets) + 1) + [0.0]
+                series[bisect.bisect_left(self.buckets, seconds)] += 1
+                series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {value: list(series) for value, series in self._series.items()}
+        for value, series in sorted(snapshot.items()):
+            label = f'{self.label}="{value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+STAGES = Histogram("neuroguard_stage_seconds", "Time spent in each request pipeline stage.", "stage")
+REQUESTS = Histogram("neuroguard_request_seconds", "Request latency by endpoint.", "endpoint")
+
+
+class stage:
+    """Context manager timing one pipeline stage."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if ENABLED:
+            seconds = perf_counter() - self.start
+            timings = _timings.get()
+            if timings is None:
+                STAGES.observe(self.name, seconds)
+            else:
+                timings.append((self.name, seconds))  # observed in bulk by end_request
+        return False
+
+
+def begin_request():
+    """Start collecting stage timings for the current request; returns a token for end_request."""
+    return _timings.set([]) if ENABLED else None
+
+
+def end_request(token, endpoint, seconds):
+    """Record the request latency and return its [(stage, seconds), ...]."""
+    if token is None:
+        return []
+    timings = _timings.get()
+    _timings.reset(token)
+    _finished.append((endpoint, seconds, timings))
+    if len(_finished) >= FOLD_EVERY:
+        fold()
+    return timings
+
+
+def fold():
+    """Move the finished requests' timings into the histograms."""
+    finished = []
+    try:
+        while True:
+            finished.append(_finished.popleft())
+    except IndexError:
+        pass
+    if finished:
+        STAGES.observe_many(pair for _, _, timings in finished for pair in timings)
+        REQUESTS.observe_many((endpoint, seconds) for endpoint, seconds, _ in finished)
+
+
+def stage_totals(timings):
+    """{stage: seconds} with repeated stages (e.g. per chunk) summed."""
+    totals = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return totals
+
+
+def server_timing(totals, total=None):
+    """Server-Timing header value in milliseconds from stage_totals() output."""
+    parts = ["%s;dur=%.3f" % (name, seconds * 1e3) for name, seconds in totals.items()]
+    if total is not None:
+        parts.append("total;dur=%.3f" % (total * 1e3))
+    return ", ".join(parts)
+
+
+def render():
+    fold()
+    return STAGES.render() + REQUESTS.render()
@@ -0,0 +1,84 @@
+"""Coalesce concurrent small prediction requests into one vectorized call.
+
+Each request thread hands its model and rows to `MicroBatcher.predict` and
+blocks on a future. A single background thread takes the first waiting
+request, keeps collecting until `max_rows` rows are queued or `max_wait_ms`
+has passed, runs one `model.predict` over the stacked rows and hands every
+caller its slice. Requests are only stacked with others for the same model
+object, so a request keeps the model it started with across a hot swap.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+
+    def __init__(self, max_wait_ms=2.0, max_rows=256):
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self.batches = 0
+        self.rows = 0
+        self._pending = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def predict(self, model, X):
+        """`model.predict(X)` run as part of the next batch; blocks until done."""
+        self._ensure_started()
+        future = Future()
+        self._pending.put((model, X, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            rows = len(batch[0][1])
+            deadline = time.monotonic() + self.max_wait
+            while rows < self.max_rows:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[1])
+
+            by_model = {}
+            for model, X, future in batch:
+                by_model.setdefault(id(model), (model, []))[1].append((X, future))
+            for model, items in by_model.values():
+                self._flush(model, items)
+
+    def _flush(self, model, items):
+        try:
+            y = model.predict(np.concatenate([X for X, _ in items]))
+        except Exception as e:
+            if len(items) == 1:
+                items[0][1].set_exception(e)
+                return
+            # One bad request (e.g. NaN vitals) must not fail its batchmates
+            for item in items:
+                self._flush(model, [item])
+            return
+
+        self.batches += 1
+        self.rows += len(y)
+        start = 0
+        for X, future in items:
+            future.set_result(y[start:start + len(X)])
+            start += len(X)
@@ -0,0 +1,237 @@
+"""The loaded seizure model, its scaler and the predictor built from them.
+
+Loading is kept out of import time: `load_bundle` unpickles (which is what
+pulls in scikit-learn), compiles the serving predictor and runs the canary
+row, and pandas is only touched if a DataFrame is actually passed in.
+"""
+import hashlib
+import logging
+import sys
+import time
+import weakref
+
+import numpy as np
+
+from compact_model import CompactForest
+from decision_table import DecisionTable
+from early_exit import EarlyExitForest
+from forest_engine import FlatForest
+from inference_pool import InferencePool, PoolError
+from metrics import stage
+from prediction_cache import PredictionCache
+
+FEATURES = ["heart_rate", "temperature", "spo2", "vibration_intensity"]
+# Resting vitals that every model version must classify as no seizure
+CANARY_ROW = [60, 36.5, 98, 0.1]
+CANARY_LABEL = 0
+
+log = logging.getLogger("neuroguard.model")
+
+
+def is_frame(data):
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(data, pd.DataFrame)
+
+
+class ModelBundle:
+    """rf_model + scaler + the predictor for one serving engine.
+
+    "flat" serves predictions from the compiled node arrays (bit-identical
+    to rf_model.predict), "fused" additionally folds the scaler into the
+    split thresholds so raw vitals skip scaler.transform, "table" looks
+    on-grid rows up in a DecisionTable built from the fused forest (which
+    also serves the off-grid rows), "compact" serves the majority vote of
+    the trees straight from a CompactForest's tables (`compact`, normally
+    memory-mapped from a file, in which case rf_model and scaler may be
+    None; else built from them), "early" stops each row's vote once
+    the remaining trees cannot change it (same labels as "fused"; trees
+    are ordered by agreement on `calibration` rows, or on CANARY_ROW), and
+    "sklearn" keeps the original estimator path.
+
+    `scorer` is the FlatForest behind predict_scores: the predictor itself
+    for "flat" and "fused", the table's fallback forest for "table", the
+    full fused forest for "early" and a compiled copy of rf_model for
+    "sklearn". "compact" keeps no leaf probabilities, so it has no scorer
+    and predict_scores raises ValueError.
+
+    With cache_size > 0 predictions go through a PredictionCache of that
+    many rows, which lives and dies with this bundle.
+
+    With processes > 0 batches of at least `pool_min_rows` rows are
+    predicted by an InferencePool of that many worker processes, which is
+    shut down once the bundle is no longer referenced (e.g. after a hot
+    swap, when the last request on the old version finishes). If the pool
+    breaks (a worker dies or stops answering), those batches are predicted
+    in-process instead.
+    """
+
+    def __init__(self, rf_model, scaler, engine="flat", version=None, cache_size=0,
+                 processes=0, pool_min_rows=1024, compact=None, calibration=None):
+        if engine == "compact" and compact is None:
+            compact = CompactForest.from_model(rf_model, scaler)
+        if engine == "compact":
+            fitted = compact.features or FEATURES
+        else:
+            fitted = list(getattr(scaler, "feature_names_in_", FEATURES))
+        if fitted != FEATURES:
+            raise ValueError(f"Scaler was fitted on {fitted}, expected {FEATURES}")
+
+        self.rf_model = rf_model
+        self.scaler = scaler
+        self.engine = engine
+        self.version = version
+        self.loaded_at = time.time()
+        # Engines whose predictor takes raw vitals instead of scaled ones
+        self.raw_input = engine in ("fused", "table", "compact", "early")
+        if engine == "sklearn":
+            self.predictor = rf_model
+            self.scorer = FlatForest.from_model(rf_model)
+        elif engine == "fused":
+            self.predictor = self.scorer = FlatForest.from_model(rf_model).fold_scaler(scaler)
+        elif engine == "table":
+            self.scorer = FlatForest.from_model(rf_model).fold_scaler(scaler)
+            self.predictor = DecisionTable.build(self.scorer)
+        elif engine == "compact":
+            self.predictor = compact
+            self.scorer = None
+        elif engine == "early":
+            self.scorer = FlatForest.from_model(rf_model).fold_scaler(scaler)
+            calibration = np.array([CANARY_ROW], dtype=np.float64) if calibration is None else calibration
+            self.predictor = EarlyExitForest.by_agreement(self.scorer, calibration)
+        else:
+            self.predictor = self.scorer = FlatForest.from_model(rf_model)
+        self.cache = PredictionCache(self._predict_array, cache_size) if cache_size > 0 else None
+        self.pool = None
+        self.pool_min_rows = pool_min_rows
+        if processes > 0:
+            if engine == "compact":
+                fused = compact.to_flat()  # copied once into the pool's shared memory
+            elif self.raw_input:
+                fused = self.scorer
+            else:
+                fused = FlatForest.from_model(rf_model).fold_scaler(scaler)
+            self.pool = InferencePool(fused, processes)
+            weakref.finalize(self, self.pool.close)
+
+    def scale_array(self, X):
+        """StandardScaler.transform arithmetic on a float64 array, minus sklearn's validation."""
+        if self.scaler.mean_ is not None:
+            X = X - self.scaler.mean_
+        if self.scaler.scale_ is not None:
+            X = X / self.scaler.scale_
+        return X
+
+    def predict(self, data):
+        """Predict labels for unscaled vitals (DataFrame or array in FEATURES order)."""
+        if is_frame(data):
+            if not self.raw_input and self.cache is None and self.pool is None:
+                with stage("scale"):
+                    scaled = self.scaler.transform(data)
+                with stage("predict"):
+                    return self.predictor.predict(scaled)
+            data = frame_to_array(data)
+        else:
+            data = np.asarray(data, dtype=np.float64)
+        if self.cache is not None:
+            return self.cache.predict(data)
+        return self._predict_array(data)
+
+    def predict_scores(self, data, threshold=None):
+        """Labels, seizure probability and seizure vote fraction per row, in one forest pass.
+
+        Without a threshold the labels are exactly those of predict();
+        with one, a row is labelled seizure when its probability is at
+        least `threshold`.
+        """
+        if self.scorer is None:
+            raise ValueError(f"The {self.engine} engine keeps no leaf probabilities, so it cannot return scores")
+        data = frame_to_array(data) if is_frame(data) else np.asarray(data, dtype=np.float64)
+        if not self.raw_input:
+            with stage("scale"):
+                data = self.scale_array(data)
+        with stage("predict"):
+            proba, votes = self.scorer.predict_scores(data)
+        classes = self.scorer.classes_
+        if threshold is None:
+            labels = classes.take(np.argmax(proba, axis=1))
+        else:
+            labels = classes.take((proba[:, 1] >= threshold).astype(np.intp))
+        return labels, proba[:, 1], votes[:, 1]
+
+    def _predict_array(self, data):
+        if self.pool is not None and self.pool.broken is None and len(data) >= self.pool_min_rows:
+            try:
+                with stage("predict"):
+                    return self.pool.predict(data)
+            except PoolError:
+                pass  # logged once by the pool; serve this batch in-process
+        if not self.raw_input:
+            with stage("scale"):
+                data = self.scale_array(data)
+        with stage("predict"):
+            return self.predictor.predict(data)
+
+
+def frame_to_array(data):
+    if list(data.columns) != FEATURES:
+        raise ValueError(f"Expected columns {FEATURES}, got {list(data.columns)}")
+    return data.to_numpy(dtype=np.float64)
+
+
+def file_version(*paths):
+    """Short content hash of the model files, used as the model version."""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_bundle(model_path="seizure_model.pkl", scaler_path="scaler.pkl", engine="flat", mmap=False, cache_size=0,
+                processes=0, compact_path=None, calibration_path=None):
+    """Unpickle the model and scaler, build the predictor and check the canary row.
+
+    With engine="compact" and a compact_path (see compact_model.py) the
+    forest is memory-mapped from that file instead: the pickles are not
+    read (nor scikit-learn imported), and the version is the file's. With
+    engine="early", a calibration_path CSV of vitals (FEATURES columns)
+    sets the tree order.
+
+    Raises ValueError if the canary row is not classified as CANARY_LABEL.
+    """
+    start = time.perf_counter()
+    mmap_mode = "r" if mmap else None
+    compact = None
+    if engine == "compact" and compact_path:
+        compact = CompactForest.load(compact_path)
+    calibration = None
+    if engine == "early" and calibration_path:
+        import pandas as pd
+
+        calibration = frame_to_array(pd.read_csv(calibration_path))
+    if compact is not None:
+        rf_model = scaler = None
+        version = file_version(compact_path)
+    else:
+        import joblib
+
+        rf_model = joblib.load(model_path, mmap_mode=mmap_mode)
+        scaler = joblib.load(scaler_path, mmap_mode=mmap_mode)
+        version = file_version(model_path, scaler_path)
+    bundle = ModelBundle(
+        rf_model,
+        scaler,
+        engine,
+        version=version,
+        cache_size=cache_size,
+        processes=processes,
+        compact=compact,
+        calibration=calibration,
+    )
+    test_pred = bundle.predict(np.array([CANARY_ROW]))
+    log.debug("🔍 Canary prediction", extra={"row": CANARY_ROW, "label": int(test_pred[0])})
+    if test_pred[0] != CANARY_LABEL:
+        raise ValueError(f"Canary row {CANARY_ROW} predicted {test_pred[0]}, expected {CANARY_LABEL}")
+    log.info("✅ Model loaded", extra={"version": bundle.version, "engine": engine,
+                                      "seconds": round(time.perf_counter() - start, 2)})
+    return bundle
@@ -0,0 +1,79 @@
+"""LRU cache of forest predictions keyed on the raw vitals row.
+
+Wearables report integer heart rates, one-decimal temperatures and a few
+vibration levels, so the same (heart_rate, temperature, spo2,
+vibration_intensity) rows come back over and over, and the forest's answer
+for a row never changes. A batch is reduced to its unique rows, cached rows
+are answered from the cache, the rest go through one predict call, and the
+labels are scattered back with the inverse index.
+
+A cache belongs to one model version: ModelBundle creates a fresh one, so a
+hot swap starts empty.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+
+    def __init__(self, predict, max_entries=100_000):
+        self._predict = predict
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def predict(self, X):
+        """Labels for the float64 rows of X, predicting only rows not seen before."""
+        if len(X) == 0:
+            return self._predict(X)
+        # Each row viewed as one opaque 32-byte value: np.unique sorts those
+        # several times faster than it sorts rows with axis=0, and the bytes
+        # double as the dict keys.
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        rows = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+        if len(rows) == 1:
+            unique, inverse = rows, np.zeros(1, dtype=np.intp)
+        else:
+            unique, inverse = np.unique(rows, return_inverse=True)
+        keys = unique.tolist()
+
+        labels = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                label = self._entries.get(key)
+                if label is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    labels[i] = label
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            predicted = self._predict(unique[missing].view(np.float64).reshape(len(missing), X.shape[1]))
+            with self._lock:
+                for i, label in zip(missing, predicted.tolist()):
+                    labels[i] = label
+                    self._entries[keys[i]] = label
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return np.asarray(labels)[inverse]
@@ -0,0 +1,68 @@
+"""Response encodings for seizure predictions.
+
+"labels" is the original list of English strings. The compact formats all
+carry one 0/1 label per row (1 = seizure):
+
+- "bits": np.packbits, most significant bit first, padded to whole bytes
+- "bytes": one uint8 per row
+- "intervals": [start, end) row ranges of consecutive seizure rows
+
+As JSON the binary formats are base64 in "data"; with
+Accept: application/octet-stream the raw bytes are the body and the row
+count travels in the X-Rows header.
+
+Scores (seizure probability and tree vote fraction per row) are JSON lists
+with SCORE_ENCODINGS "json", or base64 little-endian float16 arrays with
+"float16", under 3 characters per value against up to ~20 for a JSON
+float.
+"""
+import base64
+
+import numpy as np
+
+FORMATS = ("labels", "bits", "bytes", "intervals")
+BINARY_FORMATS = ("bits", "bytes")
+SCORE_ENCODINGS = ("json", "float16")
+
+
+def to_labels(y_pred):
+    return ["Seizure Detected" if p == 1 else "No Seizure Detected" for p in y_pred]
+
+
+def to_bits(y_pred):
+    return np.packbits(np.asarray(y_pred) == 1).tobytes()
+
+
+def to_bytes(y_pred):
+    return (np.asarray(y_pred) == 1).astype(np.uint8).tobytes()
+
+
+def to_intervals(y_pred, offset=0):
+    seizure = (np.asarray(y_pred) == 1).astype(np.int8)
+    edges = np.flatnonzero(np.diff(seizure, prepend=0, append=0))
+    return (edges.reshape(-1, 2) + offset).tolist()
+
+
+def to_binary(y_pred, fmt):
+    return to_bits(y_pred) if fmt == "bits" else to_bytes(y_pred)
+
+
+def encode_json(y_pred, fmt, offset=0):
+    """JSON-ready dict for one batch of predictions starting at row `offset`."""
+    if fmt == "labels":
+        return {"predictions": to_labels(y_pred)}
+    if fmt == "intervals":
+        return {"rows": len(y_pred), "intervals": to_intervals(y_pred, offset)}
+    data = base64.b64encode(to_binary(y_pred, fmt)).decode("ascii")
+    return {"rows": len(y_pred), "encoding": fmt, "data": data}
+
+
+def encode_scores(probability, votes, encoding):
+    """JSON-ready "scores" value for per-row seizure probabilities and vote fractions."""
+    if encoding == "json":
+        return {"probability": probability.tolist(), "votes": votes.tolist()}
+    return {
+        "encoding": encoding,
+        "probability": base64.b64encode(probability.astype("<f2").tobytes()).decode("ascii"),
+        "votes": base64.b64encode(votes.astype("<f2").tobytes()).decode("ascii"),
+    }
@@ -0,0 +1,211 @@
+"""Durable per-patient prediction history in SQLite (WAL mode).
+
+Predictions are stored as segments rather than one SQL row per reading:
+each segment holds up to SEGMENT_ROWS consecutive readings of one patient
+as a float64 vitals blob and a np.packbits label blob, plus its first
+timestamp and the sampling interval, so reading i was taken at
+t_start + i * interval. A history query selects the overlapping segments
+through the (patient, t_end) index and decodes them with numpy, which keeps
+a million-row range to a handful of rows and blobs.
+
+Request threads only enqueue; one writer thread per process drains the
+queue and commits whatever is waiting in a single transaction every
+`flush_ms`, so persistence adds no commit to a request's latency. If the
+writer falls `max_queue` segments behind, new segments are dropped and
+counted rather than blocking requests. Readers use their own connection per
+thread; WAL lets them run alongside the writer, and gunicorn workers
+sharing the file take turns through SQLite's busy timeout.
+"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+SEGMENT_ROWS = 65_536
+N_FEATURES = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    patient INTEGER NOT NULL REFERENCES patients(id),
+    t_start REAL NOT NULL,
+    t_end REAL NOT NULL,
+    interval REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    seizures INTEGER NOT NULL,
+    model_version TEXT,
+    vitals BLOB NOT NULL,
+    labels BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_patient_end ON segments (patient, t_end);
+"""
+
+log = logging.getLogger("neuroguard.store")
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # With WAL, NORMAL only risks the last commits on power loss, never corruption
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class History:
+    """Readings of one patient in time order, as returned by PredictionStore.history."""
+
+    def __init__(self, timestamps, vitals, labels, segments):
+        self.timestamps = timestamps
+        self.vitals = vitals
+        self.labels = labels
+        self.segments = segments  # [{"offset", "start", "interval", "rows", "model_version"}]
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class Recorder:
+    """Appends one upload's chunks to the store, continuing the timestamps across chunks."""
+
+    def __init__(self, store, patient, model_version, start, interval):
+        self.store = store
+        self.patient = patient
+        self.model_version = model_version
+        self.start = start
+        self.interval = interval
+        self.rows = 0
+
+    def __call__(self, X, y_pred):
+        X = np.asarray(X, dtype=np.float64)
+        for offset in range(0, len(X), SEGMENT_ROWS):
+            stop = min(offset + SEGMENT_ROWS, len(X))
+            t_start = self.start + (self.rows + offset) * self.interval
+            self.store.enqueue((self.patient, t_start, self.interval, self.model_version,
+                                X[offset:stop], np.asarray(y_pred[offset:stop]) == 1))
+        self.rows += len(X)
+
+
+class PredictionStore:
+
+    def __init__(self, path, flush_ms=200.0, max_queue=10_000):
+        self.path = path
+        self.flush = flush_ms / 1000.0
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._local = threading.local()
+        with connect(path) as conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name="prediction-store", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def recorder(self, patient, model_version, start=None, interval=0.0):
+        """Callable (X, y_pred) that stores one upload's readings, taken from `start` every `interval` s."""
+        return Recorder(self, str(patient), model_version, time.time() if start is None else start, interval)
+
+    def enqueue(self, segment):
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(segment)
+        except queue.Full:
+            self.dropped += len(segment[4])
+            log.warning("❌ Prediction store queue full, segment dropped", extra={"rows": len(segment[4])})
+
+    def _run(self):
+        conn = connect(self.path)
+        patients = {}
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._write(conn, patients, batch)
+            except Exception:
+                log.exception("❌ Prediction store write failed", extra={"segments": len(batch)})
+                patients.clear()
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write(self, conn, patients, batch):
+        rows = []
+        with conn:  # one transaction for the whole batch
+            for patient, t_start, interval, version, X, seizure in batch:
+                if patient not in patients:
+                    conn.execute("INSERT OR IGNORE INTO patients (name) VALUES (?)", (patient,))
+                    patients[patient] = conn.execute("SELECT id FROM patients WHERE name = ?",
+                                                     (patient,)).fetchone()[0]
+                rows.append((patients[patient], t_start, t_start + (len(X) - 1) * interval, interval, len(X),
+                             int(seizure.sum()), version, X.tobytes(), np.packbits(seizure).tobytes()))
+            conn.executemany(
+                "INSERT INTO segments (patient, t_start, t_end, interval, rows, seizures, model_version, vitals, labels)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.written += sum(row[4] for row in rows)
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def history(self, patient, start=None, end=None, with_vitals=True):
+        """History of readings with start <= timestamp <= end (either bound optional).
+
+        Segments come back in order of their first timestamp. Without
+        `with_vitals` the vitals blobs are not read and `vitals` is None.
+        """
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        cursor = self._reader().execute(
+            f"SELECT s.t_start, s.interval, s.rows, s.model_version, {'s.vitals' if with_vitals else 'NULL'}, s.labels"
+            " FROM segments s JOIN patients p ON p.id = s.patient"
+            " WHERE p.name = ? AND s.t_end >= ? AND s.t_start <= ?"
+            " ORDER BY s.t_start, s.id", (str(patient), start, end))
+        timestamps, vitals, labels, segments = [], [], [], []
+        offset = 0
+        for t_start, interval, rows, version, X, packed in cursor:
+            ts = t_start + np.arange(rows) * interval
+            keep = slice(np.searchsorted(ts, start, "left"), np.searchsorted(ts, end, "right"))
+            ts = ts[keep]
+            if not len(ts):
+                continue
+            timestamps.append(ts)
+            if with_vitals:
+                vitals.append(np.frombuffer(X, dtype=np.float64).reshape(rows, N_FEATURES)[keep])
+            labels.append(np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=rows)[keep])
+            segments.append({"offset": offset, "start": float(ts[0]), "interval": interval,
+                             "rows": len(ts), "model_version": version})
+            offset += len(ts)
+        if not segments:
+            return History(np.empty(0), np.empty((0, N_FEATURES)) if with_vitals else None,
+                           np.empty(0, dtype=np.uint8), [])
+        return History(np.concatenate(timestamps), np.concatenate(vitals) if with_vitals else None,
+                       np.concatenate(labels), segments)
+
+    def stats(self):
+        return {"path": self.path, "written_rows": self.written, "dropped_rows": self.dropped,
+                "queued_segments": self.queue.qsize()}
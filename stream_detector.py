@@ -0,0 +1,128 @@
+"""Per-device streaming seizure detection over sliding windows.
+
+Every device gets a fixed slot in preallocated arrays: a ring buffer of its
+last `window` vitals rows and model votes, plus running sums. A new sample
+overwrites the oldest one and the sums are patched with the difference, so
+rolling means, standard deviations and the seizure-vote fraction cost O(1)
+per sample no matter how long the window is.
+
+The classifier still sees one sample at a time: the forest was trained on
+single readings, not on window features, so each sample gets its own vote
+and a device's state comes from the fraction of seizure votes in its
+window. The rolling means and standard deviations are reported alongside,
+not fed to the model.
+
+Memory is bounded by `max_devices`: when every slot is taken the least
+recently seen device is evicted. The arrays come from np.zeros, so pages
+are only backed once a slot is actually used.
+
+State lives in the process that owns the detector. Behind several server
+workers a device's samples would be spread over unrelated windows, so the
+app only serves /stream with a single worker (WEB_CONCURRENCY=1).
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class StreamDetector:
+
+    def __init__(self, features, window=30, max_devices=100_000, seizure_fraction=0.5, min_samples=5):
+        self.features = list(features)
+        self.window = window
+        self.max_devices = max_devices
+        self.seizure_fraction = seizure_fraction
+        self.min_samples = min(min_samples, window)
+
+        n_features = len(self.features)
+        self.samples = np.zeros((max_devices, window, n_features), dtype=np.float32)
+        self.votes = np.zeros((max_devices, window), dtype=np.uint8)
+        self.sums = np.zeros((max_devices, n_features), dtype=np.float64)
+        self.sumsq = np.zeros((max_devices, n_features), dtype=np.float64)
+        self.vote_count = np.zeros(max_devices, dtype=np.int32)
+        self.head = np.zeros(max_devices, dtype=np.int32)
+        self.filled = np.zeros(max_devices, dtype=np.int32)
+
+        self._slots = OrderedDict()  # device id -> slot, least recently seen first
+        self._free = list(range(max_devices - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def nbytes(self):
+        arrays = (self.samples, self.votes, self.sums, self.sumsq, self.vote_count, self.head, self.filled)
+        return sum(a.nbytes for a in arrays)
+
+    def _slot(self, device):
+        slot = self._slots.get(device)
+        if slot is not None:
+            self._slots.move_to_end(device)
+            return slot
+        if self._free:
+            slot = self._free.pop()
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self._reset(slot)
+        self._slots[device] = slot
+        return slot
+
+    def _reset(self, slot):
+        self.sums[slot] = 0
+        self.sumsq[slot] = 0
+        self.vote_count[slot] = 0
+        self.head[slot] = 0
+        self.filled[slot] = 0
+
+    def _push(self, slot, x, vote):
+        h = self.head[slot]
+        if self.filled[slot] == self.window:
+            old = self.samples[slot, h].astype(np.float64)
+            self.sums[slot] -= old
+            self.sumsq[slot] -= old * old
+            self.vote_count[slot] -= self.votes[slot, h]
+        else:
+            self.filled[slot] += 1
+
+        # Sums are built from the stored float32 values, so removing a
+        # sample later subtracts exactly what was added.
+        self.samples[slot, h] = x
+        stored = self.samples[slot, h].astype(np.float64)
+        self.sums[slot] += stored
+        self.sumsq[slot] += stored * stored
+        self.votes[slot, h] = vote
+        self.vote_count[slot] += vote
+        self.head[slot] = (h + 1) % self.window
+
+    def ingest(self, devices, X, y_pred):
+        """Push rows X[i] with model labels y_pred[i] for devices[i], in order.
+
+        Returns the window summary of every device touched, keyed by device id.
+        """
+        with self._lock:
+            touched = {}
+            for device, x, label in zip(devices, X, y_pred):
+                slot = self._slot(device)
+                self._push(slot, x, 1 if label == 1 else 0)
+                touched[device] = slot
+            return {device: self._summary(slot) for device, slot in touched.items()}
+
+    def summary(self, device):
+        with self._lock:
+            slot = self._slots.get(device)
+            return None if slot is None else self._summary(slot)
+
+    def _summary(self, slot):
+        n = int(self.filled[slot])
+        mean = self.sums[slot] / n
+        std = np.sqrt(np.maximum(self.sumsq[slot] / n - mean * mean, 0.0))
+        fraction = float(self.vote_count[slot]) / n
+        seizure = n >= self.min_samples and fraction >= self.seizure_fraction
+        return {
+            "state": "seizure" if seizure else "normal",
+            "seizure_fraction": round(fraction, 4),
+            "samples": n,
+            "mean": dict(zip(self.features, np.round(mean, 4).tolist())),
+            "std": dict(zip(self.features, np.round(std, 4).tolist())),
+        }
@@ -0,0 +1,74 @@
+import os
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+MODEL_PATH = os.path.join(ROOT, "seizure_model.pkl")
+SCALER_PATH = os.path.join(ROOT, "scaler.pkl")
+ADMIN_TOKEN = "test-token"
+
+# app.py reads its settings at import, whichever test module imports it first
+os.environ.setdefault("NEUROGUARD_MODEL_PATH", MODEL_PATH)
+os.environ.setdefault("NEUROGUARD_SCALER_PATH", SCALER_PATH)
+os.environ.setdefault("NEUROGUARD_ADMIN_TOKEN", ADMIN_TOKEN)
+
+
+def random_vitals(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.normal(100, 30, n),      # heart_rate
+        rng.normal(36.5, 4.5, n),    # temperature
+        rng.normal(92, 9, n),        # spo2
+        rng.gamma(1.2, 0.13, n),     # vibration_intensity
+    ])
+
+
+def device_vitals(n, seed=0):
+    """Vitals at the wearables' resolution, so rows repeat."""
+    X = random_vitals(n, seed)
+    X[:, 0] = np.round(X[:, 0])
+    X[:, 1] = np.round(X[:, 1], 1)
+    X[:, 2] = np.round(np.clip(X[:, 2], 0, 100))
+    X[:, 3] = np.round(X[:, 3], 1)
+    return X
+
+
+def scale(scaler, X):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # ndarray input to a scaler fitted on a DataFrame
+        return scaler.transform(X)
+
+
+def to_csv(X):
+    header = "heart_rate,temperature,spo2,vibration_intensity"
+    return (header + "\n" + "".join(",".join(repr(float(v)) for v in row) + "\n" for row in X)).encode()
+
+
+@pytest.fixture(scope="session")
+def rf_model():
+    import joblib
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope="session")
+def scaler():
+    import joblib
+    return joblib.load(SCALER_PATH)
+
+
+@pytest.fixture(scope="session")
+def reference(rf_model, scaler):
+    """rf_model.predict(scaler.transform(X)), the labels every engine must reproduce."""
+    return lambda X: rf_model.predict(scale(scaler, X))
+
+
+@pytest.fixture(scope="session")
+def fused(rf_model, scaler):
+    from forest_engine import FlatForest
+    return FlatForest.from_model(rf_model).fold_scaler(scaler)
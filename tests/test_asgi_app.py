@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("a2wsgi")
+pytest.importorskip("multipart")
+
+import asgi_app  # noqa: E402
+from conftest import random_vitals, to_csv  # noqa: E402
+from prediction_encoding import to_labels  # noqa: E402
+
+BOUNDARY = "neuroguard-test"
+
+
+def request(method, target, body=b"", headers=()):
+    """(status, headers, body) of one request to asgi_app.app, driven without a server."""
+    path, _, query = target.partition("?")
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+             "root_path": "", "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+             "headers": [(b"host", b"testserver"), (b"content-length", str(len(body)).encode())]
+             + [(name.lower().encode(), value.encode()) for name, value in headers]}
+    response = {"body": b""}
+
+    async def run():
+        done = asyncio.Event()
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {k.decode().lower(): v.decode() for k, v in message["headers"]}
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+                if not message.get("more_body"):
+                    done.set()
+
+        await asgi_app.app(scope, receive, send)
+
+    asyncio.run(run())
+    return response["status"], response["headers"], response["body"]
+
+
+def upload(target, payload, filename="vitals.csv", headers=()):
+    body = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: text/csv\r\n\r\n").encode() + payload + f"\r\n--{BOUNDARY}--\r\n".encode()
+    return request("POST", target, body, [("Content-Type", f"multipart/form-data; boundary={BOUNDARY}"),
+                                          *headers])
+
+
+@pytest.fixture(scope="module")
+def X():
+    return random_vitals(300, seed=21)
+
+
+def test_wsgi_bridge_is_a2wsgi():
+    assert asgi_app.WSGIMiddleware.__module__.startswith("a2wsgi")
+
+
+def test_upload(reference, X):
+    status, _, body = upload("/upload", to_csv(X))
+    assert status == 200, body
+    assert json.loads(body)["predictions"] == to_labels(reference(X))
+
+
+def test_upload_octet_stream(reference, X):
+    status, headers, body = upload("/upload?format=bits", to_csv(X),
+                                   headers=[("Accept", "application/octet-stream")])
+    assert status == 200 and headers["x-rows"] == str(len(X))
+    assert body == np.packbits(reference(X) == 1).tobytes()
+
+
+def test_upload_streamed(reference, X):
+    status, _, body = upload("/upload?stream=1&format=bytes", to_csv(X))
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert status == 200 and lines[-1] == {"rows": len(X)}
+
+
+def test_upload_errors():
+    assert upload("/upload", b"a,b\n1,2\n")[0] == 400
+    assert upload("/upload?format=nope", b"")[0] == 400
+    assert request("POST", "/upload", b"", [("Content-Type", "multipart/form-data; boundary=x")])[0] == 400
+
+
+def test_flask_routes_are_mounted(reference, X):
+    status, headers, body = request("POST", "/predict", json.dumps(X.tolist()).encode(),
+                                    [("Content-Type", "application/json")])
+    assert status == 200, body
+    assert json.loads(body)["predictions"] == to_labels(reference(X))
+    assert request("GET", "/jobs/unknown")[0] == 404
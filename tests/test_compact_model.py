@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from compact_model import CompactForest, convert
+from conftest import MODEL_PATH, SCALER_PATH, device_vitals, random_vitals, scale
+from forest_engine import FlatForest
+from model_bundle import load_bundle
+
+
+@pytest.fixture(scope="module")
+def compact_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("compact") / "seizure_model.ngf")
+    convert(MODEL_PATH, SCALER_PATH, path)
+    return path
+
+
+def test_tree_votes_match_sklearn_trees(rf_model, scaler, compact_path):
+    compact = CompactForest.load(compact_path)
+    X = np.vstack([random_vitals(20_000), device_vitals(20_000, seed=1)])
+    _, tree_votes = FlatForest.from_model(rf_model).predict_scores(scale(scaler, X))
+    votes = compact.votes(X)
+    assert np.array_equal(votes, np.rint(tree_votes[:, 1] * compact.n_trees).astype(np.int32))
+    assert np.array_equal(compact._votes_walk(X), votes)
+    assert np.array_equal(compact.predict(X), (2 * votes > compact.n_trees).astype(compact.predict(X).dtype))
+
+
+def test_bundle_serves_from_file(rf_model, scaler, compact_path, reference):
+    bundle = load_bundle(engine="compact", compact_path=compact_path)
+    assert bundle.rf_model is None
+    X = device_vitals(20_000, seed=2)
+    # Majority vote and sklearn's mean probability only part on tied votes
+    assert (bundle.predict(X) == reference(X)).mean() > 0.999
+    with pytest.raises(ValueError):
+        bundle.predict_scores(X)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from conftest import random_vitals
+from decision_table import GRID, DecisionTable
+
+CHUNK = 500_000
+
+
+@pytest.fixture(scope="module")
+def table(fused):
+    return DecisionTable.build(fused)
+
+
+def full_grid():
+    axes = [np.arange(lo, hi + 1) / denom for lo, hi, denom in GRID]
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(GRID))
+
+
+def test_every_grid_point_matches_forest(table, fused):
+    grid = full_grid()
+    index, on_grid = table.grid_index(grid)
+    assert on_grid.all()
+    assert np.array_equal(index, np.arange(len(grid)))
+    for i in range(0, len(grid), CHUNK):
+        X = grid[i:i + CHUNK]
+        assert np.array_equal(table.predict(X), fused.predict(X)), f"grid mismatch in rows {i}+"
+
+
+def test_grid_sample_matches_sklearn(table, reference):
+    grid = full_grid()
+    X = grid[np.random.default_rng(0).choice(len(grid), 200_000, replace=False)]
+    assert np.array_equal(table.predict(X), reference(X))
+
+
+@pytest.mark.parametrize("data", ["random", "one ulp above", "one ulp below"])
+def test_off_grid_rows_take_the_forest(table, reference, data):
+    grid = full_grid()
+    near = grid[np.random.default_rng(1).choice(len(grid), 50_000)]
+    X = {
+        "random": random_vitals(50_000),
+        "one ulp above": np.nextafter(near, np.inf),
+        "one ulp below": np.nextafter(near, -np.inf),
+    }[data]
+    assert not table.grid_index(X)[1].all()
+    assert np.array_equal(table.predict(X), reference(X))
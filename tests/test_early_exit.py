@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from conftest import device_vitals, random_vitals
+from early_exit import EarlyExitForest
+from model_bundle import CANARY_ROW
+from synthetic import vitals
+
+
+@pytest.fixture(scope="module")
+def X():
+    return np.vstack([vitals(20_000, devices=50, seed=3)[0], random_vitals(5_000), device_vitals(5_000)])
+
+
+@pytest.mark.parametrize("order", ["estimator", "canary", "sample"])
+@pytest.mark.parametrize("step", [1, 4, 8])
+def test_labels_match_sklearn(fused, reference, X, order, step):
+    if order == "estimator":
+        early = EarlyExitForest(fused, step=step)
+    else:
+        sample = np.array([CANARY_ROW], dtype=np.float64) if order == "canary" else vitals(2_000, devices=5, seed=9)[0]
+        early = EarlyExitForest.by_agreement(fused, sample, step=step)
+    labels, trees = early.predict_counted(X)
+    assert np.array_equal(labels, reference(X))
+    assert trees.min() >= fused.n_trees // 2 + 1
+    # Rows settled early count the trees they used; the few left open also count the full forest's pass
+    fallback = trees > fused.n_trees
+    assert (trees[fallback] == 2 * fused.n_trees).all() and fallback.mean() < 0.01
+
+
+def test_rows_within_margin_fall_back_to_full_forest(fused):
+    # With an impossible margin no row can exit early, so every label comes from the fallback
+    early = EarlyExitForest(fused, margin=np.inf)
+    X = random_vitals(2_000)
+    labels, trees = early.predict_counted(X)
+    assert np.array_equal(labels, fused.predict(X))
+    # Every stage ran, then the full forest again
+    assert (trees == 2 * fused.n_trees).all()
+    assert early.stats()["trees_per_row"] == 2 * fused.n_trees
+
+
+def test_rejects_bad_order(fused):
+    with pytest.raises(ValueError):
+        EarlyExitForest(fused, order=np.zeros(fused.n_trees, dtype=int))
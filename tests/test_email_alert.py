@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+import email_alert
+from email_alert import AlertCoalescer, AlertDispatcher
+from smtp_sink import SMTPSink
+
+
+@pytest.fixture(scope="module")
+def sink():
+    return SMTPSink().start_in_thread()
+
+
+@pytest.fixture
+def dispatcher(sink, monkeypatch):
+    monkeypatch.setattr(email_alert, "SMTP_HOST", sink.host)
+    monkeypatch.setattr(email_alert, "SMTP_PORT", sink.port)
+    monkeypatch.setattr(email_alert, "SMTP_STARTTLS", False)
+    dispatcher = AlertDispatcher(workers=2)
+    yield dispatcher
+    dispatcher.shutdown(timeout=5)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def alert(user, lat=0):
+    return (user, f"https://www.google.com/maps?q={lat},0", "doctor@example.com", "watch@example.com", None)
+
+
+def test_dispatcher_sends_every_email_over_pooled_connections(sink, dispatcher):
+    before = sink.messages
+    for i in range(20):
+        dispatcher.submit(*alert("u", i))
+    assert dispatcher.shutdown(timeout=5) == 0
+    assert dispatcher.sent == 20 and dispatcher.failed == 0
+    assert sink.messages - before == 20
+
+
+def test_dispatcher_counts_failures(dispatcher, monkeypatch):
+    monkeypatch.setattr(email_alert, "SMTP_PORT", 1)  # nothing listens there
+    dispatcher.submit(*alert("u"))
+    dispatcher.shutdown(timeout=5)
+    assert dispatcher.sent == 0 and dispatcher.failed == 1
+
+
+def test_coalescer_sends_one_email_per_window(sink, dispatcher):
+    coalescer = AlertCoalescer(dispatcher.submit, window=0.3)
+    before = sink.messages
+    states = [coalescer.submit(*alert(user, i)) for i in range(5) for user in ("a", "b")]
+    assert states == ["sent", "sent"] + ["coalesced"] * 8
+    assert wait_for(lambda: sink.messages - before == 2)
+    # The window closes with one email per user carrying the 4 folded alerts
+    assert wait_for(lambda: sink.messages - before == 4)
+    time.sleep(0.4)
+    assert sink.messages - before == 4
+    assert coalescer.coalesced == 8
+
+
+def test_close_flushes_open_windows(sink, dispatcher):
+    coalescer = AlertCoalescer(dispatcher.submit, window=60)
+    before = sink.messages
+    for i in range(3):
+        coalescer.submit(*alert("a", i))
+    assert coalescer.close() == 1
+    assert coalescer.submit(*alert("a")) == "sent"  # no new windows once closed
+    assert dispatcher.shutdown(timeout=5) == 0
+    assert sink.messages - before == 3
+
+
+def test_shutdown_wait_is_bounded():
+    dispatcher = AlertDispatcher(workers=1)
+    dispatcher._send = lambda *args: time.sleep(0.2)
+    for i in range(10):
+        dispatcher.submit(*alert("u", i))
+    start = time.monotonic()
+    left = dispatcher.shutdown(timeout=0.3)
+    assert time.monotonic() - start < 0.6
+    assert 0 < left < 10
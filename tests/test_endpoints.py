@@ -0,0 +1,111 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+import app as neuroguard
+from conftest import ADMIN_TOKEN, device_vitals, random_vitals, scale, to_csv
+from model_bundle import FEATURES
+from prediction_encoding import to_labels
+
+
+@pytest.fixture(scope="module")
+def client():
+    return neuroguard.app.test_client()
+
+
+@pytest.fixture(scope="module")
+def X():
+    return np.vstack([random_vitals(500, seed=7), device_vitals(500, seed=8)])
+
+
+def test_predict_rows(client, reference, X):
+    response = client.post("/predict", json=X.tolist())
+    assert response.status_code == 200, response.data
+    assert response.json["predictions"] == to_labels(reference(X))
+
+
+def test_predict_columns_with_scores(client, rf_model, scaler, X):
+    response = client.post("/predict?scores=1", json={f: X[:, i].tolist() for i, f in enumerate(FEATURES)})
+    assert response.status_code == 200, response.data
+    scaled = scale(scaler, X)
+    assert response.json["predictions"] == to_labels(rf_model.predict(scaled))
+    assert np.array_equal(response.json["scores"]["probability"], rf_model.predict_proba(scaled)[:, 1])
+
+
+@pytest.mark.parametrize("stream", ["0", "1"])
+def test_upload_csv(client, reference, X, stream):
+    response = client.post(f"/upload?stream={stream}", data={"file": (io.BytesIO(to_csv(X)), "vitals.csv")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200, response.data
+    if stream == "1":
+        lines = [json.loads(line) for line in response.data.splitlines()]
+        assert lines[-1] == {"rows": len(X)}
+        labels = [label for line in lines[:-1] for label in line["predictions"]]
+    else:
+        labels = response.json["predictions"]
+    assert labels == to_labels(reference(X))
+
+
+def test_upload_npy(client, reference, X):
+    buffer = io.BytesIO()
+    np.save(buffer, X)
+    buffer.seek(0)
+    response = client.post("/upload", data={"file": (buffer, "vitals.npy")}, content_type="multipart/form-data")
+    assert response.status_code == 200, response.data
+    assert response.json["predictions"] == to_labels(reference(X))
+
+
+@pytest.mark.parametrize("body", [{"rows": 1}, [[1, 2, 3]], [[70, 36.5, float("nan"), 0.1]]])
+def test_predict_rejects_bad_vitals(client, body):
+    assert client.post("/predict", json=body).status_code == 400
+
+
+def test_admin_requires_token(client):
+    assert client.get("/admin/model").status_code == 403
+    assert client.get("/admin/model", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/model", headers={"X-Admin-Token": ADMIN_TOKEN}).status_code == 200
+
+
+def test_metrics_and_server_timing(client, monkeypatch):
+    def count(text, series):
+        return sum(float(line.split()[-1]) for line in text.splitlines() if line.startswith(series))
+
+    before = client.get("/metrics").data.decode()
+    monkeypatch.setattr(neuroguard, "SERVER_TIMING", True)
+    response = client.post("/predict", json=[[70, 36.5, 97, 0.1]])
+    assert {part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")} >= {"parse", "predict", "total"}
+    after = client.get("/metrics").data.decode()
+    series = 'neuroguard_request_seconds_count{endpoint="/predict"}'
+    assert count(after, series) == count(before, series) + 1
+
+
+def test_stream(client):
+    samples = device_vitals(8, seed=9)
+    response = client.post("/stream", json=[{"device": "w1", "samples": samples[:5].tolist()},
+                                            {"device": "w2", "samples": samples[5:].tolist()}])
+    assert response.status_code == 200, response.data
+    devices = response.json["devices"]
+    assert devices["w1"]["samples"] == 5 and devices["w2"]["samples"] == 3
+    assert client.get("/stream/w1").json["samples"] == 5
+
+
+@pytest.mark.parametrize("body", [[], {"device": "w3", "samples": []}])
+def test_stream_without_samples(client, body):
+    response = client.post("/stream", json=body)
+    assert response.status_code == 200, response.data
+    assert response.json["devices"] == {}
+
+
+@pytest.mark.parametrize("body", [[{"samples": []}], {"device": "w4", "samples": [[1, 2]]}, "w5"])
+def test_stream_rejects_bad_entries(client, body):
+    assert client.post("/stream", json=body).status_code == 400
+    assert client.post("/stream", data="not json", content_type="application/json").status_code == 400
+
+
+def test_stream_refused_with_several_workers(client, monkeypatch):
+    monkeypatch.setattr(neuroguard, "STREAM_WORKERS", 2)
+    samples = device_vitals(3, seed=10).tolist()
+    assert client.post("/stream", json={"device": "w6", "samples": samples}).status_code == 503
+    assert client.get("/stream/w6").status_code == 503
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from conftest import random_vitals, scale
+from forest_engine import FlatForest
+from model_bundle import ModelBundle
+
+
+def boundary_vitals(fused, base):
+    """`base` with one feature set to each split's raw cutoff and one ulp either side."""
+    rows = []
+    internal = ~fused.is_leaf()
+    for f, cutoff in zip(fused.feature[internal], fused.threshold[internal]):
+        for x in (np.nextafter(cutoff, -np.inf), cutoff, np.nextafter(cutoff, np.inf)):
+            row = base.copy()
+            row[f] = x
+            rows.append(row)
+    return np.array(rows)
+
+
+@pytest.mark.parametrize("n", [1, 100, 10_000])
+def test_flat_matches_sklearn(rf_model, scaler, n):
+    X = scale(scaler, random_vitals(n))
+    flat = FlatForest.from_model(rf_model)
+    assert np.array_equal(flat.predict(X), rf_model.predict(X))
+    assert np.array_equal(flat.predict_proba(X), rf_model.predict_proba(X))
+
+
+@pytest.mark.parametrize("data", ["random", "rounded", "split boundaries"])
+def test_fold_scaler_matches_two_step(rf_model, scaler, fused, data):
+    raw = random_vitals(20_000, seed=1)
+    X = {
+        "random": raw,
+        "rounded": np.round(raw, 1),
+        "split boundaries": np.vstack([boundary_vitals(fused, row) for row in raw[:5]]),
+    }[data]
+    X_scaled = scale(scaler, X)
+    assert np.array_equal(fused.predict(X), rf_model.predict(X_scaled))
+    assert np.array_equal(fused.predict_proba(X), rf_model.predict_proba(X_scaled))
+
+
+def test_predict_scores_match_sklearn(rf_model, scaler):
+    bundle = ModelBundle(rf_model, scaler, "flat")
+    X = random_vitals(5_000, seed=4)
+    scaled = bundle.scale_array(X)
+    y, probability, votes = bundle.predict_scores(X)
+    assert np.array_equal(y, rf_model.predict(scaled))
+    assert np.array_equal(probability, rf_model.predict_proba(scaled)[:, 1])
+    tree_votes = np.mean([est.predict(scaled.astype(np.float32)) for est in rf_model.estimators_], axis=0)
+    assert np.allclose(votes, tree_votes, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("engine", ["flat", "fused", "table", "early", "sklearn"])
+def test_bundle_engines_agree(rf_model, scaler, reference, engine):
+    X = np.vstack([random_vitals(3_000, seed=5), np.round(random_vitals(3_000, seed=6))])
+    assert np.array_equal(ModelBundle(rf_model, scaler, engine).predict(X), reference(X))
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from conftest import random_vitals
+from model_bundle import ModelBundle
+
+
+@pytest.fixture
+def pooled(rf_model, scaler):
+    bundle = ModelBundle(rf_model, scaler, "fused", processes=1, pool_min_rows=1)
+    yield bundle
+    bundle.pool.close()
+
+
+def test_pool_labels_match_in_process(pooled, rf_model, scaler, reference):
+    local = ModelBundle(rf_model, scaler, "fused")
+    # One row, a partial slot, and more rows than a slot so the batch is split
+    for n in (1, 1000, pooled.pool.slot_rows * 2 + 3):
+        X = random_vitals(n, seed=n)
+        assert np.array_equal(pooled.predict(X), local.predict(X))
+        assert np.array_equal(pooled.predict(X), reference(X))
+    assert pooled.pool.broken is None
+
+
+def test_dead_worker_falls_back_to_in_process(pooled, reference):
+    X = random_vitals(5000, seed=1)
+    assert np.array_equal(pooled.predict(X), reference(X))
+    worker = pooled.pool._workers[0]
+    worker.kill()
+    worker.join()
+
+    # The request that finds the worker gone gets its labels in-process
+    assert np.array_equal(pooled.predict(X), reference(X))
+    assert "exited" in pooled.pool.broken
+    assert np.array_equal(pooled.predict(X[:10]), reference(X[:10]))
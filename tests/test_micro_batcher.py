@@ -0,0 +1,80 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from conftest import random_vitals
+from micro_batcher import MicroBatcher
+
+
+class EchoModel:
+    """Labels each row with its first column and records the batch sizes it saw."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        if np.isnan(X).any():
+            raise ValueError("Input contains NaN")
+        return X[:, 0].astype(np.int64)
+
+
+def run_batch(batcher, requests):
+    """Queue every (model, X) before the batcher starts, so they land in one batch."""
+    futures = []
+    for model, X in requests:
+        future = Future()
+        batcher._pending.put((model, X, future))
+        futures.append(future)
+    batcher._ensure_started()
+    return [future.exception(timeout=10) or future.result() for future in futures]
+
+
+def rows(*labels):
+    return np.column_stack([labels, np.zeros(len(labels))])
+
+
+def test_results_are_scattered_to_their_requests():
+    batcher = MicroBatcher(max_wait_ms=50, max_rows=1000)
+    model = EchoModel()
+    results = run_batch(batcher, [(model, rows(1)), (model, rows(2, 3, 4)), (model, rows(5, 6))])
+    assert [r.tolist() for r in results] == [[1], [2, 3, 4], [5, 6]]
+    assert model.calls == [6]
+    assert (batcher.batches, batcher.rows) == (1, 6)
+
+
+def test_requests_are_grouped_by_model():
+    batcher = MicroBatcher(max_wait_ms=50, max_rows=1000)
+    old, new = EchoModel(), EchoModel()
+    # Interleaved, as around a hot swap: each request keeps the model it started with
+    results = run_batch(batcher, [(old, rows(1, 2)), (new, rows(3)), (old, rows(4)), (new, rows(5, 6))])
+    assert [r.tolist() for r in results] == [[1, 2], [3], [4], [5, 6]]
+    assert old.calls == [3] and new.calls == [3]
+    assert batcher.batches == 2
+
+
+def test_bad_request_does_not_fail_its_batchmates():
+    batcher = MicroBatcher(max_wait_ms=50, max_rows=1000)
+    model = EchoModel()
+    results = run_batch(batcher, [(model, rows(1)), (model, rows(np.nan, 2)), (model, rows(3, 4))])
+    assert results[0].tolist() == [1] and results[2].tolist() == [3, 4]
+    assert isinstance(results[1], ValueError)
+    assert model.calls == [5, 1, 2, 2]
+    assert (batcher.batches, batcher.rows) == (2, 3)
+
+
+def test_concurrent_requests_match_direct_prediction(fused):
+    batcher = MicroBatcher(max_wait_ms=5, max_rows=64)
+    batches = [random_vitals(n, seed=n) for n in range(1, 41)]
+    with ThreadPoolExecutor(8) as clients:
+        results = list(clients.map(lambda X: batcher.predict(fused, X), batches))
+    for X, y in zip(batches, results):
+        assert np.array_equal(y, fused.predict(X))
+    assert batcher.rows == sum(map(len, batches))
+
+
+def test_error_reaches_the_caller():
+    batcher = MicroBatcher(max_wait_ms=1)
+    with pytest.raises(ValueError, match="NaN"):
+        batcher.predict(EchoModel(), rows(np.nan))
@@ -0,0 +1,116 @@
+import copy
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pytest
+
+import app as neuroguard
+from app import ModelRegistry
+from conftest import ADMIN_TOKEN, MODEL_PATH, SCALER_PATH, random_vitals
+
+WATCH_SECONDS = 0.05
+
+
+@pytest.fixture
+def paths(tmp_path):
+    model, scaler = str(tmp_path / "model.pkl"), str(tmp_path / "scaler.pkl")
+    shutil.copy(MODEL_PATH, model)
+    shutil.copy(SCALER_PATH, scaler)
+    return model, scaler
+
+
+def replace(path, write):
+    # Write next to the target and swap it in, as a deploy should
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def fewer_trees(rf_model, n):
+    smaller = copy.deepcopy(rf_model)
+    smaller.estimators_ = smaller.estimators_[:n]
+    smaller.n_estimators = n
+    return smaller
+
+
+def flipped(rf_model):
+    """A forest that votes the other class everywhere, so it fails the canary."""
+    model = copy.deepcopy(rf_model)
+    for tree in model.estimators_:
+        tree.tree_.value[:] = tree.tree_.value[:, :, ::-1]
+    return model
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_reload_swaps_and_old_bundle_keeps_serving(paths, rf_model, reference):
+    registry = ModelRegistry(*paths, "flat")
+    old = registry.current(watch=False)
+    replace(paths[0], lambda p: joblib.dump(fewer_trees(rf_model, 60), p))
+    new = registry.reload()
+    assert registry.current(watch=False) is new
+    assert new.version != old.version
+    assert registry.last_reload == {"status": "ok", "version": new.version, "previous": old.version,
+                                    "at": registry.last_reload["at"]}
+    # A request that took the old bundle before the swap finishes on it
+    X = random_vitals(1_000)
+    assert np.array_equal(old.predict(X), reference(X))
+    assert new.rf_model.n_estimators == 60
+
+
+def test_canary_failure_keeps_the_old_bundle(paths, rf_model):
+    registry = ModelRegistry(*paths, "flat")
+    old = registry.current(watch=False)
+    replace(paths[0], lambda p: joblib.dump(flipped(rf_model), p))
+    with pytest.raises(ValueError, match="Canary"):
+        registry.reload()
+    assert registry.current(watch=False) is old
+    assert registry.last_reload["status"] == "failed"
+
+
+def test_watcher_retries_failed_files_only_after_they_change(paths, rf_model, monkeypatch):
+    registry = ModelRegistry(*paths, "flat", watch_seconds=WATCH_SECONDS)
+    old = registry.current()
+    loads = []
+    load = registry._load
+    monkeypatch.setattr(registry, "_load", lambda: loads.append(1) or load())
+
+    replace(paths[0], lambda p: open(p, "wb").write(b"not a pickle"))
+    assert wait_for(lambda: registry.last_reload["status"] == "failed")
+    time.sleep(20 * WATCH_SECONDS)
+    assert len(loads) == 1
+    assert registry.current() is old
+
+    replace(paths[0], lambda p: joblib.dump(fewer_trees(rf_model, 60), p))
+    assert wait_for(lambda: registry.last_reload["status"] == "ok")
+    assert len(loads) == 2
+    assert registry.current().rf_model.n_estimators == 60
+
+
+def test_admin_reload(paths, rf_model, monkeypatch):
+    registry = ModelRegistry(*paths, "flat", reload_stamp=paths[0] + ".stamp")
+    monkeypatch.setattr(neuroguard, "registry", registry)
+    client = neuroguard.app.test_client()
+    old = registry.current(watch=False)
+    headers = {"X-Admin-Token": ADMIN_TOKEN}
+
+    replace(paths[0], lambda p: joblib.dump(flipped(rf_model), p))
+    response = client.post("/admin/reload?wait=1", headers=headers)
+    assert response.status_code == 422 and "Canary" in response.json["error"]
+    assert client.get("/admin/model", headers=headers).json["version"] == old.version
+
+    replace(paths[0], lambda p: joblib.dump(fewer_trees(rf_model, 60), p))
+    response = client.post("/admin/reload?wait=1", headers=headers)
+    assert response.status_code == 200
+    assert response.json["version"] == registry.current(watch=False).version != old.version
+    assert os.path.exists(paths[0] + ".stamp")  # announced to the other workers
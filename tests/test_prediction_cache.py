@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from conftest import device_vitals, random_vitals
+from model_bundle import ModelBundle
+from prediction_cache import PredictionCache
+
+
+@pytest.mark.parametrize("make", [device_vitals, random_vitals])
+@pytest.mark.parametrize("n", [1, 100, 20_000])
+def test_cached_labels_match_uncached(rf_model, scaler, make, n):
+    plain = ModelBundle(rf_model, scaler, "flat")
+    cached = ModelBundle(rf_model, scaler, "flat", cache_size=1_000_000)
+    X = make(n, seed=1)
+    expected = plain.predict(X)
+    assert np.array_equal(cached.predict(X), expected)  # cold
+    assert np.array_equal(cached.predict(X), expected)  # warm
+    Y = make(n, seed=2)
+    assert np.array_equal(cached.predict(Y), plain.predict(Y))  # partly seen
+
+
+def test_predicts_each_unique_row_once():
+    calls = []
+
+    def predict(X):
+        calls.append(len(X))
+        return (X[:, 0] > 100).astype(np.int64)
+
+    cache = PredictionCache(predict)
+    X = np.array([[90.0, 36.5, 97, 0.1], [120.0, 38, 90, 0.5]] * 50)
+    assert np.array_equal(cache.predict(X), np.tile([0, 1], 50))
+    assert np.array_equal(cache.predict(X[::-1]), np.tile([1, 0], 50))
+    assert calls == [2]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+
+def test_evicts_least_recently_used():
+    cache = PredictionCache(lambda X: np.zeros(len(X), dtype=np.int64), max_entries=10)
+    cache.predict(np.arange(40, dtype=np.float64).reshape(10, 4))
+    cache.predict(np.arange(40, dtype=np.float64).reshape(10, 4)[:1])  # refresh the first row
+    cache.predict(np.arange(100, 120, dtype=np.float64).reshape(5, 4))
+    assert len(cache) == 10
+    misses = cache.misses
+    cache.predict(np.arange(4, dtype=np.float64).reshape(1, 4))
+    assert cache.misses == misses  # still cached
+
+
+def test_empty_batch():
+    cache = PredictionCache(lambda X: np.zeros(len(X), dtype=np.int64))
+    assert len(cache.predict(np.empty((0, 4)))) == 0
@@ -0,0 +1,114 @@
+import base64
+import io
+import json
+
+import numpy as np
+import pytest
+
+import app as neuroguard
+from conftest import random_vitals, to_csv
+from prediction_encoding import encode_json, encode_scores, to_binary, to_intervals
+
+OCTET = {"Accept": "application/octet-stream"}
+
+
+def decode_binary(data, fmt, rows):
+    packed = np.frombuffer(data, dtype=np.uint8)
+    return (np.unpackbits(packed, count=rows) if fmt == "bits" else packed).astype(np.int64)
+
+
+def decode_json(body, fmt, offset=0):
+    """Labels of rows [offset, offset + body["rows"]), as a client would rebuild them."""
+    if fmt == "intervals":
+        y = np.zeros(body["rows"], dtype=np.int64)
+        for start, end in body["intervals"]:
+            y[start - offset:end - offset] = 1
+        return y
+    return decode_binary(base64.b64decode(body["data"]), fmt, body["rows"])
+
+
+LABELS = [[], [0], [1], [1, 0, 0, 1, 1], [1] * 8, [0] * 7 + [1], [1] + [0] * 8 + [1],
+          (np.random.default_rng(3).random(1001) < 0.2).astype(int).tolist()]
+
+
+@pytest.mark.parametrize("fmt", ["bits", "bytes", "intervals"])
+@pytest.mark.parametrize("y", LABELS)
+def test_json_round_trip(fmt, y):
+    y = np.array(y, dtype=np.int64)
+    for offset in (0, 13):
+        body = json.loads(json.dumps(encode_json(y, fmt, offset)))
+        assert decode_json(body, fmt, offset).tolist() == y.tolist()
+
+
+@pytest.mark.parametrize("fmt", ["bits", "bytes"])
+@pytest.mark.parametrize("y", LABELS)
+def test_binary_round_trip(fmt, y):
+    y = np.array(y, dtype=np.int64)
+    data = to_binary(y, fmt)
+    assert len(data) == ((len(y) + 7) // 8 if fmt == "bits" else len(y))
+    assert decode_binary(data, fmt, len(y)).tolist() == y.tolist()
+
+
+def test_intervals_are_half_open_seizure_runs():
+    assert to_intervals([0, 1, 1, 0, 1]) == [[1, 3], [4, 5]]
+    assert to_intervals([1, 1, 0], offset=10) == [[10, 12]]
+    assert to_intervals([0, 0]) == []
+
+
+def test_float16_scores_round_trip():
+    probability, votes = np.linspace(0, 1, 11), np.linspace(1, 0, 11)
+    scores = encode_scores(probability, votes, "float16")
+    decoded = np.frombuffer(base64.b64decode(scores["probability"]), dtype="<f2")
+    assert np.allclose(decoded, probability, atol=1e-3)
+    assert np.allclose(np.frombuffer(base64.b64decode(scores["votes"]), dtype="<f2"), votes, atol=1e-3)
+
+
+@pytest.fixture(scope="module")
+def client():
+    return neuroguard.app.test_client()
+
+
+@pytest.fixture(scope="module")
+def X():
+    return random_vitals(203, seed=11)
+
+
+@pytest.fixture(scope="module")
+def y(reference, X):
+    y = reference(X)
+    assert 0 < y.sum() < len(y)
+    return y
+
+
+@pytest.mark.parametrize("fmt", ["bits", "bytes", "intervals"])
+def test_predict_formats(client, X, y, fmt):
+    body = client.post(f"/predict?format={fmt}", json=X.tolist()).json
+    assert decode_json(body, fmt).tolist() == y.tolist()
+
+
+@pytest.mark.parametrize("fmt", ["bits", "bytes"])
+def test_octet_stream_body(client, X, y, fmt):
+    response = client.post(f"/predict?format={fmt}", json=X.tolist(), headers=OCTET)
+    assert response.mimetype == "application/octet-stream"
+    assert response.headers["X-Rows"] == str(len(y)) and response.headers["X-Encoding"] == fmt
+    assert decode_binary(response.data, fmt, len(y)).tolist() == y.tolist()
+
+
+def test_octet_stream_defaults_to_bytes(client, X, y):
+    response = client.post("/upload", data={"file": (io.BytesIO(to_csv(X)), "vitals.csv")},
+                           content_type="multipart/form-data", headers=OCTET)
+    assert response.headers["X-Encoding"] == "bytes"
+    assert decode_binary(response.data, "bytes", int(response.headers["X-Rows"])).tolist() == y.tolist()
+
+
+@pytest.mark.parametrize("fmt", ["bits", "bytes", "intervals"])
+def test_streamed_upload_offsets(client, monkeypatch, X, y, fmt):
+    monkeypatch.setattr(neuroguard, "CHUNK_ROWS", 50)
+    response = client.post(f"/upload?stream=1&format={fmt}", data={"file": (io.BytesIO(to_csv(X)), "vitals.csv")},
+                           content_type="multipart/form-data")
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [line["offset"] for line in lines[:-1]] == [0, 50, 100, 150, 200]
+    assert lines[-1] == {"rows": len(y)}
+    # Intervals carry absolute row numbers, so each line decodes against its own offset
+    labels = np.concatenate([decode_json(line, fmt, line["offset"]) for line in lines[:-1]])
+    assert labels.tolist() == y.tolist()
@@ -0,0 +1,105 @@
+import io
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import app as neuroguard
+import prediction_store
+from conftest import ADMIN_TOKEN, device_vitals, to_csv
+from prediction_store import PredictionStore
+from upload_dedup import UploadCache
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PredictionStore(str(tmp_path / "history.db"), flush_ms=5)
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(neuroguard, "prediction_store", store)
+    return neuroguard.app.test_client()
+
+
+def record(store, patient, n, start=0.0, interval=1.0, seed=0):
+    X = device_vitals(n, seed)
+    y = (np.arange(n) % 3 == 0).astype(np.int64)
+    store.recorder(patient, "v1", start=start, interval=interval)(X, y)
+    store.queue.join()
+    return X, y
+
+
+def test_segments_split_at_segment_rows(store, monkeypatch):
+    monkeypatch.setattr(prediction_store, "SEGMENT_ROWS", 10)
+    X, y = record(store, "p", 25, start=100.0)
+    found = store.history("p")
+    assert [(s["offset"], s["start"], s["rows"]) for s in found.segments] == [(0, 100.0, 10), (10, 110.0, 10),
+                                                                              (20, 120.0, 5)]
+    assert np.array_equal(found.timestamps, 100.0 + np.arange(25))
+    assert np.array_equal(found.vitals, X)
+    assert np.array_equal(found.labels, y)
+
+
+def test_bounds_are_inclusive_inside_a_segment(store):
+    X, y = record(store, "p", 20, start=0.0, interval=0.5)
+    found = store.history("p", 2.0, 4.0)  # readings 4..8
+    assert np.array_equal(found.timestamps, [2.0, 2.5, 3.0, 3.5, 4.0])
+    assert np.array_equal(found.vitals, X[4:9])
+    assert np.array_equal(found.labels, y[4:9])
+    assert found.segments == [{"offset": 0, "start": 2.0, "interval": 0.5, "rows": 5, "model_version": "v1"}]
+    # Bounds between readings keep only the readings inside them
+    assert np.array_equal(store.history("p", 2.1, 3.9).timestamps, [2.5, 3.0, 3.5])
+    assert len(store.history("p", 100.0)) == 0
+    assert len(store.history("other")) == 0
+
+
+def test_full_queue_drops_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(prediction_store, "SEGMENT_ROWS", 10)
+    store = PredictionStore(str(tmp_path / "history.db"), max_queue=2)
+    monkeypatch.setattr(store, "_ensure_started", lambda: None)  # no writer drains the queue
+    store.recorder("p", "v1", start=0.0)(device_vitals(35), np.zeros(35, dtype=np.int64))
+    assert store.queue.qsize() == 2
+    assert store.dropped == 15
+    assert store.stats()["dropped_rows"] == 15
+
+
+def test_history_accepts_iso_times(client, store):
+    start = datetime(2026, 1, 1, 12, 0, 0).timestamp()
+    record(store, "amy", 60, start=start)
+    response = client.get("/history?user=amy&from=2026-01-01T12:00:10&to=2026-01-01T12:00:19")
+    assert response.status_code == 200, response.data
+    assert response.json["rows"] == 10
+    assert response.json["from"] == start + 10 and response.json["to"] == start + 19
+
+
+@pytest.mark.parametrize("bound", ["from=nan", "to=inf", "from=-inf", "from=yesterday"])
+def test_history_rejects_bad_bounds(client, bound):
+    assert client.get(f"/history?user=amy&{bound}").status_code == 400
+
+
+def test_history_vitals_need_the_admin_token(client, store):
+    X, _ = record(store, "amy", 5)
+    assert client.get("/history?user=amy&vitals=1").status_code == 403
+    response = client.get("/history?user=amy&vitals=1", headers={"X-Admin-Token": ADMIN_TOKEN})
+    assert response.status_code == 200
+    assert np.array_equal(response.json["vitals"], X)
+    assert "vitals" not in client.get("/history?user=amy").json
+
+
+def test_repeated_uploads_are_recorded_with_the_upload_cache_on(client, store, monkeypatch):
+    monkeypatch.setattr(neuroguard, "upload_cache", UploadCache(1 << 20))
+    csv = to_csv(device_vitals(1, seed=3))
+
+    def upload(query):
+        response = client.post(f"/upload?user=bob{query}", data={"file": (io.BytesIO(csv), "v.csv")})
+        assert response.status_code == 200, response.data
+        store.queue.join()
+
+    for _ in range(3):
+        upload("")  # new readings each time, never answered from the cache
+    assert len(store.history("bob")) == 3
+    for _ in range(3):
+        upload("&recorded_at=1000")  # exact retries: stored once
+    assert len(store.history("bob", 1000, 1000)) == 1
+    assert neuroguard.upload_cache.hits == 2
@@ -0,0 +1,91 @@
+import hashlib
+import io
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from flask import Request
+
+import app as neuroguard
+from conftest import device_vitals, to_csv
+from upload_dedup import ENTRY_OVERHEAD, HashingSpool, UploadCache, stream_digest
+
+
+@pytest.mark.parametrize("size", [1_000, 50_000])
+def test_hashing_spool_digest_matches_stream_digest(size):
+    data = np.random.default_rng(size).bytes(size)
+    spool = HashingSpool(max_size=10_000, mode="rb+")
+    for i in range(0, size, 4096):
+        spool.write(data[i:i + 4096])
+    assert spool._rolled == (size > 10_000)
+    assert spool.hexdigest() == stream_digest(io.BytesIO(data))
+    assert stream_digest(spool) == hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def test_stream_digest_rewinds():
+    stream = io.BytesIO(b"heart_rate\n60\n")
+    stream.read(3)
+    stream_digest(stream, block_size=4)
+    assert stream.read() == b"heart_rate\n60\n"
+
+
+def entry_bytes(rows):
+    return (rows + 7) // 8 + ENTRY_OVERHEAD
+
+
+def test_upload_cache_evicts_least_recently_used_by_bytes():
+    y = np.arange(16) % 3 == 0
+    cache = UploadCache(3 * entry_bytes(16))
+    for key in "abc":
+        cache.put(key, y)
+    assert cache.get("a").tolist() == y.astype(np.int64).tolist()
+    cache.put("d", y)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.bytes == 3 * entry_bytes(16)
+
+    cache.put("a", y)  # replacing an entry does not count it twice
+    assert cache.bytes == 3 * entry_bytes(16)
+    cache.put("big", np.zeros(8 * 4 * entry_bytes(16)))  # over the whole budget: not cached
+    assert cache.get("big") is None and cache.stats()["entries"] == 3
+
+    cache.put("e", np.zeros(8 * (entry_bytes(16) + 1)))  # needs two slots: "a" was put last
+    assert [cache.get(key) is None for key in "acde"] == [False, True, True, False]
+    assert cache.bytes <= cache.max_bytes
+
+
+def test_model_version_change_misses():
+    cache = UploadCache(1 << 20)
+    payload = to_csv(device_vitals(10))
+    old, new = SimpleNamespace(version="v1"), SimpleNamespace(version="v2")
+    cache.put(neuroguard.upload_cache_key("a.csv", io.BytesIO(payload), old), np.ones(10))
+    assert cache.get(neuroguard.upload_cache_key("b.csv", io.BytesIO(payload), old)) is not None
+    assert cache.get(neuroguard.upload_cache_key("a.csv", io.BytesIO(payload), new)) is None
+    assert cache.get(neuroguard.upload_cache_key("a.npy", io.BytesIO(payload), old)) is None
+
+
+@pytest.fixture
+def cached_client(monkeypatch):
+    monkeypatch.setattr(neuroguard, "upload_cache", UploadCache(1 << 20))
+    monkeypatch.setattr(neuroguard.app, "request_class", neuroguard.HashingRequest)
+    return neuroguard.app.test_client()
+
+
+def test_upload_hashes_while_spooling(cached_client, monkeypatch):
+    streams = []
+    key = neuroguard.upload_cache_key
+    monkeypatch.setattr(neuroguard, "upload_cache_key", lambda filename, stream, *args: (
+        streams.append(stream), key(filename, stream, *args))[1])
+
+    payload = to_csv(device_vitals(2_000, seed=5))  # over SPOOL_MAX_SIZE, so spooled to disk
+    responses = [cached_client.post("/upload?format=bits", data={"file": (io.BytesIO(payload), "vitals.csv")})
+                 for _ in range(2)]
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json == responses[1].json
+    assert all(isinstance(stream, HashingSpool) for stream in streams) and len(streams) == 2
+    assert neuroguard.upload_cache.hits == 1 and neuroguard.upload_cache.misses == 1
+
+
+def test_upload_cache_off_by_default():
+    assert neuroguard.upload_cache is None
+    assert neuroguard.app.request_class is Request
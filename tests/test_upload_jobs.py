@@ -0,0 +1,150 @@
+import base64
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+import app as neuroguard
+from conftest import device_vitals, to_csv
+from upload_jobs import STATUS_FILE, BitWriter, JobRunner
+
+JOB_ID = "0" * 32
+
+
+def labels(n, seed=0):
+    return (np.random.default_rng(seed).random(n) < 0.3).astype(np.int64)
+
+
+def write_labels(path, y, chunks):
+    writer = BitWriter(path)
+    for part in np.split(y, np.cumsum(chunks)[:-1]):
+        writer.write(part)
+    writer.close()
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("chunks", [[37], [3, 5, 13, 1, 7, 8], [8, 8, 8, 13], [1] * 37])
+def test_bit_writer_carries_partial_bytes(tmp_path, chunks):
+    y = labels(37)
+    write_labels(tmp_path / "labels.bits", y, chunks)
+    assert (tmp_path / "labels.bits").read_bytes() == np.packbits(y == 1).tobytes()
+
+
+def test_read_labels_any_row_range(tmp_path):
+    runner = JobRunner(str(tmp_path), None)
+    os.makedirs(tmp_path / JOB_ID)
+    y = labels(53, seed=1)
+    write_labels(runner.result_path(JOB_ID), y, [13, 13, 27])
+    for start in range(len(y) + 1):
+        for stop in range(start, len(y) + 1):
+            assert runner.read_labels(JOB_ID, start, stop).tolist() == y[start:stop].tolist(), (start, stop)
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def test_sweep(tmp_path):
+    runner = JobRunner(str(tmp_path), None, ttl_seconds=60)
+    now = time.time()
+    jobs = {
+        "a" * 32: {"status": "done", "finished": now - 120},
+        "b" * 32: {"status": "failed", "finished": now - 120},
+        "c" * 32: {"status": "done", "finished": now - 5},
+        "d" * 32: {"status": "running", "pid": exited_pid()},
+        "e" * 32: {"status": "queued", "pid": os.getpid(), "created": now - 3600},
+    }
+    for job_id, status in jobs.items():
+        os.makedirs(tmp_path / job_id)
+        (tmp_path / job_id / STATUS_FILE).write_text(json.dumps(status))
+    os.makedirs(tmp_path / ("f" * 32))
+    (tmp_path / ("f" * 32) / STATUS_FILE).write_text("{not json")
+    os.makedirs(tmp_path / "not-a-job")
+
+    runner.sweep()
+    assert sorted(os.listdir(tmp_path)) == ["c" * 32, "e" * 32, "f" * 32, "not-a-job"]
+
+
+@pytest.fixture
+def jobs(monkeypatch, tmp_path):
+    runner = JobRunner(str(tmp_path), neuroguard.job_chunks, byte_progress=lambda filename: True)
+    monkeypatch.setattr(neuroguard, "job_runner", runner)
+    # Chunks that are not a multiple of 8 rows make the writer carry bits across chunks
+    monkeypatch.setattr(neuroguard, "CHUNK_ROWS", 13)
+    return runner
+
+
+@pytest.fixture
+def client():
+    return neuroguard.app.test_client()
+
+
+def finished_job(client, jobs, X):
+    response = client.post("/upload?async=1", data={"file": (io.BytesIO(to_csv(X)), "vitals.csv")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 202, response.data
+    job_id = response.json["job"]
+    wait_for(lambda: jobs.status(job_id)["status"] in ("done", "failed"))
+    assert jobs.status(job_id)["status"] == "done", jobs.status(job_id)
+    return job_id
+
+
+def test_job_result_matches_synchronous_upload(client, jobs, reference):
+    X = device_vitals(101, seed=3)
+    job_id = finished_job(client, jobs, X)
+    sync = client.post("/upload?format=bits", data={"file": (io.BytesIO(to_csv(X)), "vitals.csv")},
+                       content_type="multipart/form-data").json
+    expected = np.packbits(reference(X) == 1).tobytes()
+    assert base64.b64decode(sync["data"]) == expected
+
+    response = client.get(f"/jobs/{job_id}/result")
+    assert response.status_code == 200
+    assert response.data == expected
+    assert response.headers["X-Rows"] == "101" and response.headers["X-Encoding"] == "bits"
+    assert jobs.status(job_id)["rows"] == 101
+
+    ranged = client.get(f"/jobs/{job_id}/result", headers={"Range": "bytes=2-5"})
+    assert ranged.status_code == 206
+    assert ranged.data == expected[2:6]
+
+
+def test_job_result_row_range(client, jobs, reference):
+    X = device_vitals(101, seed=4)
+    y = reference(X)
+    job_id = finished_job(client, jobs, X)
+
+    for start, stop in [(0, 101), (3, 29), (13, 13), (95, 101)]:
+        body = client.get(f"/jobs/{job_id}/result?start={start}&stop={stop}&format=bytes").json
+        assert body["offset"] == start and body["rows"] == stop - start
+        assert np.frombuffer(base64.b64decode(body["data"]), dtype=np.uint8).tolist() == y[start:stop].tolist()
+
+    response = client.get(f"/jobs/{job_id}/result?start=5&stop=21&format=bits",
+                          headers={"Accept": "application/octet-stream"})
+    assert response.headers["X-Offset"] == "5" and response.headers["X-Rows"] == "16"
+    assert response.data == np.packbits(y[5:21] == 1).tobytes()
+
+    for query in ["start=-1", "stop=102", "start=9&stop=8", "start=x"]:
+        assert client.get(f"/jobs/{job_id}/result?{query}").status_code == 400, query
+
+
+def test_job_result_unknown_or_unfinished(client, jobs):
+    assert client.get(f"/jobs/{JOB_ID}/result").status_code == 404
+    assert client.get("/jobs/../result").status_code == 404
+    os.makedirs(os.path.join(jobs.directory, JOB_ID))
+    jobs._write_status(JOB_ID, {"id": JOB_ID, "status": "running"})
+    response = client.get(f"/jobs/{JOB_ID}/result")
+    assert response.status_code == 409
+    assert response.json["job"]["status"] == "running"
@@ -0,0 +1,97 @@
+"""Content-addressed cache of /upload results, for retried and re-sent files.
+
+The multipart parser writes each uploaded file through `HashingSpool`,
+which feeds every chunk to BLAKE2b as it arrives, so the digest is ready
+when the request body has been read. A known digest is answered from
+`UploadCache` without parsing or predicting anything.
+
+Keys are (model version, upload kind, digest): the same bytes sent as .csv
+and as .npy parse differently, and a hot-swapped model gets fresh keys, so
+its predecessor's results are never served. Labels are held bit-packed and
+the cache is an LRU bounded by bytes, with a fixed per-entry overhead so
+many one-row uploads cannot grow it past its budget either.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from tempfile import SpooledTemporaryFile
+
+import numpy as np
+
+# Werkzeug's default: uploads over 500 KiB roll over to a temporary file
+SPOOL_MAX_SIZE = 500 * 1024
+# Approximate bytes of key, tuple and dict slot per cached upload
+ENTRY_OVERHEAD = 200
+
+
+class HashingSpool(SpooledTemporaryFile):
+    """SpooledTemporaryFile that keeps a BLAKE2b digest of everything written to it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hash = hashlib.blake2b(digest_size=16)
+
+    def write(self, s):
+        self._hash.update(s)
+        return super().write(s)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def stream_digest(stream, block_size=1 << 20):
+    """BLAKE2b hex digest of an upload's stream: free for a HashingSpool, one read pass otherwise."""
+    if isinstance(stream, HashingSpool):
+        return stream.hexdigest()
+    digest = hashlib.blake2b(digest_size=16)
+    stream.seek(0)
+    for block in iter(lambda: stream.read(block_size), b""):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """LRU of upload labels keyed by (model version, kind, digest), bounded by max_bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (packed labels, rows)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached labels as an int64 0/1 array, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        packed, rows = entry
+        return np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=rows).astype(np.int64)
+
+    def put(self, key, y_pred):
+        packed = np.packbits(np.asarray(y_pred) == 1).tobytes()
+        size = len(packed) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[0]) + ENTRY_OVERHEAD
+            self._entries[key] = (packed, len(y_pred))
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= len(evicted) + ENTRY_OVERHEAD
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else None}
@@ -0,0 +1,236 @@
+"""Background prediction jobs for uploads too long to answer in one request.
+
+`JobRunner.submit` copies the upload into its own job directory and returns
+a job id straight away. Worker threads then read the file chunk by chunk,
+predict each chunk and append the labels to `labels.bits`, in the same
+np.packbits layout as the "bits" response format: row i is bit 7 - i % 8
+of byte i // 8, so any byte range of the file is a run of 8 rows per byte.
+
+After every chunk the job's `status.json` is replaced atomically. Status is
+read back from disk, not from memory, so with several gunicorn workers
+sharing NEUROGUARD_JOB_DIR any of them can answer for any job. The next
+submit removes job directories that finished or failed over `ttl_seconds`
+ago, and queued or running jobs whose owning process (the "pid" in their
+status) has exited, which a restart leaves behind. Live jobs are never
+swept, however long they wait or run.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+RESULT_FILE = "labels.bits"
+STATUS_FILE = "status.json"
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+log = logging.getLogger("neuroguard.jobs")
+
+
+class BitWriter:
+    """Append 0/1 labels to a packbits file, carrying a partial byte between chunks."""
+
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        self._carry = np.empty(0, dtype=bool)
+
+    def write(self, y_pred):
+        bits = np.concatenate([self._carry, np.asarray(y_pred) == 1])
+        whole = len(bits) - len(bits) % 8
+        self._file.write(np.packbits(bits[:whole]).tobytes())
+        self._carry = bits[whole:]
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write(np.packbits(self._carry).tobytes())
+        self._file.close()
+
+
+class JobRunner:
+    """Run uploads through `read_chunks` and the bundle on a bounded pool of threads.
+
+    `read_chunks(stream, filename)` yields row chunks that `bundle.predict`
+    accepts and raises ValueError for malformed files. `submit` raises
+    queue.Full when `max_queue` jobs are already waiting.
+
+    `byte_progress(filename)` tells whether the reader consumes the file
+    front to back, so its stream position measures progress. For files it
+    does not (e.g. ones read through an mmap) "progress" is None until the
+    job is done.
+    """
+
+    def __init__(self, directory, read_chunks, workers=1, max_queue=100, ttl_seconds=3600.0,
+                 byte_progress=None):
+        self.directory = directory
+        self.read_chunks = read_chunks
+        self.byte_progress = byte_progress or (lambda filename: True)
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"upload-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _path(self, job_id, name):
+        return os.path.join(self.directory, job_id, name)
+
+    def _write_status(self, job_id, status):
+        tmp = self._path(job_id, STATUS_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(status, f)
+        os.replace(tmp, self._path(job_id, STATUS_FILE))
+
+    def status(self, job_id):
+        """The job's status dict, or None for an unknown id."""
+        if not _JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            with open(self._path(job_id, STATUS_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def result_path(self, job_id):
+        return self._path(job_id, RESULT_FILE)
+
+    def read_labels(self, job_id, start, stop):
+        """0/1 labels of rows [start, stop) of a finished job, reading only the bytes they span."""
+        with open(self.result_path(job_id), "rb") as f:
+            f.seek(start // 8)
+            packed = np.frombuffer(f.read((stop + 7) // 8 - start // 8), dtype=np.uint8)
+        offset = start - start // 8 * 8
+        return np.unpackbits(packed)[offset:offset + stop - start]
+
+    def submit(self, filename, stream, bundle, record=None):
+        """Copy the upload into a new job directory and queue it; returns the job id.
+
+        `record(chunk, y_pred)`, if given, is called after each chunk is predicted.
+        """
+        self._ensure_started()
+        self.sweep()
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.directory, job_id))
+        upload_path = self._path(job_id, "upload" + os.path.splitext(filename)[1].lower())
+        progress = 0.0 if self.byte_progress(filename) else None
+        status = {"id": job_id, "status": "queued", "filename": filename, "bytes": None, "pid": os.getpid(),
+                  "model_version": bundle.version, "rows": 0, "seizures": 0, "progress": progress,
+                  "created": time.time(), "started": None, "finished": None, "error": None}
+        # Written before the copy, so the sweep can tell this job is alive
+        self._write_status(job_id, status)
+        with open(upload_path, "wb") as f:
+            shutil.copyfileobj(stream, f, 1 << 20)
+        status["bytes"] = os.path.getsize(upload_path)
+        self._write_status(job_id, status)
+        try:
+            self.queue.put_nowait((status, upload_path, bundle, record))
+        except queue.Full:
+            shutil.rmtree(os.path.join(self.directory, job_id), ignore_errors=True)
+            raise
+        return job_id
+
+    def _run(self):
+        while True:
+            status, upload_path, bundle, record = self.queue.get()
+            try:
+                self._process(status, upload_path, bundle, record)
+            except Exception as e:
+                # Never let one job take the worker thread down with it
+                log.exception("❌ Upload job crashed", extra={"job": status["id"]})
+                try:
+                    status.update(status="failed", error=str(e), finished=time.time())
+                    self._write_status(status["id"], status)
+                except OSError:
+                    pass
+            finally:
+                self.queue.task_done()
+
+    def _process(self, status, upload_path, bundle, record):
+        job_id = status["id"]
+        status.update(status="running", started=time.time())
+        self._write_status(job_id, status)
+        writer = BitWriter(self.result_path(job_id))
+        try:
+            with open(upload_path, "rb") as stream:
+                for chunk in self.read_chunks(stream, status["filename"]):
+                    y_pred = bundle.predict(chunk)
+                    writer.write(y_pred)
+                    if record is not None:
+                        record(chunk, y_pred)
+                    status["rows"] += len(y_pred)
+                    status["seizures"] += int((y_pred == 1).sum())
+                    if status["progress"] is not None:
+                        # Bytes consumed by the reader; parsers read ahead, so this leads slightly
+                        status["progress"] = round(min(stream.tell() / max(status["bytes"], 1), 1.0), 4)
+                    self._write_status(job_id, status)
+            status.update(status="done", progress=1.0)
+        except ValueError as e:  # a malformed upload, not a server fault
+            status.update(status="failed", error=str(e))
+            log.warning("❌ Upload job rejected: %s", e, extra={"job": job_id})
+        except Exception as e:
+            status.update(status="failed", error=str(e))
+            log.exception("❌ Upload job failed", extra={"job": job_id})
+        writer.close()
+        os.remove(upload_path)
+        status["finished"] = time.time()
+        self._write_status(job_id, status)
+        log.info("🧠 Upload job finished", extra={
+            "job": job_id, "status": status["status"], "rows": status["rows"], "seizures": status["seizures"],
+            "ms": round((status["finished"] - status["started"]) * 1e3, 3)})
+
+    def sweep(self):
+        """Remove finished jobs older than ttl_seconds and jobs orphaned by a dead process."""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not _JOB_ID.fullmatch(name):
+                continue
+            try:
+                with open(self._path(name, STATUS_FILE)) as f:
+                    status = json.load(f)
+            except FileNotFoundError:
+                # Only a crash between makedirs and the first status write leaves no status
+                try:
+                    stale = os.path.getmtime(os.path.join(self.directory, name)) < cutoff
+                except FileNotFoundError:
+                    continue
+            except ValueError:
+                continue  # unreadable status: leave it for a person to look at
+            else:
+                if status["status"] in ("done", "failed"):
+                    stale = (status["finished"] or 0) < cutoff
+                else:
+                    stale = not _process_alive(status.get("pid"))
+            if stale:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+def _process_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    return True